@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-from pymongo import MongoClient
+from helpers.grade_fact_helper import FACTS_COLLECTION, facts_collection_ready
+from helpers.pipeline_helper import aligned, unwind_aligned
+from helpers.dimension_helper import dimension
 
 def custom_query_builder_panel(db, subject_code=None):
     """A panel for building custom queries on student grades."""
@@ -32,53 +34,70 @@ def run_query(db, program_code, operator, grade):
     }
     mongo_operator = operator_map[operator]
 
+    if facts_collection_ready(db):
+        run_facts_query(db, program_code, mongo_operator, grade)
+        return
+
     pipeline = [
-        {"$unwind": {"path": "$SubjectCodes", "includeArrayIndex": "subject_idx"}},
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "grade_idx"}},
-        {"$match": {
-            "$expr": {"$eq": ["$subject_idx", "$grade_idx"]},
-            "SubjectCodes": program_code,
-            "Grades": {mongo_operator: grade}
-        }},
-        {"$lookup": {
-            "from": "students",
-            "localField": "StudentID",
-            "foreignField": "_id",
-            "as": "student_info"
-        }},
-        {"$unwind": "$student_info"},
-        {"$lookup": {
-            "from": "subjects",
-            "localField": "SubjectCodes",
-            "foreignField": "_id",
-            "as": "subject_info"
-        }},
-        {"$unwind": "$subject_info"},
-        {"$project": {
-            "_id": 0,
-            "StudentID": "$StudentID",
-            "StudentName": "$student_info.Name",
-            "programCode": "$SubjectCodes",
-            "programName": "$subject_info.Description",
-            "Grade": "$Grades"
-        }}
+        {"$match": {"SubjectCodes": program_code}},
+        *unwind_aligned(where={"$eq": [aligned("SubjectCode"), program_code]}),
+        {"$match": {"Grade": {mongo_operator: grade}}},
+        {"$project": {"_id": 0, "StudentID": 1, "programCode": "$SubjectCode", "Grade": 1}}
     ]
 
     try:
-        results = list(db.grades.aggregate(pipeline))
-        if not results:
-            st.warning("No records found for the given criteria.")
+        rows = list(db.grades.aggregate(pipeline))
+        if not rows:
+            show_results([])
             return
+        # Student names and subject descriptions from the cached dimensions; the
+        # inner joins drop unknown students / subjects, as the old $lookup + $unwind did
+        df = dimension(db, "students").join(
+            pd.DataFrame(rows), on="StudentID", fields=["Name"], rename={"Name": "StudentName"}, how="inner"
+        )
+        df = dimension(db, "subjects").join(
+            df, on="programCode", fields=["Description"], rename={"Description": "programName"}, how="inner"
+        )
+        show_results(df[["StudentID", "StudentName", "programCode", "programName", "Grade"]].to_dict("records"))
+    except Exception as e:
+        st.error(f"An error occurred while running the query: {e}")
 
-        df = pd.DataFrame(results)
-        df = df.rename(columns={
-            "StudentID": "Student ID",
-            "StudentName": "Student Name",
-            "programCode": "Program Code",
-            "programName": "Program Name",
-        })
-        st.dataframe(df, use_container_width=True)
-
-
+def run_facts_query(db, program_code, mongo_operator, grade):
+    """Same query against the flat grade_facts collection (indexed on SubjectCode)."""
+    try:
+        subject = dimension(db, "subjects").get(program_code)
+        if not subject:
+            show_results([])  # the pipeline's subject $lookup dropped these too
+            return
+        cursor = db[FACTS_COLLECTION].find(
+            {"SubjectCode": program_code, "Grade": {mongo_operator: grade}, "Name": {"$ne": None}},
+            {"_id": 0, "StudentID": 1, "Name": 1, "Grade": 1},
+        )
+        results = [
+            {
+                "StudentID": doc["StudentID"],
+                "StudentName": doc["Name"],
+                "programCode": program_code,
+                "programName": subject.get("Description"),
+                "Grade": doc["Grade"],
+            }
+            for doc in cursor
+        ]
+        show_results(results)
     except Exception as e:
         st.error(f"An error occurred while running the query: {e}")
+
+def show_results(results):
+    """Renders query rows (StudentID, StudentName, programCode, programName, Grade)."""
+    if not results:
+        st.warning("No records found for the given criteria.")
+        return
+
+    df = pd.DataFrame(results)
+    df = df.rename(columns={
+        "StudentID": "Student ID",
+        "StudentName": "Student Name",
+        "programCode": "Program Code",
+        "programName": "Program Name",
+    })
+    st.dataframe(df, use_container_width=True)
@@ -1,16 +1,19 @@
 import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
 import plotly.express as px
 from io import BytesIO
 
-from helpers.faculty_helper import get_grade_distribution_by_faculty
+from helpers.faculty_helper import get_grade_distribution_by_faculty, grade_distribution_pipeline
+from helpers.async_db_helper import aggregate, run_queries
 from student_progress_tracker import student_progress_tracker_panel
-from subject_difficulty_heatmap import subject_difficulty_heatmap_panel
-from intervention_candidates_list import intervention_candidates_list_panel
-from grade_submission_status import grade_submission_status_panel
+from subject_difficulty_heatmap import heatmap_query, subject_difficulty_heatmap_panel
+from intervention_candidates_list import intervention_candidates_list_panel, intervention_query
+from grade_submission_status import grade_submission_status_panel, submission_query
 from custom_query_builder import custom_query_builder_panel
 from helpers.utils import generate_excel
+from helpers.compact_grades_helper import CompactGrades
+from helpers.stats_cube_helper import load_stats_cube
+from helpers.dimension_helper import dimension, semester_labels
 
 # ---------- HELPERS ----------
 
@@ -29,31 +32,24 @@ def show_class_report(df, db, selected_subject_code, selected_teacher_name, subj
     st.markdown(f"#### 📑 Class Report for {selected_subject_code}")
     st.markdown(f"**Description:** {get_subject_description(selected_subject_code, db)}")
 
-    subject_grades = []
-    for _, row in df.iterrows():
-        if isinstance(row["SubjectCodes"], list) and selected_subject_code in row["SubjectCodes"]:
-            try:
-                subject_info = subjects_map.get(selected_subject_code, {})
-                if subject_info.get("Teacher") == selected_teacher_name:
-                    idx = row["SubjectCodes"].index(selected_subject_code)
-                    grade = pd.to_numeric(row["Grades"][idx], errors="coerce") if idx < len(row["Grades"]) else None
-                    grade = min(100, grade) if pd.notna(grade) else grade
-                    subject_grades.append({
-                        "StudentID": row["StudentID"],
-                        "StudentName": row["Name"],
-                        "Course": row["Course"],
-                        "YearLevel": row["YearLevel"],
-                        "SemesterID": row.get("SemesterID", None),
-                        "Grade": grade,
-                    })
-            except (ValueError, IndexError):
-                continue
-
-    if not subject_grades:
+    # Students whose grade entry for this subject lists the teacher; grade
+    # documents without per-subject teachers fall back to the subject owner
+    df_subject_grades = df.roster(selected_teacher_name, selected_subject_code)
+    if df_subject_grades.empty:
+        subject_info = subjects_map.get(selected_subject_code, {})
+        if subject_info.get("Teacher") != selected_teacher_name:
+            st.warning("No grade records found for this subject under your name.")
+            return
+        df_subject_grades = df.subject_grades(selected_subject_code)
+
+    df_subject_grades = df_subject_grades.rename(columns={"Name": "StudentName"})
+    df_subject_grades = df_subject_grades[["StudentID", "StudentName", "Course", "YearLevel", "SemesterID", "Grade"]]
+    if df_subject_grades.empty:
         st.warning("No grade records found for this subject under your name.")
         return
 
-    df_subject_grades = pd.DataFrame(subject_grades).dropna(subset=["Grade"])
+    df_subject_grades["Grade"] = df_subject_grades["Grade"].clip(upper=100)
+    df_subject_grades = df_subject_grades.dropna(subset=["Grade"])
     df_subject_grades = df_subject_grades.sort_values(
         by=["YearLevel", "StudentName"]
     ).reset_index(drop=True)
@@ -107,17 +103,11 @@ def show_class_report(df, db, selected_subject_code, selected_teacher_name, subj
 
 # ---------- REPORT FUNCTIONS ----------
 
-def class_grade_distribution_report(db, teacher_name, subject_code=None):
+def class_grade_distribution_report(db, teacher_name, subject_code=None, rows=None):
     st.subheader("📊 Class Grade Distribution Report")
 
     try:
-        semesters = list(db.semesters.find({}, {"_id": 1, "Semester": 1, "SchoolYear": 1}))
-        semester_order = {"First": 1, "Second": 2, "Summer": 3}
-        semesters.sort(
-            key=lambda s: (s.get("SchoolYear", 0), semester_order.get(s.get("Semester"), -1)),
-            reverse=True
-        )
-        semester_options = {s["_id"]: f"{s['Semester']} - {s['SchoolYear']}" for s in semesters}
+        semester_options = semester_labels(db)
         semester_ids = [""] + list(semester_options.keys())
     except Exception as e:
         st.error(f"Error fetching semesters: {e}")
@@ -127,13 +117,14 @@ def class_grade_distribution_report(db, teacher_name, subject_code=None):
         "Select Semester and School Year",
         options=semester_ids,
         format_func=lambda x: semester_options.get(x, "Select..."),
+        key="grade_distribution_semester",
     )
 
     if not selected_semester_id:
         st.info("Please select a semester to view the report.")
         return
 
-    df_dist = get_grade_distribution_by_faculty(db, teacher_name, selected_semester_id, subject_code=subject_code)
+    df_dist = get_grade_distribution_by_faculty(db, teacher_name, selected_semester_id, subject_code=subject_code, rows=rows)
 
     if df_dist.empty:
         st.warning("No data found for the selected criteria.")
@@ -152,38 +143,24 @@ def class_grade_distribution_report(db, teacher_name, subject_code=None):
     )
 
     st.markdown("### Grade Distribution Histograms")
-    pipeline = [
-        {"$match": {"SemesterID": selected_semester_id, "Teachers": teacher_name}},
-        {"$unwind": {"path": "$Teachers", "includeArrayIndex": "idx"}},
-        {"$match": {"Teachers": teacher_name}},
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "grade_idx"}},
-        {"$match": {"$expr": {"$eq": ["$idx", "$grade_idx"]}}},
-        {"$lookup": {"from": "students", "localField": "StudentID", "foreignField": "_id", "as": "student"}},
-        {"$unwind": "$student"},
-        {"$project": {"_id": 0, "Grade": "$Grades", "Course": "$student.Course"}}
-    ]
-
-    try:
-        raw_grades_data = list(db.grades.aggregate(pipeline))
-        if not raw_grades_data:
-            st.warning("No grades found for plotting.")
-            return
-    except Exception as e:
-        st.error(f"Error fetching grades for histogram: {e}")
+    cube = load_stats_cube(db)
+    courses = cube.members("Course", SemesterID=selected_semester_id, Teacher=teacher_name)
+    if not courses:
+        st.warning("No grades found for plotting.")
         return
 
-    df_grades = pd.DataFrame(raw_grades_data)
-    courses = df_grades['Course'].unique()
-    curriculum_map = {c['programCode']: c['programName'] for c in db.curriculum.find({"programCode": {"$in": list(courses)}})}
-    df_grades['programName'] = df_grades['Course'].map(curriculum_map).fillna(df_grades['Course'])
-
-    for program_name, group in df_grades.groupby('programName'):
+    curriculum_map = dimension(db, "curriculum").to_dict("programName")
+    for course in sorted(courses, key=lambda c: curriculum_map.get(c) or c):
+        program_name = curriculum_map.get(course) or course
+        hist = cube.histogram(width=5, SemesterID=selected_semester_id, Teacher=teacher_name, Course=course)
+        if hist.empty:
+            continue
         st.markdown(f"#### {program_name}")
-        fig = px.histogram(
-            group,
-            x="Grade",
+        fig = px.bar(
+            hist,
+            x="Bin",
+            y="Count",
             title=f"Grade Distribution for {program_name}",
-            nbins=20,
             template="plotly_dark"
         )
         fig.update_layout(xaxis_title="Grade", yaxis_title="Number of Students", bargap=0.1)
@@ -191,6 +168,23 @@ def class_grade_distribution_report(db, teacher_name, subject_code=None):
 
 # ---------- ENTRY POINT ----------
 
+def panel_queries(teacher_name, subject_code):
+    """The independent grades queries of the faculty page panels, keyed by panel."""
+    queries = {"heatmap": heatmap_query(teacher_name)}
+    semester_id = st.session_state.get("grade_distribution_semester")
+    if semester_id:
+        queries["distribution"] = aggregate(
+            "grades", grade_distribution_pipeline(teacher_name, semester_id, subject_code)
+        )
+    semester_id = st.session_state.get("intervention_semester")
+    if semester_id:
+        queries["intervention"] = intervention_query(teacher_name, semester_id)
+    semester_id = st.session_state.get("submission_status_semester")
+    if semester_id:
+        queries["submission"] = submission_query(teacher_name, semester_id)
+    return queries
+
+
 def faculty(df, semesters_map, db, role, username):
     st.header("📘 Class Record")
     st.info("This report provides a detailed view of student performance in a specific subject.")
@@ -240,36 +234,24 @@ def faculty(df, semesters_map, db, role, username):
 
     st.success(f"You selected subject: {selected_subject_code}")
 
+    # Accept a plain df_merged DataFrame too
+    if isinstance(df, pd.DataFrame):
+        df = CompactGrades.from_frame(df)
+
+    # Run the panels' Mongo queries together instead of one after another.
+    # Semester-specific ones use the semester picked on the previous run.
+    prefetched = run_queries(panel_queries(selected_teacher_name, selected_subject_code))
+
     # Show all reports
     show_class_report(df, db, selected_subject_code, selected_teacher_name, subjects_map)
-    class_grade_distribution_report(db, selected_teacher_name, subject_code=selected_subject_code)
-
-    # Ensure df is a proper DataFrame
-    if not isinstance(df, pd.DataFrame):
-        try:
-            df_full = pd.DataFrame(df)
-        except Exception as e:
-            st.error(f"Failed to convert data to DataFrame: {e}")
-            return
-    else:
-        df_full = df
+    class_grade_distribution_report(
+        db, selected_teacher_name, subject_code=selected_subject_code, rows=prefetched.get("distribution")
+    )
 
     # ---------------------------
     # Filter df for the selected teacher and subject
     # ---------------------------
-    df_filtered = df_full.copy()
-    df_filtered['SubjectCodes'] = df_filtered['SubjectCodes'].apply(
-        lambda x: x if isinstance(x, list) else [x] if pd.notna(x) else []
-    )
-    df_filtered['Teachers'] = df_filtered['Teachers'].apply(
-        lambda x: x if isinstance(x, list) else [x] if pd.notna(x) else []
-    )
-    df_filtered = df_filtered[df_filtered['SubjectCodes'].apply(lambda x: selected_subject_code in x)]
-    df_filtered = df_filtered[
-        df_filtered['Teachers'].apply(
-            lambda t_list: selected_teacher_name_clean in [t.strip().lower() for t in t_list]
-        )
-    ]
+    df_filtered = df.subset(df.roster_rows(selected_teacher_name_clean, selected_subject_code))
 
     # ---------- STUDENT PROGRESS PANEL ----------
     st.header("📈 Student Progress Tracker")
@@ -280,13 +262,21 @@ def faculty(df, semesters_map, db, role, username):
     )
 
     st.header("🔥 Subject Difficulty Heatmap")
-    subject_difficulty_heatmap_panel(db, teacher_name=selected_teacher_name)  # removed subject_code
+    subject_difficulty_heatmap_panel(
+        db, teacher_name=selected_teacher_name, grades=prefetched.get("heatmap")
+    )  # removed subject_code
 
     st.header("🧑‍🏫 Intervention Candidates List")
-    intervention_candidates_list_panel(db, teacher_name=selected_teacher_name, subject_code=selected_subject_code)
+    intervention_candidates_list_panel(
+        db, teacher_name=selected_teacher_name, subject_code=selected_subject_code,
+        data=prefetched.get("intervention")
+    )
 
     st.header("📝 Grade Submission Status")
-    grade_submission_status_panel(db, teacher_name=selected_teacher_name, subject_code=selected_subject_code)
+    grade_submission_status_panel(
+        db, teacher_name=selected_teacher_name, subject_code=selected_subject_code,
+        data=prefetched.get("submission")
+    )
 
     st.header("🔎 Custom Query Builder")
     custom_query_builder_panel(db, subject_code=selected_subject_code)
@@ -1,10 +1,19 @@
 import streamlit as st
 import pandas as pd
-from pymongo import MongoClient
 from helpers.utils import generate_excel
-
-def grade_submission_status_panel(db, teacher_name=None, subject_code=None):
-    """Displays the status of grade submissions by faculty."""
+from helpers.pipeline_helper import aligned, unwind_aligned
+from helpers.dimension_helper import semester_labels
+from helpers.async_db_helper import aggregate
+
+def submission_query(teacher_name, semester_id):
+    """The panel's grades query for one teacher and semester (see helpers/async_db_helper.py)."""
+    return aggregate("grades", [
+        {"$match": {"Teachers": teacher_name, "SemesterID": semester_id}},
+        *unwind_aligned(where={"$eq": [aligned("Teacher"), teacher_name]}, keep=("StudentID",)),
+    ])
+
+def grade_submission_status_panel(db, teacher_name=None, subject_code=None, data=None):
+    """Displays the status of grade submissions by faculty. data: submission_query results, if prefetched."""
     st.info("This report tracks the status of grade submissions for each class taught by the selected faculty member for a given semester.")
 
     if teacher_name is None:
@@ -13,10 +22,7 @@ def grade_submission_status_panel(db, teacher_name=None, subject_code=None):
 
     # Semester selector
     try:
-        semesters = list(db.semesters.find({}, {"_id": 1, "Semester": 1, "SchoolYear": 1}))
-        semester_order = {"First": 1, "Second": 2, "Summer": 3}
-        semesters.sort(key=lambda s: (s.get("SchoolYear", 0), semester_order.get(s.get("Semester"), -1)), reverse=True)
-        semester_options = {s["_id"]: f"{s['Semester']} - {s['SchoolYear']}" for s in semesters}
+        semester_options = semester_labels(db)
         selected_semester_id = st.selectbox(
             "Select Semester",
             options=[""] + list(semester_options.keys()),
@@ -32,19 +38,10 @@ def grade_submission_status_panel(db, teacher_name=None, subject_code=None):
         return
 
     # Fetch data for the selected teacher and semester
-    pipeline = [
-        {"$match": {"Teachers": teacher_name, "SemesterID": selected_semester_id}},
-        {"$unwind": {"path": "$Teachers", "includeArrayIndex": "teacher_idx"}},
-        {"$match": {"Teachers": teacher_name}},
-        {"$project": {
-            "SubjectCode": {"$arrayElemAt": ["$SubjectCodes", "$teacher_idx"]},
-            "Grade": {"$arrayElemAt": ["$Grades", "$teacher_idx"]},
-            "StudentID": 1
-        }}
-    ]
+    query = submission_query(teacher_name, selected_semester_id)
 
     try:
-        submission_data = list(db.grades.aggregate(pipeline))
+        submission_data = data if data is not None else list(db.grades.aggregate(*query.args))
     except Exception as e:
         st.error(f"Error fetching submission data: {e}")
         return
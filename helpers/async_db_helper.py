@@ -0,0 +1,118 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/async_db_helper.py
+# Lets a page declare the independent queries it needs and run them together
+# on PyMongo's asyncio client, so it waits for the slowest query instead of
+# the sum of all of them:
+#
+#    results = run_queries({
+#        "heatmap": find("grades", {"Teachers": teacher}),
+#        "submission": aggregate("grades", pipeline),
+#    })
+#    docs = results.get("heatmap")   # missing when that query failed
+#
+# Streamlit scripts are synchronous, so the async clients live on one event
+# loop running in a background thread; run_queries blocks until all are done.
+
+import asyncio
+import threading
+from typing import NamedTuple
+
+from pymongo import AsyncMongoClient
+
+from helpers.db_helper import MONGO_DB, client_settings
+
+RUN_QUERIES_TIMEOUT = int(os.getenv("RUN_QUERIES_TIMEOUT", 60))  # seconds, for the whole batch
+
+
+class Query(NamedTuple):
+    collection: str
+    kind: str  # "find" | "aggregate"
+    args: tuple
+    kwargs: dict
+
+
+def find(collection, filter=None, projection=None, **kwargs):
+    """A find() to run later with run_queries."""
+    return Query(collection, "find", (filter or {}, projection), kwargs)
+
+
+def aggregate(collection, pipeline, **kwargs):
+    """An aggregate() to run later with run_queries."""
+    return Query(collection, "aggregate", (pipeline,), kwargs)
+
+
+# ------------------------------
+# Event loop + clients
+# ------------------------------
+
+_loop = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def _event_loop():
+    """The background loop every async client is bound to (started on first use)."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-db", daemon=True).start()
+        return _loop
+
+
+def get_async_db(workload="interactive"):
+    """The application database on the async client for workload (use on the background loop)."""
+    client = _clients.get(workload)
+    if client is None:
+        uri, settings = client_settings(workload)
+        client = _clients[workload] = AsyncMongoClient(uri, **settings)
+    return client[MONGO_DB]
+
+
+# ------------------------------
+# Running queries
+# ------------------------------
+
+async def fetch(db, query):
+    """Runs one Query against an async database and returns its documents."""
+    collection = db[query.collection]
+    if query.kind == "find":
+        cursor = collection.find(*query.args, **query.kwargs)
+    else:
+        cursor = await collection.aggregate(*query.args, **query.kwargs)
+    return await cursor.to_list(None)
+
+
+async def fetch_all(queries, db=None, workload="interactive"):
+    """{name: documents} for every Query in queries, run concurrently; failed ones map to the exception."""
+    db = db if db is not None else get_async_db(workload)
+    names = list(queries)
+    results = await asyncio.gather(*(fetch(db, queries[name]) for name in names), return_exceptions=True)
+    return dict(zip(names, results))
+
+
+def run_queries(queries, db=None, workload="interactive", timeout=RUN_QUERIES_TIMEOUT):
+    """
+    Blocking wrapper around fetch_all for Streamlit pages. Queries that failed
+    are left out (with a warning), so the page can fall back to running that
+    one itself and show its usual error.
+    """
+    if not queries:
+        return {}
+    future = asyncio.run_coroutine_threadsafe(fetch_all(queries, db, workload), _event_loop())
+    try:
+        results = future.result(timeout)
+    except Exception as e:
+        future.cancel()
+        print(f"[WARN] Concurrent queries failed: {e}")
+        return {}
+
+    done = {}
+    for name, result in results.items():
+        if isinstance(result, BaseException):
+            print(f"[WARN] Query {name} failed: {result}")
+        else:
+            done[name] = result
+    return done
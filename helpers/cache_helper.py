@@ -2,45 +2,1071 @@ import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 import pandas as pd
 import pickle
+import json
+import threading
+import inspect
+import shutil
+import copy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import wraps
+from contextlib import contextmanager
 import hashlib
 import time
+import bisect
+import re
+import importlib.util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime
+
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None  # parquet engine for DataFrames
 
 CACHE_DIR = "./cache"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 2 * 1024 ** 3))  # 2 GB
+CACHE_COMPACT_INTERVAL = int(os.getenv("CACHE_COMPACT_INTERVAL", 300))  # seconds
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", 256 * 1024 ** 2))  # 256 MB per process
+
+
+# ------------------------------
+# Metrics
+# ------------------------------
+
+CACHE_METRICS_PORT = int(os.getenv("CACHE_METRICS_PORT", 9464))
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)  # seconds
+SIZE_BUCKETS = (10**3, 10**4, 10**5, 10**6, 10**7, 10**8, 10**9)  # bytes
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _func_of(name):
+    """Cache entry name -> function name ("get_courses_<md5>" -> "get_courses")."""
+    if name.endswith(META_SUFFIX):
+        name = name[:-len(META_SUFFIX)]
+    return name.rsplit("_", 1)[0]
+
+
+def _new_histogram(buckets):
+    return {"buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+
+
+def _function_metrics(func_name):
+    entry = _metrics.get(func_name)
+    if entry is None:
+        entry = _metrics[func_name] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "fallbacks": 0,
+            "compute_seconds": _new_histogram(LATENCY_BUCKETS),
+            "size_bytes": _new_histogram(SIZE_BUCKETS),
+        }
+    return entry
+
+
+def record(func_name, counter, amount=1):
+    """Adds to a per-function counter: hits, stale_hits, misses, evictions or fallbacks."""
+    with _metrics_lock:
+        _function_metrics(func_name)[counter] += amount
+
+
+def observe(func_name, histogram, value):
+    """Adds a sample to compute_seconds or size_bytes."""
+    with _metrics_lock:
+        hist = _function_metrics(func_name)[histogram]
+        hist["counts"][bisect.bisect_left(hist["buckets"], value)] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def get_cache_metrics():
+    """
+    Snapshot of the cache metrics for this process:
+    {"functions": {name: {...counters, histograms...}}, "memory": {...}, "disk_bytes": n}
+    """
+    with _metrics_lock:
+        functions = copy.deepcopy(_metrics)
+    for entry in functions.values():
+        total = entry["hits"] + entry["misses"]
+        entry["hit_rate"] = entry["hits"] / total if total else 0.0
+    disk = getattr(default_store, "l2", default_store)
+    return {
+        "functions": functions,
+        "memory": memory_store.stats(),
+        "disk_bytes": getattr(disk, "_size", None),
+    }
+
+
+def metrics_text():
+    """The same numbers in Prometheus text format."""
+    snapshot = get_cache_metrics()
+    lines = []
+
+    for counter in ("hits", "stale_hits", "misses", "evictions", "fallbacks"):
+        lines.append(f"# TYPE cache_{counter}_total counter")
+        for func_name, entry in sorted(snapshot["functions"].items()):
+            lines.append(f'cache_{counter}_total{{function="{func_name}"}} {entry[counter]}')
+
+    for histogram in ("compute_seconds", "size_bytes"):
+        lines.append(f"# TYPE cache_{histogram} histogram")
+        for func_name, entry in sorted(snapshot["functions"].items()):
+            hist = entry[histogram]
+            cumulative = 0
+            for bound, count in zip(list(hist["buckets"]) + ["+Inf"], hist["counts"]):
+                cumulative += count
+                lines.append(f'cache_{histogram}_bucket{{function="{func_name}",le="{bound}"}} {cumulative}')
+            lines.append(f'cache_{histogram}_sum{{function="{func_name}"}} {hist["sum"]}')
+            lines.append(f'cache_{histogram}_count{{function="{func_name}"}} {hist["count"]}')
+
+    for key, value in snapshot["memory"].items():
+        lines.append(f"# TYPE cache_memory_{key} gauge")
+        lines.append(f"cache_memory_{key} {value}")
+    if snapshot["disk_bytes"] is not None:
+        lines.append("# TYPE cache_disk_bytes gauge")
+        lines.append(f"cache_disk_bytes {snapshot['disk_bytes']}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = metrics_text().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(get_cache_metrics(), default=str).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep scrapes out of the console
+
+
+_metrics_server = None
+
+
+def start_metrics_server(port=CACHE_METRICS_PORT, host="127.0.0.1"):
+    """
+    Serves /metrics (Prometheus) and /metrics.json on localhost from a daemon
+    thread. Safe to call on every Streamlit rerun; only the first call binds.
+    """
+    global _metrics_server
+    with _metrics_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            print(f"[WARN] Cache metrics endpoint not started on {host}:{port}: {e}")
+            return None
+    threading.Thread(target=_metrics_server.serve_forever, name="cache-metrics", daemon=True).start()
+    print(f"Cache metrics on http://{host}:{port}/metrics")
+    return _metrics_server
+
+
+# ------------------------------
+# Serialization formats
+# ------------------------------
+
+def _is_columnar(df):
+    """
+    True if the DataFrame round-trips through Parquet unchanged. Object
+    columns never do (strings come back as str dtype with NaN for None,
+    lists / dicts / ObjectIds as other types), so those frames are pickled.
+    """
+    if not HAS_ARROW or not df.columns.is_unique:
+        return False
+    if not all(isinstance(c, str) for c in df.columns):
+        return False
+    if df.index.dtype == object:
+        return False
+    return not any(dtype == object for dtype in df.dtypes)
+
+
+def _is_plain(value):
+    """True for JSON-native values (scalars, lists and str-keyed dicts of them)."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return True
+    if isinstance(value, list):
+        return all(_is_plain(v) for v in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_plain(v) for k, v in value.items())
+    return False
+
+
+def _write_parquet(value, path):
+    value.to_parquet(path, engine="pyarrow")
+
+
+def _write_json(value, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(value, f, separators=(",", ":"))
+
+
+def _write_pickle(value, path):
+    with open(path, "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, engine="pyarrow")
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _pick_format(value):
+    """Returns [(extension, writer)] in order of preference for this value."""
+    formats = []
+    if isinstance(value, pd.DataFrame) and _is_columnar(value):
+        formats.append((".parquet", _write_parquet))
+    elif _is_plain(value):
+        formats.append((".json", _write_json))
+    formats.append((".pkl", _write_pickle))  # always works
+    return formats
+
+
+# ------------------------------
+# Disk store
+# ------------------------------
+
+class DiskStore:
+    """
+    Size-capped on-disk cache store used by cache_meta.
+
+    DataFrames are written as Parquet, plain scalars/lists as JSON and
+    anything else as pickle. File mtime is the write time (for TTL) and
+    atime is bumped on every hit, so eviction drops the least recently
+    used entries first once the directory goes over max_bytes.
+
+    Any object with get(name, ttl_minutes) -> (hit, value), set(name, value)
+    and delete(name) can be plugged into cache_meta instead.
+    """
+
+    FORMATS = (".parquet", ".json", ".pkl")
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, compact_interval=CACHE_COMPACT_INTERVAL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._size = None  # lazily computed total bytes on disk
+        self._compactor = None
+        self._checked = set()  # pickles the compactor already inspected
+
+    def _path(self, name, ext):
+        return os.path.join(self.root, name + ext)
+
+    def _find(self, name):
+        for ext in self.FORMATS:
+            path = self._path(name, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def get(self, name, ttl_minutes=None):
+        """Returns (hit, value). Expired or unreadable entries count as a miss."""
+        path = self._find(name)
+        if path is None:
+            return False, None
+
+        try:
+            mtime = os.path.getmtime(path)
+            if ttl_minutes is not None and (time.time() - mtime) / 60 > ttl_minutes:
+                self._remove(path)
+                return False, None
+            value = _read(path)
+        except FileNotFoundError:
+            return False, None  # evicted between exists() and read
+        except Exception as e:
+            print(f"[WARN] Dropping unreadable cache file {path}: {e}")
+            self._remove(path)
+            return False, None
+
+        try:
+            os.utime(path, (time.time(), mtime))  # LRU stamp, keep mtime for TTL
+        except OSError:
+            pass
+        return True, value
+
+    def set(self, name, value):
+        os.makedirs(self.root, exist_ok=True)
+        self.start_compactor()
+
+        for ext, writer in _pick_format(value):
+            path = self._path(name, ext)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                writer(value, tmp)
+                try:
+                    replaced = os.path.getsize(path)  # the entry being overwritten
+                except OSError:
+                    replaced = 0
+                os.replace(tmp, path)  # atomic, readers never see half a file
+                break
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                if ext == ".pkl":
+                    raise
+
+        # The value type may have changed since the last write
+        for other in self.FORMATS:
+            if other != ext:
+                stale = self._path(name, other)
+                if os.path.exists(stale):
+                    self._remove(stale)
+
+        size = os.path.getsize(path)
+        if not name.endswith(META_SUFFIX):
+            observe(_func_of(name), "size_bytes", size)
+        with self._lock:
+            if self._size is not None:
+                self._size += size - replaced
+            over = self._size is None or self._size > self.max_bytes
+        if over:
+            self.compact()
+
+    def stored_at(self, name):
+        """When name was written (its mtime), or None."""
+        path = self._find(name)
+        try:
+            return os.path.getmtime(path) if path else None
+        except OSError:
+            return None
+
+    def delete(self, name):
+        for ext in self.FORMATS:
+            path = self._path(name, ext)
+            if os.path.exists(path):
+                self._remove(path)
+
+    def _entries(self):
+        """[(path, size, atime, mtime)] for every cache file under root."""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(self.FORMATS):
+                st = entry.stat()
+                entries.append((entry.path, st.st_size, st.st_atime, st.st_mtime))
+        return entries
+
+    def compact(self):
+        """Evicts least recently used entries until the store fits in max_bytes."""
+        entries = self._entries()
+        total = sum(e[1] for e in entries)
+
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9)  # leave headroom so we don't evict on every write
+            for path, size, _, _ in sorted(entries, key=lambda e: e[2]):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    continue
+                record(_func_of(os.path.splitext(os.path.basename(path))[0]), "evictions")
+
+        with self._lock:
+            self._size = total
+        return total
+
+    def _convert_legacy(self):
+        """Rewrites old pickled DataFrames as Parquet so hits stop unpickling them."""
+        for path, _, atime, mtime in self._entries():
+            if not path.endswith(".pkl") or (path, mtime) in self._checked:
+                continue
+            self._checked.add((path, mtime))  # only look at each pickle once
+            try:
+                value = _read(path)
+            except Exception:
+                continue
+            if not (isinstance(value, pd.DataFrame) and _is_columnar(value)):
+                continue
+
+            new_path = path[:-len(".pkl")] + ".parquet"
+            tmp = f"{new_path}.{os.getpid()}.tmp"
+            try:
+                _write_parquet(value, tmp)
+                os.utime(tmp, (atime, mtime))  # keep TTL/LRU position
+                os.replace(tmp, new_path)
+                os.remove(path)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def _remove_stale_tmp(self, max_age=3600):
+        if not os.path.isdir(self.root):
+            return
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".tmp") and now - entry.stat().st_mtime > max_age:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def _compactor_loop(self):
+        while True:
+            try:
+                self._remove_stale_tmp()
+                self._convert_legacy()
+                self.compact()
+            except Exception as e:
+                print(f"[WARN] Cache compactor failed: {e}")
+            time.sleep(self.compact_interval)
+
+    def start_compactor(self):
+        """Starts the background compactor thread once per store."""
+        if self._compactor is not None or not self.compact_interval:
+            return
+        with self._lock:
+            if self._compactor is None:
+                self._compactor = threading.Thread(
+                    target=self._compactor_loop, name="cache-compactor", daemon=True
+                )
+                self._compactor.start()
+
+
+# ------------------------------
+# In-memory tier
+# ------------------------------
+
+def _sizeof(value):
+    """Rough resident size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+def _detach(value):
+    """
+    Hands out a private view of a cached value so callers can't change the
+    entry (e.g. rename(..., inplace=True) on a cached frame). DataFrames get
+    a shallow copy, which pandas' copy-on-write keeps isolated from the original.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    if isinstance(value, (list, dict, set)):
+        return copy.deepcopy(value)
+    return value
+
+
+class MemoryStore:
+    """
+    Process-wide, thread-safe LRU of cached values, bounded by max_bytes.
+
+    Streamlit reruns hit this tier instead of stat-ing and unpickling the
+    disk file on every widget interaction.
+    """
+
+    def __init__(self, max_bytes=CACHE_L1_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # name -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, name, ttl_minutes=None):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and ttl_minutes is not None and (time.time() - entry[2]) / 60 > ttl_minutes:
+                self._drop(name)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        return True, _detach(entry[0])
+
+    def set(self, name, value, stored_at=None):
+        """stored_at keeps an entry's original write time when it is promoted from a slower tier."""
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return  # too big for memory, leave it to the disk tier
+
+        with self._lock:
+            self._drop(name)
+            self._entries[name] = (_detach(value), size, stored_at if stored_at is not None else time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+                record(_func_of(oldest), "evictions")
+
+    def _drop(self, name):
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def delete(self, name):
+        with self._lock:
+            self._drop(name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class TieredStore:
+    """Memory tier in front of a slower store; misses fall through and get promoted."""
+
+    def __init__(self, l1, l2):
+        self.l1 = l1
+        self.l2 = l2
+
+    def get(self, name, ttl_minutes=None):
+        hit, value = self.l1.get(name, ttl_minutes)
+        if hit:
+            return hit, value
+
+        hit, value = self.l2.get(name, ttl_minutes)
+        if hit:
+            # Promote with the L2 write time so the TTL is not restarted
+            stored_at = self.l2.stored_at(name) if hasattr(self.l2, "stored_at") else None
+            self.l1.set(name, value, stored_at=stored_at)
+        return hit, value
+
+    def set(self, name, value):
+        self.l2.set(name, value)
+        self.l1.set(name, value)
 
-def cache_meta(ttl=600000000):  # default no expiration
+    def delete(self, name):
+        self.l1.delete(name)
+        self.l2.delete(name)
+
+
+memory_store = MemoryStore()
+default_store = TieredStore(memory_store, DiskStore())
+
+
+def set_default_store(store):
+    """Swaps the store used by every cache_meta function that didn't pick its own."""
+    global default_store
+    default_store = store
+
+
+# ------------------------------
+# Cross-process file lock
+# ------------------------------
+
+class FileLock:
+    """
+    Cross-process lock backed by an O_EXCL lock file, so it also works on
+    Windows. A lock file older than stale_after seconds is treated as left
+    behind by a crashed process and broken.
+    """
+
+    def __init__(self, path, timeout=30, stale_after=600, poll=0.05):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll = poll
+        self._fd = None
+
+    def acquire(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(self._fd, str(os.getpid()).encode())
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue  # holder released it in the meantime
+            if time.time() >= deadline:
+                raise TimeoutError(f"Could not acquire lock {self.path} within {self.timeout}s")
+            time.sleep(self.poll)
+
+    def release(self):
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# ------------------------------
+# Single-flight
+# ------------------------------
+
+LOCKS_DIR = os.path.join(CACHE_DIR, "locks")
+CACHE_FLIGHT_TIMEOUT = int(os.getenv("CACHE_FLIGHT_TIMEOUT", 600))  # seconds
+
+_flights = {}  # name -> [threading.Lock, number of waiters]
+_flights_lock = threading.Lock()
+
+
+@contextmanager
+def single_flight(name, timeout=CACHE_FLIGHT_TIMEOUT):
+    """
+    Lets one caller at a time (across threads and processes) hold name.
+
+    Yields True once the caller owns the key, or False if it waited longer
+    than timeout, in which case it should just do the work itself.
+    """
+    with _flights_lock:
+        flight = _flights.setdefault(name, [threading.Lock(), 0])
+        flight[1] += 1
+
+    try:
+        if not flight[0].acquire(timeout=timeout):
+            yield False
+            return
+        try:
+            os.makedirs(LOCKS_DIR, exist_ok=True)
+            file_lock = FileLock(os.path.join(LOCKS_DIR, name + ".lock"),
+                                 timeout=timeout, stale_after=timeout, poll=0.1)
+            try:
+                file_lock.acquire()
+            except TimeoutError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                file_lock.release()
+        finally:
+            flight[0].release()
+    finally:
+        with _flights_lock:
+            flight[1] -= 1
+            if flight[1] == 0:
+                _flights.pop(name, None)
+
+
+# ------------------------------
+# Collection versions
+# ------------------------------
+
+COLLECTIONS = ("grades", "students", "semesters", "subjects", "curriculum")
+VERSIONS_FILE = os.path.join(CACHE_DIR, "meta", "versions.json")
+
+_versions = {}
+_versions_stamp = None
+_versions_lock = threading.Lock()
+
+
+def _read_versions():
+    try:
+        with open(VERSIONS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def get_versions():
+    """
+    Returns {collection: version}. The file is re-read only when it changed,
+    so a bump made by another Streamlit process is picked up on the next call.
+    """
+    global _versions, _versions_stamp
+    try:
+        st = os.stat(VERSIONS_FILE)
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        stamp = None
+
+    with _versions_lock:
+        if stamp != _versions_stamp:
+            _versions = _read_versions() if stamp else {}
+            _versions_stamp = stamp
+        return _versions
+
+
+def bump_version(*collections):
+    """
+    Marks collections as changed. Every cache_meta entry that reads one of
+    them is invalidated. Call this after any write to those collections.
+    """
+    os.makedirs(os.path.dirname(VERSIONS_FILE), exist_ok=True)
+    with FileLock(VERSIONS_FILE + ".lock", timeout=10, stale_after=60):
+        versions = _read_versions()
+        for name in collections:
+            versions[name] = versions.get(name, 0) + 1
+
+        tmp = f"{VERSIONS_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(versions, f)
+        os.replace(tmp, VERSIONS_FILE)
+
+    get_versions()  # refresh the in-process copy
+    return versions
+
+
+# ------------------------------
+# Cache keys
+# ------------------------------
+
+def _is_connection(value):
+    """Database/collection handles are not part of the key."""
+    return type(value).__module__.split(".")[0] in ("pymongo", "mongomock", "motor")
+
+
+def _normalize(value):
+    """Turns argument values into something json.dumps hashes the same way every time."""
+    if type(value).__module__ == "numpy" and hasattr(value, "item"):
+        return value.item()  # np.int64(2021) and 2021 are the same key
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=repr)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    return value
+
+
+def make_cache_key(func, args, kwargs, collections=COLLECTIONS, signature=None):
+    """md5 over the function's bound arguments plus the versions of the collections it reads."""
+    signature = signature or inspect.signature(func)
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()  # f(db) and f(db, limit=1000) share an entry
+
+    params = {
+        name: _normalize(value)
+        for name, value in bound.arguments.items()
+        if name != "db" and not _is_connection(value)
+    }
+    versions = get_versions()
+    payload = {
+        "args": params,
+        "versions": {name: versions.get(name, 0) for name in collections},
+    }
+    return hashlib.md5(json.dumps(payload, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+# ------------------------------
+# Decorator
+# ------------------------------
+
+META_SUFFIX = "__meta"
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", 2))
+
+_refresh_pool = None
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+def _current_versions(collections):
+    versions = get_versions()
+    return {name: versions.get(name, 0) for name in collections}
+
+
+def _compute(func, args, kwargs, cache_store, cache_name, collections):
+    """Runs func and stores its result together with an "as of" record."""
+    versions = _current_versions(collections)  # snapshot before reading the data
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    observe(func.__name__, "compute_seconds", time.perf_counter() - started)
+    cache_store.set(cache_name, result)
+    cache_store.set(cache_name + META_SUFFIX, {"as_of": time.time(), "versions": versions})
+    return result
+
+
+def _refresh_in_background(func, args, kwargs, cache_store, cache_name, collections):
+    """Recomputes a stale entry on the refresh pool; one refresh per key at a time."""
+    global _refresh_pool
+    with _refresh_lock:
+        if cache_name in _refreshing:
+            return
+        _refreshing.add(cache_name)
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS,
+                                               thread_name_prefix="cache-refresh")
+
+    def refresh():
+        try:
+            with single_flight(cache_name):
+                _compute(func, args, kwargs, cache_store, cache_name, collections)
+            print(f'Refreshed {func.__name__} in background')
+        except Exception as e:
+            print(f"[WARN] Background refresh of {func.__name__} failed: {e}")  # keep serving the stale copy
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(cache_name)
+
+    _refresh_pool.submit(refresh)
+
+
+def cache_meta(ttl=None, store=None, collections=COLLECTIONS, coalesce=True,
+               soft_ttl=None, hard_ttl=None):
+    """
+    Caches a helper's result in the cache store.
+
+    collections lists the Mongo collections the function reads. An entry
+    stays valid until bump_version() is called for one of them; ttl
+    (minutes) is an optional extra bound on top of that.
+
+    With coalesce on, concurrent misses for the same key (other threads or
+    other Streamlit processes) wait for the first caller's result instead of
+    all running the same aggregation.
+
+    Setting soft_ttl (minutes) switches to stale-while-revalidate: once an
+    entry is older than soft_ttl, or its collections changed, it is still
+    returned right away while a background worker recomputes it. Only
+    entries older than hard_ttl (or missing) block the caller.
+    func.as_of(*args) tells a panel when the cached result was computed.
+    """
     def decorator(func):
+        signature = inspect.signature(func)
+        swr = soft_ttl is not None
+
+        def name_for(args, kwargs):
+            # In SWR mode versions are checked against the meta record instead
+            # of being part of the key, so a data change serves the old entry
+            # while it refreshes.
+            key_collections = () if swr else collections
+            return f"{func.__name__}_{make_cache_key(func, args, kwargs, key_collections, signature)}"
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             print(f'-----------------------------------------------')
             print(f'Func: {func.__name__}', end = '')
 
-            ttl_minutes = kwargs.pop('ttl', ttl)
-            # args_tuple = tuple(arg for arg in args)
-            args_tuple = tuple(arg for arg in args if not hasattr(arg, "__class__"))
-            kwargs_tuple = tuple(sorted(kwargs.items()))
-            cache_key = hashlib.md5(pickle.dumps((args_tuple, kwargs_tuple))).hexdigest()
-            cache_name = f"./cache/{func.__name__}_{cache_key}.pkl"
-            os.makedirs("./cache/", exist_ok=True)
-            if os.path.exists(cache_name):
-                file_mod_time = os.path.getmtime(cache_name)
-                if (time.time() - file_mod_time) / 60 > ttl_minutes:
-                    os.remove(cache_name)
-                    result = func(*args, **kwargs)
-                else:
-                    with open(cache_name, "rb") as f:
-                        result = pickle.load(f)
-                        print(' - from cache')
-                        return result 
-            else:
-                result = func(*args, **kwargs)
-
-
-            with open(cache_name, "wb") as f:
-                pickle.dump(result, f)
+            ttl_minutes = kwargs.pop('ttl', hard_ttl if swr else ttl)
+            cache_name = name_for(args, kwargs)
+
+            cache_store = store or default_store
+            hit, result = cache_store.get(cache_name, ttl_minutes)
+            if hit:
+                record(func.__name__, "hits")
+                if swr:
+                    has_meta, meta = cache_store.get(cache_name + META_SUFFIX)
+                    stale = (
+                        not has_meta
+                        or (time.time() - meta["as_of"]) / 60 > soft_ttl
+                        or meta.get("versions") != _current_versions(collections)
+                    )
+                    if stale:
+                        record(func.__name__, "stale_hits")
+                        print(' - from cache (stale, refreshing)')
+                        _refresh_in_background(func, args, kwargs, cache_store, cache_name, collections)
+                        return result
+                print(' - from cache')
+                return result
+
+            if not coalesce:
+                record(func.__name__, "misses")
+                result = _compute(func, args, kwargs, cache_store, cache_name, collections)
+                print(' - fresh')
+                return result
+
+            with single_flight(cache_name) as owner:
+                if owner:
+                    # Whoever held the key before us may have filled it already
+                    hit, result = cache_store.get(cache_name, ttl_minutes)
+                    if hit:
+                        record(func.__name__, "hits")
+                        print(' - from cache (waited)')
+                        return result
+
+                record(func.__name__, "misses")
+                result = _compute(func, args, kwargs, cache_store, cache_name, collections)
 
             print(' - fresh')
 
             return result
+
+        def as_of(*args, **kwargs):
+            """datetime the cached result for these arguments was computed, or None."""
+            kwargs.pop('ttl', None)
+            hit, meta = (store or default_store).get(name_for(args, kwargs) + META_SUFFIX)
+            return datetime.fromtimestamp(meta["as_of"]) if hit else None
+
+        wrapper.as_of = as_of
+        wrapper.collections = collections  # also marks the function as cached (see cache_warmup)
         return wrapper
     return decorator
+
+
+# ------------------------------
+# Ad-hoc query caching
+# ------------------------------
+
+def load_or_query(cache_key, query, collections=COLLECTIONS):
+    """
+    Returns the cached result for cache_key, running query() on a miss.
+    The entry is tied to the current versions of collections, like cache_meta.
+    """
+    versions = get_versions()
+    stamp = json.dumps({name: versions.get(name, 0) for name in collections}, sort_keys=True)
+    name = cache_key[:-len(".pkl")] if cache_key.endswith(".pkl") else cache_key
+    # Keys carry user input (e.g. an instructor name): keep only safe characters
+    # for the file name and tell keys apart by a hash of the raw key
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", name)[:80]
+    digest = hashlib.md5(f"{cache_key}|{stamp}".encode()).hexdigest()[:8]
+    cache_name = f"{safe}_{digest}"
+
+    hit, result = default_store.get(cache_name)
+    if hit:
+        return result
+
+    result = query()
+    default_store.set(cache_name, result)
+    return result
+
+
+# ------------------------------
+# Checkpoints and batch jobs
+# ------------------------------
+
+JOBS_DIR = os.path.join(CACHE_DIR, "jobs")
+
+
+def _atomic_pickle(value, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    _write_pickle(value, tmp)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(CHECKPOINT_FILE):
+    """Returns the saved {"last_index", "results"} dict, or a fresh one."""
+    try:
+        with open(CHECKPOINT_FILE, "rb") as f:
+            checkpoint = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return {"last_index": 0, "results": []}
+    checkpoint.setdefault("last_index", 0)
+    checkpoint.setdefault("results", [])
+    return checkpoint
+
+
+def save_checkpoint(last_index, results, CHECKPOINT_FILE):
+    """Atomically writes a checkpoint, so a crash mid-write never corrupts it."""
+    _atomic_pickle({"last_index": last_index, "results": results}, CHECKPOINT_FILE)
+
+
+def _merge_parts(parts):
+    """Default merge: concat DataFrames, or flatten lists."""
+    parts = [p for p in parts if p is not None]
+    if parts and all(isinstance(p, pd.DataFrame) for p in parts):
+        non_empty = [p for p in parts if not p.empty]
+        return pd.concat(non_empty, ignore_index=True) if non_empty else pd.DataFrame()
+
+    merged = []
+    for part in parts:
+        merged.extend(part)
+    return merged
+
+
+def run_batch_job(job_name, items, process_batch, batch_size=1000, workers=4,
+                  merge=None, collections=()):
+    """
+    Runs process_batch(batch) over items in batches of batch_size and merges the results.
+
+    Every finished batch is checkpointed atomically under cache/jobs/, so if the
+    process dies the next run with the same items only redoes the missing
+    batches. Batches run on a thread pool (the work is mostly Mongo I/O) and the
+    checkpoints are removed once the merged result has been built.
+
+    The job directory is keyed on the items, batch size and the versions of
+    collections, so a rerun after the data changed starts over instead of
+    mixing old and new partial results.
+    """
+    items = list(items)
+    merge = merge or _merge_parts
+
+    versions = get_versions()
+    fingerprint = hashlib.md5(json.dumps({
+        "items": _normalize(items),
+        "batch_size": batch_size,
+        "versions": {name: versions.get(name, 0) for name in collections},
+    }, sort_keys=True, default=repr).encode()).hexdigest()[:12]
+    job_dir = os.path.join(JOBS_DIR, f"{job_name}_{fingerprint}")
+
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    paths = [os.path.join(job_dir, f"batch_{n:06d}.pkl") for n in range(len(batches))]
+    pending = [n for n, path in enumerate(paths) if not os.path.exists(path)]
+
+    if len(pending) < len(batches):
+        print(f"Resuming {job_name}: {len(batches) - len(pending)}/{len(batches)} batches already done")
+
+    def run(n):
+        start = n * batch_size
+        print(f"{job_name}: processing {start + 1} - {start + len(batches[n])}")
+        _atomic_pickle(process_batch(batches[n]), paths[n])
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(run, n) for n in pending]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for f in futures:
+                    f.cancel()  # finished batches stay checkpointed for the next run
+                raise
+
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        parts = list(pool.map(load, paths))
+
+    result = merge(parts)
+    shutil.rmtree(job_dir, ignore_errors=True)
+    return result
@@ -0,0 +1,137 @@
+# helpers/cache_warmup.py
+# Precomputes every cached registrar/faculty report so the first user of the
+# day gets warm pages. Run it after the nightly data load:
+#
+#    python helpers/cache_warmup.py --invalidate --workers 4
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import inspect
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from helpers import db_helper, report_helper, registrar_main_report_helper
+from helpers.cache_helper import COLLECTIONS, bump_version
+from helpers.data_helper import get_school_years, get_semester_names, get_courses
+
+REPORT_MODULES = (report_helper, registrar_main_report_helper)
+
+
+def get_db():
+    """The database on the pooled batch-workload client (helpers/db_helper.py)."""
+    try:
+        return db_helper.get_db("batch")
+    except RuntimeError as e:
+        raise SystemExit(f"❌ {e}")
+
+
+def cached_functions(modules=REPORT_MODULES):
+    """[(qualified name, function)] for every cache_meta function defined in modules."""
+    found = []
+    for module in modules:
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            if func.__module__ == module.__name__ and hasattr(func, "collections"):
+                found.append((f"{module.__name__.split('.')[-1]}.{name}", func))
+    return found
+
+
+def parameter_options(db):
+    """The filter values the UI offers, keyed by the parameter names the reports use."""
+    school_years = list(get_school_years(db))
+    semesters = list(get_semester_names(db))
+    courses = list(get_courses(db))
+    programs = list(db.curriculum.distinct("programCode"))
+
+    return {
+        "school_year": school_years,
+        "selected_sy": school_years,
+        "semester": semesters,
+        "selected_semester": semesters,
+        "course": courses,
+        "program": programs,
+    }
+
+
+def build_jobs(functions, options):
+    """
+    One job per report and parameter combination: each filter parameter takes
+    its default plus every value the UI offers, everything else keeps its default.
+    """
+    jobs = []
+    for label, func in functions:
+        params = inspect.signature(func).parameters
+        axes = []
+        for name, param in params.items():
+            if name in options:
+                values = [param.default] + [v for v in options[name] if v != param.default]
+                axes.append([(name, v) for v in values])
+
+        for combo in itertools.product(*axes):
+            jobs.append((label, func, dict(combo)))
+    return jobs
+
+
+def run_job(db, func, kwargs):
+    start = time.perf_counter()
+    func(db, **kwargs)
+    return time.perf_counter() - start
+
+
+def warm(db, workers=4, only=None, dry_run=False):
+    functions = cached_functions()
+    if only:
+        functions = [(label, f) for label, f in functions if any(o in label for o in only)]
+
+    options = parameter_options(db)
+    jobs = build_jobs(functions, options)
+    print(f"🔥 Warming {len(jobs)} cached calls across {len(functions)} reports ({workers} workers)")
+
+    if dry_run:
+        for label, _, kwargs in jobs:
+            print(f"   {label}({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})")
+        return {}
+
+    timings = {}  # label -> [seconds per call]
+    failures = []
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_job, db, func, kwargs): (label, kwargs) for label, func, kwargs in jobs}
+        for future in as_completed(futures):
+            label, kwargs = futures[future]
+            try:
+                seconds = future.result()
+            except Exception as e:
+                failures.append((label, kwargs, e))
+                print(f"[ERROR] {label}({kwargs}) failed: {e}")
+                continue
+            timings.setdefault(label, []).append(seconds)
+
+    # --- Per-report timing ---
+    width = max([len(label) for label in timings] + [len("Report")])
+    print()
+    print(f"{'Report':{width}} {'Calls':>5} {'Total s':>9} {'Max s':>8}")
+    for label in sorted(timings, key=lambda l: -sum(timings[l])):
+        secs = timings[label]
+        print(f"{label:{width}} {len(secs):>5} {sum(secs):>9.2f} {max(secs):>8.2f}")
+    print(f"\nDone in {time.perf_counter() - started:.2f}s, {len(failures)} failed")
+
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute cached registrar and faculty reports.")
+    parser.add_argument("--workers", type=int, default=4, help="reports computed at the same time")
+    parser.add_argument("--only", nargs="*", help="only warm reports whose name contains one of these")
+    parser.add_argument("--invalidate", action="store_true",
+                        help="bump every collection version first (use after a bulk data load)")
+    parser.add_argument("--dry-run", action="store_true", help="list the calls without running them")
+    args = parser.parse_args()
+
+    if args.invalidate and not args.dry_run:
+        bump_version(*COLLECTIONS)
+
+    warm(get_db(), workers=args.workers, only=args.only, dry_run=args.dry_run)
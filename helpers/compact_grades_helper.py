@@ -0,0 +1,477 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/compact_grades_helper.py
+# Dictionary-encoded, list-free form of df_merged.
+#
+# Per grade document (row):   student code, semester code, school year
+# Per subject taken (flat):   subject code, teacher code, uint8 grade
+# offsets[i]:offsets[i + 1] is the flat slice of row i, so no Python lists
+# are kept per row. Names / courses / year levels are stored once per student.
+
+import numpy as np
+import pandas as pd
+
+MISSING_GRADE = 255  # uint8 sentinel, real grades are 0..100
+
+
+def _code_dtype(size):
+    """Smallest signed integer dtype for codes into a dictionary of size entries."""
+    return np.int8 if size < 2 ** 7 else np.int16 if size < 2 ** 15 else np.int32
+
+
+def _codes(values):
+    """pd.factorize with the smallest signed integer dtype (-1 = missing)."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    return codes.astype(_code_dtype(len(uniques))), np.asarray(uniques, dtype=object)
+
+
+def _merge_dict(left, right):
+    """
+    left followed by the values of right it lacks, plus the new code of every
+    right entry (with -1 appended, so right's missing code maps to -1).
+    """
+    found = pd.Index(left, dtype=object).get_indexer(pd.Index(right, dtype=object))
+    new = found < 0
+    found[new] = len(left) + np.arange(new.sum())
+    merged = np.concatenate([np.asarray(left, dtype=object), np.asarray(right, dtype=object)[new]])
+    return merged, np.append(found, -1)
+
+
+def _recode(codes, size, lut=None):
+    """codes (optionally through a _merge_dict lut) in the dtype for a dictionary of size entries."""
+    codes = np.asarray(codes)
+    if lut is not None:
+        codes = lut[codes]
+    return codes.astype(_code_dtype(size))
+
+
+def _to_grade(value):
+    try:
+        grade = float(value)
+    except (TypeError, ValueError):
+        return MISSING_GRADE
+    if grade != grade:  # NaN
+        return MISSING_GRADE
+    return int(min(max(round(grade), 0), MISSING_GRADE - 1))
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else []
+
+
+class CompactGrades:
+    """
+    Read-only container for the registrar / faculty views.
+
+    Build it with CompactGrades.from_frame(df_merged); to_frame() gives the
+    original layout back for code that still wants lists.
+    """
+
+    def __init__(self, rows, flat, students, dicts):
+        self.rows = rows          # {"student", "semester", "school_year", "offsets"}
+        self.flat = flat          # {"subject", "teacher", "grade"}
+        self.students = students  # {"id", "name", "course", "year_level"}
+        self.dicts = dicts        # {"subject", "teacher", "semester", "school_year", "course", "year_level"}
+        self._row_of = None
+        self._index = None
+        self._roster = None
+
+    # ------------------------------
+    # Build
+    # ------------------------------
+
+    @classmethod
+    def from_frame(cls, df):
+        subject_lists = [_as_list(v) for v in df["SubjectCodes"]]
+        lengths = np.fromiter((len(codes) for codes in subject_lists), dtype=np.int64, count=len(subject_lists))
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if offsets[-1] < 2 ** 31:
+            offsets = offsets.astype(np.int32)
+
+        subjects, teachers, grades = [], [], []
+        for codes, row_teachers, row_grades in zip(subject_lists, df["Teachers"], df["Grades"]):
+            n = len(codes)
+            row_teachers, row_grades = _as_list(row_teachers)[:n], _as_list(row_grades)[:n]
+            subjects.extend(codes)
+            teachers.extend(row_teachers + [None] * (n - len(row_teachers)))
+            grades.extend(_to_grade(g) for g in row_grades)
+            grades.extend([MISSING_GRADE] * (n - len(row_grades)))
+
+        subject_codes, subject_dict = _codes(subjects)
+        teacher_codes, teacher_dict = _codes(teachers)
+
+        # Student attributes are stored once per student
+        student_codes, student_ids = _codes(df["StudentID"])
+        first = pd.Series(np.arange(len(df))).groupby(student_codes).first()
+        first = first[first.index >= 0].to_numpy()
+        course_codes, course_dict = _codes(df["Course"].to_numpy()[first])
+        year_codes, year_dict = _codes(df["YearLevel"].to_numpy()[first])
+
+        semester_codes, semester_dict = _codes(df["SemesterID"])
+        school_year_codes, school_year_dict = _codes(df["SchoolYear"])
+
+        return cls(
+            rows={
+                "student": student_codes.astype(np.int32),
+                "semester": semester_codes,
+                "school_year": school_year_codes,
+                "offsets": offsets,
+            },
+            flat={
+                "subject": subject_codes,
+                "teacher": teacher_codes,
+                "grade": np.asarray(grades, dtype=np.uint8),
+            },
+            students={
+                "id": student_ids,
+                "name": np.asarray(df["Name"].to_numpy()[first], dtype=object),
+                "course": course_codes,
+                "year_level": year_codes,
+            },
+            dicts={
+                "subject": subject_dict,
+                "teacher": teacher_dict,
+                "semester": semester_dict,
+                "school_year": school_year_dict,
+                "course": course_dict,
+                "year_level": year_dict,
+            },
+        )
+
+    def concat(self, other):
+        """
+        A CompactGrades with the rows of self followed by the rows of other.
+        Dictionaries are merged, so only other's values are encoded again;
+        students already in self keep self's attributes.
+        """
+        dicts, luts = {}, {}
+        for name, values in self.dicts.items():
+            dicts[name], luts[name] = _merge_dict(values, other.dicts[name])
+
+        ids, student_lut = _merge_dict(self.students["id"], other.students["id"])
+        added = np.flatnonzero(student_lut[:-1] >= len(self.students["id"]))  # other's students new to self
+        students = {"id": ids, "name": np.concatenate([self.students["name"], other.students["name"][added]])}
+        for field in ("course", "year_level"):
+            size = len(dicts[field])
+            students[field] = np.concatenate([
+                _recode(self.students[field], size),
+                _recode(other.students[field][added], size, luts[field]),
+            ])
+
+        rows = {"student": np.concatenate([self.rows["student"], student_lut[other.rows["student"]]]).astype(np.int32)}
+        for field in ("semester", "school_year"):
+            size = len(dicts[field])
+            rows[field] = np.concatenate([_recode(self.rows[field], size), _recode(other.rows[field], size, luts[field])])
+        offsets = np.concatenate([
+            self.rows["offsets"].astype(np.int64),
+            other.rows["offsets"][1:].astype(np.int64) + self.rows["offsets"][-1],
+        ])
+        rows["offsets"] = offsets.astype(np.int32) if offsets[-1] < 2 ** 31 else offsets
+
+        flat = {"grade": np.concatenate([self.flat["grade"], other.flat["grade"]])}
+        for field in ("subject", "teacher"):
+            size = len(dicts[field])
+            flat[field] = np.concatenate([_recode(self.flat[field], size), _recode(other.flat[field], size, luts[field])])
+
+        return CompactGrades(rows=rows, flat=flat, students=students, dicts=dicts)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_row_of"] = None  # derived, rebuilt on demand
+        state["_index"] = None
+        state["_roster"] = None
+        return state
+
+    # ------------------------------
+    # Introspection
+    # ------------------------------
+
+    def __len__(self):
+        return len(self.rows["student"])
+
+    @property
+    def nbytes(self):
+        arrays = [*self.rows.values(), *self.flat.values(), *self.students.values(), *self.dicts.values()]
+        total = sum(a.nbytes for a in arrays)
+        total += sum(sys.getsizeof(v) for a in arrays if a.dtype == object for v in a)
+        return total
+
+    @property
+    def row_of(self):
+        """Row index of every flat entry."""
+        if self._row_of is None:
+            self._row_of = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.rows["offsets"]))
+        return self._row_of
+
+    # ------------------------------
+    # Inverted index
+    # ------------------------------
+
+    def _build_index(self):
+        """
+        Flat positions sorted by subject, and by (semester, subject), with
+        CSR-style bounds so a lookup is two array slices.
+        """
+        n_subjects = len(self.dicts["subject"]) + 1  # +1: code -1 (missing) maps to slot 0
+        n_semesters = len(self.dicts["semester"]) + 1
+        subject = self.flat["subject"].astype(np.int64) + 1
+        semester = self.rows["semester"][self.row_of].astype(np.int64) + 1
+
+        by_subject = np.argsort(subject, kind="stable").astype(np.int32)
+        subject_bounds = np.zeros(n_subjects + 1, dtype=np.int64)
+        np.cumsum(np.bincount(subject, minlength=n_subjects), out=subject_bounds[1:])
+
+        key = semester * n_subjects + subject
+        by_semester_subject = np.argsort(key, kind="stable").astype(np.int32)
+        pair_bounds = np.zeros(n_semesters * n_subjects + 1, dtype=np.int64)
+        np.cumsum(np.bincount(key, minlength=n_semesters * n_subjects), out=pair_bounds[1:])
+
+        self._index = {
+            "n_subjects": n_subjects,
+            "by_subject": by_subject,
+            "subject_bounds": subject_bounds,
+            "by_semester_subject": by_semester_subject,
+            "pair_bounds": pair_bounds,
+            "subject_code": {v: i for i, v in enumerate(self.dicts["subject"])},
+            "semester_code": {v: i for i, v in enumerate(self.dicts["semester"])},
+        }
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._build_index()
+        return self._index
+
+    def positions(self, subject_code, semester_id=None):
+        """Flat positions (ascending) of subject_code, optionally within one semester."""
+        index = self.index
+        subject = index["subject_code"].get(subject_code)
+        if subject is None:
+            return np.empty(0, dtype=np.int32)
+        if semester_id is None:
+            start, end = index["subject_bounds"][subject + 1], index["subject_bounds"][subject + 2]
+            return index["by_subject"][start:end]
+
+        semester = index["semester_code"].get(semester_id)
+        if semester is None:
+            return np.empty(0, dtype=np.int32)
+        key = (semester + 1) * index["n_subjects"] + subject + 1
+        start, end = index["pair_bounds"][key], index["pair_bounds"][key + 1]
+        return index["by_semester_subject"][start:end]
+
+    def rows_with(self, subject_code, semester_id=None):
+        """Row positions (ascending, unique) that have subject_code."""
+        return np.unique(self.row_of[self.positions(subject_code, semester_id)])
+
+    # ------------------------------
+    # Roster index
+    # ------------------------------
+
+    @staticmethod
+    def _normalize_teacher(name):
+        return str(name).strip().lower()
+
+    def _build_roster(self):
+        """
+        {teacher (stripped, lower-case): {(subject_code, semester_id): (start, end)}}
+        over one array of flat positions sorted by (teacher, subject, semester).
+        """
+        names, norm_dict = pd.factorize(pd.Series([self._normalize_teacher(t) for t in self.dicts["teacher"]], dtype=object))
+        lut = np.append(names, -1).astype(np.int64)  # teacher code -1 (missing) -> -1
+        teacher = lut[self.flat["teacher"]]
+
+        n_subjects = len(self.dicts["subject"]) + 1
+        n_semesters = len(self.dicts["semester"]) + 1
+        subject = self.flat["subject"].astype(np.int64) + 1
+        semester = self.rows["semester"][self.row_of].astype(np.int64) + 1
+        key = (teacher * n_subjects + subject) * n_semesters + semester
+
+        positions = np.flatnonzero(teacher >= 0)
+        order = positions[np.argsort(key[positions], kind="stable")].astype(np.int32)
+        keys, starts, counts = np.unique(key[order], return_index=True, return_counts=True)
+
+        roster = {}
+        for k, start, count in zip(keys.tolist(), starts.tolist(), counts.tolist()):
+            rest, sem = divmod(k, n_semesters)
+            t, subj = divmod(rest, n_subjects)
+            entry = (self.dicts["subject"][subj - 1] if subj else None, self.dicts["semester"][sem - 1] if sem else None)
+            roster.setdefault(norm_dict[t], {})[entry] = (start, start + count)
+        self._roster = {"order": order, "slices": roster}
+
+    @property
+    def roster_index(self):
+        if self._roster is None:
+            self._build_roster()
+        return self._roster
+
+    def roster_positions(self, teacher, subject_code=None, semester_id=None):
+        """Flat positions (ascending) taught by teacher, optionally for one subject / semester."""
+        index = self.roster_index
+        slices = index["slices"].get(self._normalize_teacher(teacher), {})
+        if subject_code is not None and semester_id is not None:
+            bounds = [slices[(subject_code, semester_id)]] if (subject_code, semester_id) in slices else []
+        else:
+            bounds = [
+                b for (subj, sem), b in slices.items()
+                if (subject_code is None or subj == subject_code) and (semester_id is None or sem == semester_id)
+            ]
+        if not bounds:
+            return np.empty(0, dtype=np.int32)
+        return np.sort(np.concatenate([index["order"][start:end] for start, end in bounds]))
+
+    def roster(self, teacher, subject_code=None, semester_id=None):
+        """The teacher's students as subject_grades-style rows (one per grade document)."""
+        return self._frame(self.roster_positions(teacher, subject_code, semester_id))
+
+    def roster_rows(self, teacher, subject_code=None, semester_id=None):
+        """Row positions (ascending, unique) taught by teacher."""
+        return np.unique(self.row_of[self.roster_positions(teacher, subject_code, semester_id)])
+
+    def subject_codes(self):
+        used = np.unique(self.flat["subject"])
+        return sorted(self.dicts["subject"][used[used >= 0]])
+
+    def semester_ids(self):
+        used = np.unique(self.rows["semester"])
+        return sorted(self.dicts["semester"][used[used >= 0]])
+
+    # ------------------------------
+    # Filtering
+    # ------------------------------
+
+    @staticmethod
+    def _lookup(dictionary, value):
+        hits = np.flatnonzero(dictionary == value)
+        return hits[0] if len(hits) else None
+
+    def _rows_with(self, flat_mask):
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.row_of[flat_mask]] = True
+        return mask
+
+    def row_mask(self, semester_id=None, subject_code=None, teacher=None, course=None, year_level=None):
+        """
+        Boolean mask over rows. teacher matches any subject in the row,
+        compared stripped and case-insensitive like the old list filters.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if semester_id is not None:
+            mask &= self.rows["semester"] == self._lookup(self.dicts["semester"], semester_id)
+        if subject_code is not None:
+            hits = np.zeros(len(self), dtype=bool)
+            hits[self.rows_with(subject_code)] = True
+            mask &= hits
+        if teacher:
+            target = str(teacher).strip().lower()
+            codes = [i for i, t in enumerate(self.dicts["teacher"]) if str(t).strip().lower() == target]
+            mask &= self._rows_with(np.isin(self.flat["teacher"], codes))
+        if course:
+            mask &= self._student_codes("course", self.rows["student"]) == self._lookup(self.dicts["course"], course)
+        if year_level:
+            mask &= self._student_codes("year_level", self.rows["student"]) == self._lookup(self.dicts["year_level"], year_level)
+        return mask
+
+    def subset(self, mask):
+        """A CompactGrades with only the rows in mask, a boolean mask or row positions (dictionaries are shared)."""
+        mask = np.asarray(mask)
+        rows = np.flatnonzero(mask) if mask.dtype == bool else np.sort(mask)
+        starts, ends = self.rows["offsets"][rows], self.rows["offsets"][rows + 1]
+        lengths = ends - starts
+        offsets = np.zeros(len(rows) + 1, dtype=self.rows["offsets"].dtype)
+        np.cumsum(lengths, out=offsets[1:])
+        take = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return CompactGrades(
+            rows={
+                "student": self.rows["student"][rows],
+                "semester": self.rows["semester"][rows],
+                "school_year": self.rows["school_year"][rows],
+                "offsets": offsets,
+            },
+            flat={key: values[take] for key, values in self.flat.items()},
+            students=self.students,
+            dicts=self.dicts,
+        )
+
+    # ------------------------------
+    # Decoding
+    # ------------------------------
+
+    @staticmethod
+    def _decode(dictionary, codes):
+        return pd.Categorical.from_codes(codes, categories=dictionary) if len(dictionary) else [None] * len(codes)
+
+    def _student_codes(self, field, student):
+        """course / year_level codes for student codes (-1 for a missing student)."""
+        student = np.asarray(student)
+        codes = np.full(len(student), -1, dtype=np.int64)
+        known = student >= 0
+        codes[known] = self.students[field][student[known]]
+        return codes
+
+    def _student_field(self, field, student):
+        """Decoded course / year_level for student codes (None for a missing student)."""
+        return self._take(self.dicts[field], self._student_codes(field, student))
+
+    @staticmethod
+    def _take(values, codes):
+        """values[codes] as objects, None where the code is -1 (missing) instead of the last entry."""
+        codes = np.asarray(codes)
+        out = np.asarray(values, dtype=object)[np.where(codes >= 0, codes, 0)] if len(values) else np.full(len(codes), None, dtype=object)
+        out[codes < 0] = None
+        return out
+
+    def subject_grades(self, subject_code, mask=None, semester_id=None):
+        """
+        One row per grade document that has subject_code (first occurrence),
+        with StudentID, Name, Course, YearLevel, SemesterID, SchoolYear,
+        Teacher and Grade (float, NaN when missing).
+        """
+        positions = self.positions(subject_code, semester_id)
+        if mask is not None:
+            positions = positions[mask[self.row_of[positions]]]
+        return self._frame(positions)
+
+    def _frame(self, positions):
+        """Decodes ascending flat positions, keeping the first one per row."""
+        columns = ["StudentID", "Name", "Course", "YearLevel", "SemesterID", "SchoolYear", "Teacher", "Grade"]
+        if not len(positions):
+            return pd.DataFrame(columns=columns)
+
+        rows, first = np.unique(self.row_of[positions], return_index=True)
+        positions = positions[first]
+
+        student = self.rows["student"][rows]
+        grade = self.flat["grade"][positions].astype(float)
+        grade[self.flat["grade"][positions] == MISSING_GRADE] = np.nan
+
+        return pd.DataFrame({
+            "StudentID": self._take(self.students["id"], student),
+            "Name": self._take(self.students["name"], student),
+            "Course": self._student_field("course", student),
+            "YearLevel": self._student_field("year_level", student),
+            "SemesterID": np.asarray(self._decode(self.dicts["semester"], self.rows["semester"][rows]), dtype=object),
+            "SchoolYear": np.asarray(self._decode(self.dicts["school_year"], self.rows["school_year"][rows]), dtype=object),
+            "Teacher": np.asarray(self._decode(self.dicts["teacher"], self.flat["teacher"][positions]), dtype=object),
+            "Grade": grade,
+        }, columns=columns)
+
+    def to_frame(self):
+        """Expands back to the df_merged layout (per-row lists)."""
+        offsets = self.rows["offsets"]
+        subjects = self._take(self.dicts["subject"], self.flat["subject"]).tolist()
+        teachers = self._take(self.dicts["teacher"], self.flat["teacher"]).tolist()
+        grades = [None if g == MISSING_GRADE else int(g) for g in self.flat["grade"].tolist()]
+        student = self.rows["student"]
+        return pd.DataFrame({
+            "StudentID": self._take(self.students["id"], student),
+            "SemesterID": np.asarray(self._decode(self.dicts["semester"], self.rows["semester"]), dtype=object),
+            "SubjectCodes": [subjects[a:b] for a, b in zip(offsets[:-1], offsets[1:])],
+            "Grades": [grades[a:b] for a, b in zip(offsets[:-1], offsets[1:])],
+            "Teachers": [teachers[a:b] for a, b in zip(offsets[:-1], offsets[1:])],
+            "SchoolYear": np.asarray(self._decode(self.dicts["school_year"], self.rows["school_year"]), dtype=object),
+            "Name": self._take(self.students["name"], student),
+            "Course": self._student_field("course", student),
+            "YearLevel": self._student_field("year_level", student),
+        })
@@ -10,6 +10,7 @@ import time
 
 # from config.settings import MONGODB_URI, CACHE_MAX_AGE
 from helpers.cache_helper import cache_meta, load_or_query
+from helpers.ingest_helper import find_frame, read_frame, schema_for
 
 
 pd.set_option('display.max_columns', None)
@@ -50,11 +51,11 @@ def get_students_collection(db, StudentID=None, limit=100000000):
         if limit:
             cursor = cursor.limit(limit)
 
-        return pd.DataFrame(list(cursor))
+        return read_frame(cursor, schema_for("students"))
 
     return load_or_query("students_cache_x.pkl", query)
 
-@cache_meta(ttl=660000000) #60 minutes
+@cache_meta(collections=("grades", "students"))
 def get_students(db, StudentID=None, limit=1000):
 
 
@@ -90,24 +91,12 @@ def get_students(db, StudentID=None, limit=1000):
         pipeline.append({"$limit": limit})
 
     cursor = db.grades.aggregate(pipeline)  # NOTE: run on grades_col
-    return pd.DataFrame(list(cursor))
+    return read_frame(cursor, schema_for("students"))
 
 def get_subjects(db, batch_size=1000):
 
 
-    cursor = db.subjects.find({}, {"_id": 1, "Description": 1, "Units": 1, "Teacher": 1})
-
-    docs, chunks = [], []
-    for i, doc in enumerate(cursor, 1):
-        docs.append(doc)
-        if i % batch_size == 0:
-            chunks.append(pd.DataFrame(docs))
-            docs = []
-
-    if docs:
-        chunks.append(pd.DataFrame(docs))
-
-    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    df = find_frame(db.subjects, {}, {"_id": 1, "Description": 1, "Units": 1, "Teacher": 1}, batch_size=batch_size)
 
     if not df.empty:
         df.rename(columns={"_id": "Subject Code"}, inplace=True)
@@ -117,36 +106,24 @@ def get_subjects(db, batch_size=1000):
 
 
 
-@cache_meta(ttl=600000) #60 minutes
+@cache_meta(collections=("semesters",))
 def get_semester_names(db):
     print('fetching semester from semesters collection as list')
     return db.semesters.distinct("Semester")
 
-@cache_meta(ttl=600000) #60 minutes
+@cache_meta(collections=("semesters",))
 def get_semesters(db, batch_size=1000):
     print('fetching semesters collection as DataFrame')
 
 
-    cursor = db.semesters.find({}, {"_id": 1, "Semester": 1, "SchoolYear": 1})
-
-    docs, chunks = [], []
-    for i, doc in enumerate(cursor, 1):
-        docs.append(doc)
-        if i % batch_size == 0:
-            chunks.append(pd.DataFrame(docs))
-            docs = []
-
-    if docs:
-        chunks.append(pd.DataFrame(docs))
+    return find_frame(db.semesters, {}, {"_id": 1, "Semester": 1, "SchoolYear": 1}, batch_size=batch_size)
 
-    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
-
-@cache_meta(ttl=600000) #60 minutes
+@cache_meta(collections=("semesters",))
 def get_school_years(db):
     years = db.semesters.distinct("SchoolYear")
     return sorted(years, reverse=True)
 
-@cache_meta(ttl=600000) #60 minutes
+@cache_meta(collections=("semesters",))
 def get_current_school_year(db):
     years = db.semesters.distinct("SchoolYear")
     latest_year = sorted(years, key=lambda y: int(str(y).split("-")[0]), reverse=True)[0]
@@ -154,11 +131,11 @@ def get_current_school_year(db):
     return latest_year
 
 
-@cache_meta(ttl=600000) #60 minutes
+@cache_meta(collections=("students",))
 def get_courses(db):
     return db.students.distinct("Course")
 
-@cache_meta(ttl=600000) #60 minutes
+@cache_meta(collections=("grades",))
 def get_grades(db, student_id: int | None = None, batch_size: int = 1000):
     print("Fetching data", end="")
     # 🔹 Build query filter
@@ -166,7 +143,9 @@ def get_grades(db, student_id: int | None = None, batch_size: int = 1000):
     if student_id is not None:
         query["StudentID"] = int(student_id)
 
-    cursor = db.grades.find(
+    # 🔹 Decoded batch by batch into typed columns (helpers/ingest_helper.py)
+    return find_frame(
+        db.grades,
         query,
         {
             "_id": 1,
@@ -176,21 +155,9 @@ def get_grades(db, student_id: int | None = None, batch_size: int = 1000):
             "Teachers": 1,
             "SemesterID": 1,
         },
+        batch_size=batch_size,
     )
 
-    docs, chunks = [], []
-    for i, doc in enumerate(cursor, 1):
-        docs.append(doc)
-        if i % batch_size == 0:
-            print(".", end="")
-            chunks.append(pd.DataFrame(docs))
-            docs = []
-
-    if docs:  # add remaining docs
-        chunks.append(pd.DataFrame(docs))
-
-    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
-
 def get_student_subjects_grades(db, StudentID=None, limit=1000):
     """
     Returns all subjects and grades for a specific student with:
@@ -264,7 +231,7 @@ def get_instructor_subjects(db, instructor_name=None, limit=1000):
             {"_id": 1, "Description": 1, "Units": 1, "Teacher": 1}
         ).sort("Teacher", 1)
 
-        df = pd.DataFrame(list(cursor))
+        df = read_frame(cursor, schema_for("subjects"))
         if df.empty:
             return df
 
@@ -0,0 +1,91 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/db_helper.py
+# The one place that creates MongoClients. A client (and its connection pool)
+# is built once per process and workload and shared by every page, so the
+# DNS lookup / TLS handshake is paid once instead of per module.
+#
+#   interactive  Streamlit pages: short time limit, reads may use a secondary
+#                when the primary is unavailable
+#   batch        cache warm-up, maintenance jobs: long time limit, reads go
+#                to secondaries when there are any
+#
+# Settings come from .env: MONGO_USER / MONGO_PASS (required), MONGO_HOST,
+# MONGO_DB, MONGO_MAX_POOL, MONGO_MIN_POOL, MONGO_COMPRESSORS.
+
+import threading
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+MONGO_HOST = os.getenv("MONGO_HOST", "cluster0.l7fdbmf.mongodb.net")
+MONGO_DB = os.getenv("MONGO_DB", "mit261")
+MONGO_MAX_POOL = int(os.getenv("MONGO_MAX_POOL", 50))
+MONGO_MIN_POOL = int(os.getenv("MONGO_MIN_POOL", 2))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")  # add zstd / snappy when their modules are installed
+
+WORKLOADS = {
+    "interactive": {
+        "readPreference": "primaryPreferred",
+        "timeoutMS": int(os.getenv("MONGO_INTERACTIVE_TIMEOUT_MS", 15000)),  # sent as maxTimeMS
+    },
+    "batch": {
+        "readPreference": "secondaryPreferred",
+        "timeoutMS": int(os.getenv("MONGO_BATCH_TIMEOUT_MS", 600000)),
+    },
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def mongo_uri():
+    """SRV connection string from the .env credentials, or None when they are missing."""
+    user = os.getenv("MONGO_USER")
+    password = os.getenv("MONGO_PASS")
+    if not user or not password:
+        return None
+    return f"mongodb+srv://{user}:{password}@{MONGO_HOST}"
+
+
+def client_settings(workload):
+    """(uri, client keyword arguments) for workload; shared with the async client in async_db_helper."""
+    if workload not in WORKLOADS:
+        raise ValueError(f"Unknown workload {workload!r}, expected one of {sorted(WORKLOADS)}")
+    uri = mongo_uri()
+    if uri is None:
+        raise RuntimeError("Missing MongoDB credentials (MONGO_USER / MONGO_PASS) in .env file")
+    return uri, {
+        "appname": f"mit261-{workload}",
+        "maxPoolSize": MONGO_MAX_POOL,
+        "minPoolSize": MONGO_MIN_POOL,
+        "compressors": MONGO_COMPRESSORS,
+        **WORKLOADS[workload],
+    }
+
+
+def get_client(workload="interactive"):
+    """The shared MongoClient for workload; raises RuntimeError without credentials."""
+    with _lock:
+        client = _clients.get(workload)
+        if client is None:
+            uri, settings = client_settings(workload)
+            client = MongoClient(uri, **settings)
+            _clients[workload] = client
+        return client
+
+
+def get_db(workload="interactive"):
+    """The application database on the shared client for workload."""
+    return get_client(workload)[MONGO_DB]
+
+
+def close_clients():
+    """Closes every pooled client (end of a CLI run / tests)."""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
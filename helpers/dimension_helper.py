@@ -0,0 +1,120 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/dimension_helper.py
+# In-process cache of the small, slowly changing collections (semesters,
+# subjects, students, curriculum). Each one is read once per process and
+# data version (see cache_helper.bump_version) into a DataFrame indexed by
+# its key; fact rows are joined to it with one vectorized hash lookup
+# (Index.get_indexer) instead of a $lookup per grade document.
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from helpers.cache_helper import get_versions
+from helpers.ingest_helper import find_frame
+
+# name -> (key field, fields kept)
+DIMENSIONS = {
+    "semesters": ("_id", ["Semester", "SchoolYear"]),
+    "subjects": ("_id", ["Description", "Units", "Teacher"]),
+    "students": ("_id", ["Name", "Course", "YearLevel"]),
+    "curriculum": ("programCode", ["programName"]),
+}
+DIMENSION_MAX_AGE = int(os.getenv("DIMENSION_MAX_AGE", 600))  # seconds; re-read even without a version bump
+
+SEMESTER_ORDER = {"First": 1, "Second": 2, "Summer": 3}
+
+
+class Dimension:
+    """One dimension collection as a key-indexed frame, with vectorized lookups."""
+
+    def __init__(self, name, frame):
+        self.name = name
+        self.frame = frame
+
+    def __len__(self):
+        return len(self.frame)
+
+    def positions(self, keys):
+        """Row position of every key (-1 when the key is unknown)."""
+        return self.frame.index.get_indexer(pd.Index(keys))
+
+    def lookup(self, keys, field):
+        """field for every key, aligned with keys (None when the key is unknown)."""
+        return self._take(field, self.positions(keys))
+
+    def join(self, df, on, fields=None, rename=None, how="left"):
+        """
+        df with fields of the row matching df[on] added as columns. how="inner"
+        drops rows whose key is unknown, like $lookup followed by $unwind.
+        """
+        fields = fields or list(self.frame.columns)
+        rename = rename or {}
+        pos = self.positions(df[on])
+        joined = df.assign(**{rename.get(f, f): self._take(f, pos) for f in fields})
+        return joined[pos >= 0] if how == "inner" else joined
+
+    def _take(self, field, pos):
+        values = self.frame[field].to_numpy(dtype=object)
+        out = values[np.where(pos >= 0, pos, 0)] if len(values) else np.full(len(pos), None, dtype=object)
+        out[pos < 0] = None
+        return out
+
+    def to_dict(self, field):
+        """{key: field}."""
+        return self.frame[field].to_dict()
+
+    def get(self, key):
+        """The dimension row for key as a dict, or None."""
+        pos = self.frame.index.get_indexer([key])[0]
+        return None if pos < 0 else self.frame.iloc[pos].to_dict()
+
+    def keys_where(self, **conditions):
+        """Keys whose fields equal the given values (a callable tests the value instead)."""
+        mask = np.ones(len(self.frame), dtype=bool)
+        for field, wanted in conditions.items():
+            column = self.frame[field]
+            mask &= column.map(wanted).astype(bool).to_numpy() if callable(wanted) else (column == wanted).to_numpy()
+        return self.frame.index[mask].tolist()
+
+
+def _read(db, name):
+    key, fields = DIMENSIONS[name]
+    projection = {"_id": 0, key: 1, **{f: 1 for f in fields}} if key != "_id" else {f: 1 for f in fields}
+    df = find_frame(db[name], {}, projection).reindex(columns=[key] + fields)
+    df = df.drop_duplicates(subset=key).set_index(key)
+    return Dimension(name, df.astype(object).where(df.notna(), None))
+
+
+_loaded = {}  # (db name, dimension) -> (version, loaded_at, Dimension)
+_lock = threading.Lock()
+
+
+def dimension(db, name):
+    """The Dimension for the current data version, shared by every page in the process."""
+    version = get_versions().get(name, 0)
+    slot = (db.name, name)
+    with _lock:
+        cached = _loaded.get(slot)
+        if cached and cached[0] == version and time.time() - cached[1] < DIMENSION_MAX_AGE:
+            return cached[2]
+
+    loaded = _read(db, name)
+    with _lock:
+        _loaded[slot] = (version, time.time(), loaded)
+    return loaded
+
+
+def semester_labels(db):
+    """{SemesterID: "Semester - SchoolYear"}, newest first, for the semester selectboxes."""
+    frame = dimension(db, "semesters").frame
+    ordered = sorted(
+        frame.itertuples(),
+        key=lambda s: (s.SchoolYear or 0, SEMESTER_ORDER.get(s.Semester, -1)),
+        reverse=True,
+    )
+    return {s.Index: f"{s.Semester} - {s.SchoolYear}" for s in ordered}
@@ -0,0 +1,201 @@
+# helpers/grade_fact_helper.py
+# One long-format row per (student, semester, subject) instead of the parallel
+# SubjectCodes / Grades / Teachers / Status arrays in `grades`. Built once per
+# data version and shared by every report in report_helper.
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pandas as pd
+
+from helpers.cache_helper import cache_meta, get_versions
+from helpers.dimension_helper import dimension
+from helpers.ingest_helper import find_frame
+from helpers.pipeline_helper import dimension_match
+
+FACT_COLUMNS = [
+    "StudentID", "SemesterID", "SchoolYear", "Semester", "SubjectCode",
+    "Teacher", "Grade", "Status", "Course", "YearLevel",
+]
+CATEGORY_COLUMNS = ["Semester", "SubjectCode", "Teacher", "Status", "Course"]
+
+# Server-side copy maintained by helpers/grade_facts_job.py
+FACTS_COLLECTION = "grade_facts"
+JOB_STATE_COLLECTION = "maintenance_state"
+FACT_DIMENSIONS = {  # collection copied into every fact row -> (fact key, copied fields)
+    "students": ("StudentID", ["Name", "Course", "YearLevel"]),
+    "semesters": ("SemesterID", ["SchoolYear", "Semester"]),
+}
+
+
+def _pad(values, n):
+    """values[:n], padded with None (arrays in a grade doc can be shorter than SubjectCodes)."""
+    values = values if isinstance(values, list) else []
+    return values[:n] + [None] * (n - len(values[:n]))
+
+
+def explode_grade_docs(docs):
+    """
+    Flattens grade documents into columns, one entry per SubjectCodes position.
+    Returns a dict of lists: StudentID, SemesterID, SubjectCode, Teacher, Grade, Status.
+    """
+    cols = {"StudentID": [], "SemesterID": [], "SubjectCode": [], "Teacher": [], "Grade": [], "Status": []}
+    for doc in docs:
+        codes = doc.get("SubjectCodes")
+        if not isinstance(codes, list) or not codes:
+            continue
+        n = len(codes)
+        cols["StudentID"].extend([doc.get("StudentID")] * n)
+        cols["SemesterID"].extend([doc.get("SemesterID")] * n)
+        cols["SubjectCode"].extend(codes)
+        cols["Teacher"].extend(_pad(doc.get("Teachers"), n))
+        cols["Grade"].extend(_pad(doc.get("Grades"), n))
+        cols["Status"].extend(_pad(doc.get("Status"), n))
+    return cols
+
+
+def build_grade_facts(grade_docs, students, semesters):
+    """
+    grade_docs: iterable of grade documents
+    students:   Dimension with Course, YearLevel
+    semesters:  Dimension with SchoolYear, Semester
+    """
+    df = pd.DataFrame(explode_grade_docs(grade_docs))
+    if df.empty:
+        return pd.DataFrame({col: pd.Series(dtype="object") for col in FACT_COLUMNS})
+
+    # --- Join the small dimensions (cached, see helpers/dimension_helper.py) ---
+    df = semesters.join(df, on="SemesterID", fields=["SchoolYear", "Semester"])
+    df = students.join(df, on="StudentID", fields=["Course", "YearLevel"])
+
+    return _typed(df)
+
+
+def _typed(df):
+    """Shared dtypes for both fact sources: numeric Grade, Int64 years, categorical labels."""
+    for col in FACT_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df["Grade"] = pd.to_numeric(df["Grade"], errors="coerce")
+    df["SchoolYear"] = pd.to_numeric(df["SchoolYear"], errors="coerce").astype("Int64")
+    df["YearLevel"] = pd.to_numeric(df["YearLevel"], errors="coerce").astype("Int64")
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+
+    return df[FACT_COLUMNS]
+
+
+def dimension_versions():
+    """Current versions of the FACT_DIMENSIONS collections (recorded by grade_facts_job)."""
+    versions = get_versions()
+    return {name: versions.get(name, 0) for name in FACT_DIMENSIONS}
+
+
+def facts_collection_ready(db):
+    """
+    True when grade_facts_job's last run covers the current data: no grade
+    above its watermark, none modified after its sync, the same number of
+    grade documents and no students / semesters change since. Otherwise callers build the facts from grades.
+    """
+    state = db[JOB_STATE_COLLECTION].find_one({"_id": FACTS_COLLECTION})
+    if state is None or state.get("versions") != dimension_versions():
+        return False
+    if db.grades.estimated_document_count() != state.get("count"):
+        return False  # grade documents inserted or deleted since
+    top = db.grades.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if top is not None and (state.get("watermark") is None or top["_id"] > state["watermark"]):
+        return False
+    newest = db.grades.find_one({"LastModified": {"$ne": None}}, {"LastModified": 1}, sort=[("LastModified", -1)])
+    return newest is None or newest["LastModified"] <= state["synced_at"]
+
+
+def read_facts_collection(db, query=None):
+    """Fact rows straight from the maintained collection (no client-side explode or joins)."""
+    projection = {"_id": 0, **{col: 1 for col in FACT_COLUMNS}}
+    df = find_frame(db[FACTS_COLLECTION], query, projection)
+    if df.empty:
+        return pd.DataFrame({col: pd.Series(dtype="object") for col in FACT_COLUMNS})
+    return _typed(df)
+
+
+@cache_meta(collections=("grades", "students", "semesters"))
+def get_grade_facts(db):
+    """
+    The exploded grade-fact table for the current data version. Read from
+    the grade_facts collection when the maintenance job keeps one,
+    otherwise built here from grades.
+    """
+    if facts_collection_ready(db):
+        return read_facts_collection(db)
+    return _facts_from_grades(db, {})
+
+
+def _facts_from_grades(db, query):
+    grade_docs = db.grades.find(
+        query, {"_id": 0, "StudentID": 1, "SemesterID": 1, "SubjectCodes": 1, "Grades": 1, "Teachers": 1, "Status": 1}
+    )
+    return build_grade_facts(grade_docs, dimension(db, "students"), dimension(db, "semesters"))
+
+
+def select_facts(db, school_year=None, semester=None, course=None, joined=("semester",)):
+    """
+    filter_facts over only the grades the filters can match: the filters are
+    resolved to SemesterID / StudentID sets first and only those grade
+    documents (or grade_facts rows) are read. Unfiltered calls share the
+    cached get_grade_facts table.
+    """
+    if not (school_year or semester or course):
+        return filter_facts(get_grade_facts(db), joined=joined)
+
+    match = dimension_match(db, school_year, semester, course)
+    if facts_collection_ready(db):
+        facts = read_facts_collection(db, match)
+    else:
+        facts = _facts_from_grades(db, match)
+    return filter_facts(facts, school_year, semester, course, joined=joined)
+
+
+def filter_facts(facts, school_year=None, semester=None, course=None, joined=("semester",)):
+    """
+    Applies the usual report filters. joined lists the dimensions that must
+    match (the old pipelines dropped rows whose $lookup found nothing).
+    """
+    mask = pd.Series(True, index=facts.index)
+    if "semester" in joined:
+        mask &= facts["Semester"].notna()
+    if "student" in joined:
+        mask &= facts["Course"].notna()
+    if school_year:
+        mask &= facts["SchoolYear"] == int(school_year)
+    if semester:
+        mask &= facts["Semester"] == str(semester)
+    if course:
+        mask &= facts["Course"] == course
+    return facts[mask.fillna(False)]
+
+
+def per_record(facts):
+    """
+    One row per grade document (student x semester): the mean grade and
+    subject count, as the old pipelines computed with {"$avg": "$Grades"}.
+    """
+    graded = facts[facts["Grade"].notna()].assign(Failed=lambda d: d["Grade"] < 75)
+    return (
+        graded.groupby(["StudentID", "SemesterID"], observed=True, sort=False)
+        .agg(
+            SchoolYear=("SchoolYear", "first"),
+            Semester=("Semester", "first"),
+            Course=("Course", "first"),
+            YearLevel=("YearLevel", "first"),
+            Average=("Grade", "mean"),
+            Taken=("Grade", "size"),
+            Failures=("Failed", "sum"),
+        )
+        .reset_index()
+    )
+
+
+def plain(df):
+    """Category columns back to plain values, for the DataFrames reports hand to the UI."""
+    cats = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    return df.astype({col: "object" for col in cats}) if cats else df
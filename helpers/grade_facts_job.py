@@ -0,0 +1,174 @@
+# helpers/grade_facts_job.py
+# Maintains the grade_facts collection: one document per student x subject x
+# semester with the student and semester fields copied in, written by the
+# server with $merge. After the first (full) run only grade documents that
+# were inserted (_id above the last watermark) or modified (LastModified
+# since the last run) are re-flattened, plus the grade documents of students /
+# semesters that changed (their version moved) and the facts of deleted grade
+# documents are dropped (the grades count moved). The grade_stats_cube collection is
+# rebuilt afterwards whenever it is behind. Schedule it after data loads:
+#
+#    python helpers/grade_facts_job.py            # incremental
+#    python helpers/grade_facts_job.py --full     # rebuild, also drops facts of deleted grades
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING
+
+from helpers.cache_helper import bump_version
+from helpers.db_helper import get_db
+from helpers.grade_fact_helper import FACT_DIMENSIONS, FACTS_COLLECTION, JOB_STATE_COLLECTION, dimension_versions
+from helpers.pipeline_helper import unwind_aligned
+from helpers.stats_cube_helper import CUBE_COLLECTION, cube_up_to_date, refresh_stats_cube
+
+BATCH_SIZE = 5000  # changed grade ids per $merge run
+SYNC_OVERLAP = timedelta(minutes=5)  # re-read a little history to cover clock skew
+
+FACT_INDEXES = [
+    [("GradeID", ASCENDING)],
+    [("SubjectCode", ASCENDING), ("SemesterID", ASCENDING)],
+    [("SemesterID", ASCENDING), ("Teacher", ASCENDING)],
+    [("StudentID", ASCENDING), ("SemesterID", ASCENDING)],
+    [("SchoolYear", ASCENDING), ("Semester", ASCENDING)],
+    [("Course", ASCENDING)],
+]
+
+
+def fact_pipeline(match, run_at):
+    """Flattens the grade documents selected by match and $merges them into grade_facts."""
+    return [
+        {"$match": match},
+        *unwind_aligned(),  # one fact per SubjectCodes entry
+        {"$lookup": {"from": "students", "localField": "StudentID", "foreignField": "_id", "as": "student"}},
+        {"$unwind": {"path": "$student", "preserveNullAndEmptyArrays": True}},
+        {"$lookup": {"from": "semesters", "localField": "SemesterID", "foreignField": "_id", "as": "sem"}},
+        {"$unwind": {"path": "$sem", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "_id": {"GradeID": "$_id", "Position": "$Position"},
+            "GradeID": "$_id",
+            "Position": 1,
+            "StudentID": 1,
+            "SemesterID": 1,
+            "SubjectCode": 1,
+            "Grade": 1,
+            "Teacher": 1,
+            "Status": 1,
+            "SchoolYear": "$sem.SchoolYear",
+            "Semester": "$sem.Semester",
+            "Name": "$student.Name",
+            "Course": "$student.Course",
+            "YearLevel": "$student.YearLevel",
+            "RefreshedAt": {"$literal": run_at},
+        }},
+        {"$merge": {"into": FACTS_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def _changed_ids(db, state):
+    query = {"LastModified": {"$gte": state["synced_at"] - SYNC_OVERLAP}}
+    if state.get("watermark") is not None:
+        query = {"$or": [{"_id": {"$gt": state["watermark"]}}, query]}
+    return [doc["_id"] for doc in db.grades.find(query, {"_id": 1})]
+
+
+def _stale_dimension_ids(db, state, versions):
+    """
+    Grade ids whose facts may carry outdated student / semester fields. Only
+    dimensions whose version moved since the last run are looked at: their
+    documents modified since the last sync when they carry LastModified,
+    otherwise every copied value is compared with the collection.
+    """
+    ids = set()
+    for name, (key, fields) in FACT_DIMENSIONS.items():
+        if state.get("versions", {}).get(name) == versions[name]:
+            continue
+        if db[name].find_one({"LastModified": {"$exists": True}}, {"_id": 1}) is not None:
+            since = state["synced_at"] - SYNC_OVERLAP
+            stale = [doc["_id"] for doc in db[name].find({"LastModified": {"$gte": since}}, {"_id": 1})]
+        else:
+            current = {doc["_id"]: tuple(doc.get(f) for f in fields) for doc in db[name].find({}, dict.fromkeys(fields, 1))}
+            missing = (None,) * len(fields)
+            copied = db[FACTS_COLLECTION].aggregate([
+                {"$group": {"_id": {"key": f"${key}", **{f: f"${f}" for f in fields}}}},
+            ])
+            stale = [
+                doc["_id"].get("key") for doc in copied
+                if tuple(doc["_id"].get(f) for f in fields) != current.get(doc["_id"].get("key"), missing)
+            ]
+        if stale:
+            ids.update(doc["_id"] for doc in db.grades.find({key: {"$in": stale}}, {"_id": 1}))
+    return ids
+
+
+def _drop_deleted(db):
+    """Removes the facts of grade documents that no longer exist. Returns how many grade ids were dropped."""
+    live = {doc["_id"] for doc in db.grades.find({}, {"_id": 1})}
+    gone = [grade_id for grade_id in db[FACTS_COLLECTION].distinct("GradeID") if grade_id not in live]
+    if gone:
+        db[FACTS_COLLECTION].delete_many({"GradeID": {"$in": gone}})
+    return len(gone)
+
+
+def refresh_grade_facts(db, full=False, batch_size=BATCH_SIZE):
+    """Brings grade_facts up to date. Returns the number of grade documents re-flattened (None = all)."""
+    state = None if full else db[JOB_STATE_COLLECTION].find_one({"_id": FACTS_COLLECTION})
+    versions = dimension_versions()  # students / semesters as of this run
+    run_at = datetime.utcnow()
+    top = db.grades.find_one({}, {"_id": 1}, sort=[("_id", -1)])  # read before flattening, so nothing is skipped
+    count = db.grades.estimated_document_count()
+
+    facts = db[FACTS_COLLECTION]
+    for keys in FACT_INDEXES:
+        facts.create_index(keys)
+
+    if state is None:
+        db.grades.aggregate(fact_pipeline({}, run_at))
+        facts.delete_many({"RefreshedAt": {"$lt": run_at}})  # deleted grade docs / removed subjects
+        refreshed = None
+    else:
+        ids = sorted(set(_changed_ids(db, state)) | _stale_dimension_ids(db, state, versions))
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            db.grades.aggregate(fact_pipeline({"_id": {"$in": chunk}}, run_at))
+            facts.delete_many({"GradeID": {"$in": chunk}, "RefreshedAt": {"$lt": run_at}})  # subjects removed
+        refreshed = len(ids)
+
+        # Deletes leave no marker: only when the count does not add up are the ids compared
+        watermark = state.get("watermark")
+        inserted = db.grades.count_documents({"_id": {"$gt": watermark}}) if watermark is not None else count
+        if count != state.get("count", -1) + inserted:
+            refreshed += _drop_deleted(db)
+
+    db[JOB_STATE_COLLECTION].replace_one(
+        {"_id": FACTS_COLLECTION},
+        {"_id": FACTS_COLLECTION, "watermark": top["_id"] if top else None, "synced_at": run_at,
+         "versions": versions, "count": count},
+        upsert=True,
+    )
+    if refreshed != 0:
+        bump_version("grades")  # cached reports read grade_facts
+    return refreshed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the grade_facts collection.")
+    parser.add_argument("--full", action="store_true", help="re-flatten every grade document")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="grade ids per $merge run")
+    args = parser.parse_args()
+
+    db = get_db("batch")
+    started = time.time()
+    refreshed = refresh_grade_facts(db, full=args.full, batch_size=args.batch_size)
+    what = "all grade documents" if refreshed is None else f"{refreshed} grade documents"
+    print(f"✅ grade_facts refreshed ({what}) in {time.time() - started:.1f}s")
+
+    # The stats cube is built here, never by the pages that read it
+    if not cube_up_to_date(db):
+        started = time.time()
+        refresh_stats_cube(db)
+        print(f"✅ {CUBE_COLLECTION} rebuilt in {time.time() - started:.1f}s")
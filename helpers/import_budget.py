@@ -0,0 +1,85 @@
+# helpers/import_budget.py
+# Checks that the modules app.py pulls in import quickly and without touching
+# the network (no connections, DNS lookups or queries at import time). Each
+# run happens in a fresh interpreter with sockets disabled:
+#
+#    python helpers/import_budget.py                 # default budget
+#    python helpers/import_budget.py --budget-ms 2500
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import json
+import subprocess
+
+IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", 2500))  # whole set, cold; about 1.5 s today
+
+# What `streamlit run app.py` imports before the first page renders
+APP_MODULES = [
+    "helpers.cache_helper",
+    "helpers.db_helper",
+    "helpers.index_manager",
+    "helpers.merged_data_helper",
+    "helpers.stats_cube_helper",
+    "helpers.report_helper",
+    "helpers.registrar_main_report_helper",
+    "helpers.faculty_helper",
+    "login",
+    "student",
+    "faculty",
+    "student_progress_tracker",
+]
+
+_PROBE = r"""
+import json, socket, sys, time
+
+def _no_network(*args, **kwargs):
+    raise RuntimeError("network access during import")
+
+socket.socket.connect = _no_network
+socket.getaddrinfo = _no_network
+
+timings = []
+for name in sys.argv[1:]:
+    started = time.perf_counter()
+    try:
+        __import__(name)
+        error = None
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+    timings.append((name, (time.perf_counter() - started) * 1000, error))
+print(json.dumps(timings))
+"""
+
+
+def measure(modules=APP_MODULES):
+    """[(module, ms, error)] for importing modules in order in a fresh, offline interpreter."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root, MONGO_USER="budget", MONGO_PASS="budget")
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE, *modules],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the app modules.")
+    parser.add_argument("--budget-ms", type=int, default=IMPORT_BUDGET_MS, help="limit for the whole set")
+    args = parser.parse_args()
+
+    timings = measure()
+    for name, ms, error in timings:
+        print(f"  {'❌' if error else '  '} {name:<40} {ms:8.1f} ms{'  ' + error if error else ''}")
+    total = sum(ms for _, ms, _ in timings)
+    failed = [name for name, _, error in timings if error]
+    print(f"Total {total:.0f} ms (budget {args.budget_ms} ms)")
+
+    if failed:
+        print(f"❌ {len(failed)} modules failed to import offline")
+        sys.exit(1)
+    if total > args.budget_ms:
+        print("❌ Import budget exceeded")
+        sys.exit(1)
+    print("✅ Within budget, no network access at import")
@@ -0,0 +1,141 @@
+# helpers/index_manager.py
+# Declares the indexes the hot queries need, creates them (idempotently) and
+# checks with explain() that every registered query shape is served by one.
+# The app calls ensure_indexes once per process; from a shell:
+#
+#    python helpers/index_manager.py             # create missing indexes, then verify
+#    python helpers/index_manager.py --verify    # only report the query plans
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+# {collection: [keys, ...]}. A compound index also serves queries on its
+# leading field, so (StudentID, SemesterID) covers StudentID lookups and
+# (Teachers, SemesterID) the teacher-only ones. Teachers and SubjectCodes are
+# arrays (multikey); MongoDB cannot put two array fields in one index.
+REQUIRED_INDEXES = {
+    "grades": [
+        [("StudentID", ASCENDING), ("SemesterID", ASCENDING)],
+        [("Teachers", ASCENDING), ("SemesterID", ASCENDING)],
+        [("SemesterID", ASCENDING), ("SubjectCodes", ASCENDING)],
+        [("SubjectCodes", ASCENDING)],
+        [("LastModified", ASCENDING)],  # incremental syncs (merged_data_helper, grade_facts_job)
+    ],
+    "students": [
+        [("Course", ASCENDING)],
+    ],
+    "curriculum": [
+        [("programCode", ASCENDING)],
+    ],
+    "userAccounts": [
+        [("username", ASCENDING)],
+    ],
+}
+
+# Representative query shapes, one per hot call site. Values only need the
+# right type: the planner picks an index by shape.
+QUERY_SHAPES = [
+    ("login", "userAccounts", "find", {"username": "admin"}),
+    ("grade doc (faculty_helper)", "grades", "find", {"StudentID": 0, "SemesterID": 0}),
+    ("student grades (data_helper)", "grades", "find", {"StudentID": 0}),
+    ("students in list (registrar)", "grades", "find", {"StudentID": {"$in": [0, 1]}}),
+    ("teacher + semester (submission / intervention)", "grades", "aggregate",
+     [{"$match": {"Teachers": "", "SemesterID": 0}}]),
+    ("teacher grades (heatmap)", "grades", "find", {"Teachers": ""}),
+    ("subject grades (faculty_helper)", "grades", "aggregate", [{"$match": {"SubjectCodes": ""}}]),
+    ("semester grades (faculty_helper)", "grades", "aggregate", [{"$match": {"SemesterID": 0}}]),
+    ("changed grades (sync)", "grades", "find", {"LastModified": {"$gte": 0}}),
+    ("students by course", "students", "find", {"Course": ""}),
+    ("curriculum by program", "curriculum", "find", {"programCode": ""}),
+]
+
+
+def ensure_indexes(db, required=REQUIRED_INDEXES):
+    """Creates every declared index that is missing. Returns the names created or confirmed."""
+    names = []
+    for collection, specs in required.items():
+        for keys in specs:
+            try:
+                names.append(db[collection].create_index(keys))
+            except OperationFailure as e:
+                # e.g. an index on the same keys exists under another name / options
+                print(f"[WARN] Index {collection}{keys} not created: {e}")
+    return names
+
+
+# ------------------------------
+# Plan verification
+# ------------------------------
+
+def _explain(db, collection, kind, query):
+    if kind == "find":
+        return db[collection].find(query).explain()
+    return db.command("explain", {"aggregate": collection, "pipeline": query, "cursor": {}},
+                      verbosity="queryPlanner")
+
+
+def _find_key(node, key):
+    """Every value stored under key anywhere in an explain document."""
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k == key:
+                yield v
+            else:
+                yield from _find_key(v, key)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _find_key(item, key)
+
+
+def plan_stages(explain):
+    """The stage names of the winning plan(s) only (rejected plans are ignored)."""
+    stages = set()
+    for plan in _find_key(explain, "winningPlan"):
+        stages.update(s for s in _find_key(plan, "stage") if isinstance(s, str))
+    return stages
+
+
+def verify_queries(db, shapes=QUERY_SHAPES):
+    """
+    Runs explain() for every registered shape and prints one line per query.
+    Returns [(name, collection, stages)] for the ones that scan the whole collection.
+    """
+    existing = set(db.list_collection_names())
+    flagged = []
+    for name, collection, kind, query in shapes:
+        if collection not in existing:
+            print(f"  -    {name:<48} {collection} (no collection)")
+            continue
+        try:
+            stages = plan_stages(_explain(db, collection, kind, query))
+        except Exception as e:
+            print(f"  ?    {name:<48} explain failed: {e}")
+            continue
+        scan = "COLLSCAN" in stages
+        if scan:
+            flagged.append((name, collection, stages))
+        print(f"  {'❌' if scan else '✅'}  {name:<48} {collection}: {', '.join(sorted(stages))}")
+    return flagged
+
+
+if __name__ == "__main__":
+    from helpers.cache_warmup import get_db
+
+    parser = argparse.ArgumentParser(description="Create the required MongoDB indexes and check query plans.")
+    parser.add_argument("--verify", action="store_true", help="only explain the registered queries")
+    args = parser.parse_args()
+
+    db = get_db()
+    if not args.verify:
+        created = ensure_indexes(db)
+        print(f"✅ {len(created)} indexes in place")
+    flagged = verify_queries(db)
+    if flagged:
+        print(f"❌ {len(flagged)} hot queries do a COLLSCAN")
+        sys.exit(1)
+    print("✅ No hot query does a COLLSCAN")
@@ -0,0 +1,166 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/ingest_helper.py
+# Cursor -> DataFrame without pd.DataFrame(list(cursor)). Documents are read
+# INGEST_BATCH at a time and each batch is converted straight into typed Arrow
+# arrays of the collection's declared schema, so at most one batch is alive as
+# Python dicts; the Arrow columns are turned into pandas one at a time at the
+# end.
+#
+#    df = find_frame(db.students, {"Course": course}, {"Name": 1, "YearLevel": 1})
+#    df = read_frame(db.grades.aggregate(pipeline), schema_for("students"))
+#
+# Fields that are not declared, or whose values do not fit the declared type
+# (an ObjectId _id, a fractional grade), are kept as Python values, so the
+# frame holds the same data as pd.DataFrame(list(cursor)).
+
+import itertools
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", 5000))  # documents decoded per step
+
+# collection -> declared field types
+SCHEMAS = {
+    "grades": {
+        "_id": "int64", "StudentID": "int64", "SemesterID": "int64", "SchoolYear": "int64",
+        "SubjectCodes": "list<string>", "Grades": "list<int64>", "Teachers": "list<string>", "Status": "list<string>",
+    },
+    "students": {"_id": "int64", "Name": "string", "Course": "string", "YearLevel": "int64"},
+    "semesters": {"_id": "int64", "Semester": "string", "SchoolYear": "int64"},
+    "subjects": {"_id": "string", "Description": "string", "Units": "int64", "Teacher": "string"},
+    "curriculum": {"programCode": "string", "programName": "string", "curriculumYear": "string"},
+    "userAccounts": {"username": "string", "fullName": "string", "role": "string"},
+    "grade_facts": {
+        "StudentID": "int64", "SemesterID": "int64", "SchoolYear": "int64", "Semester": "string",
+        "SubjectCode": "string", "Teacher": "string", "Grade": "float64", "Status": "string",
+        "Course": "string", "YearLevel": "int64",
+    },
+}
+
+
+def _arrow_type(name):
+    if name.startswith("list<"):
+        return pa.list_(_arrow_type(name[5:-1]))
+    return pa.type_for_alias(name)
+
+
+def schema_for(collection, projection=None):
+    """
+    The declared pa.schema for collection, narrowed to the fields a find()
+    projection returns (None when nothing is declared or pyarrow is missing).
+    """
+    declared = SCHEMAS.get(collection)
+    if not declared or not HAS_ARROW:
+        return None
+    fields = dict(declared)
+    if projection:
+        included = {k for k, v in projection.items() if v and k != "_id"}
+        if included:
+            fields = {k: v for k, v in fields.items() if k in included or (k == "_id" and projection.get("_id", 1))}
+        else:
+            fields = {k: v for k, v in fields.items() if projection.get(k, 1)}
+    return pa.schema([(name, _arrow_type(t)) for name, t in fields.items()])
+
+
+# ------------------------------
+# Reading cursors
+# ------------------------------
+
+_CONVERT_ERRORS = (TypeError, ValueError, OverflowError) + ((pa.ArrowException,) if HAS_ARROW else ())
+
+
+def _typed_array(values, kind):
+    """
+    values as an Arrow array of the declared type. Arrow's own conversion would
+    truncate 88.5 into an int64, so the values are read with their natural
+    type and only accepted when that is the declared one (or all nulls).
+    """
+    array = pa.array(values)
+    if array.type == kind:
+        return array
+    if pa.types.is_null(array.type) or (pa.types.is_list(array.type) and pa.types.is_null(array.type.value_type)):
+        return array.cast(kind)
+    raise TypeError(f"{array.type} values where {kind} is declared")
+
+
+def _python_values(chunks, rows):
+    """The values of a column's Arrow chunks as a list (rows Nones when there are none yet)."""
+    if not chunks:
+        return [None] * rows
+    return [value for chunk in chunks for value in chunk.to_pylist()]
+
+
+def _to_series(chunks, kind):
+    """Arrow chunks -> pandas column; lists come back as Python lists like the documents had."""
+    column = pa.chunked_array(chunks, type=kind)
+    if pa.types.is_list(kind):
+        return pd.Series(column.to_pylist(), dtype=object)
+    return column.to_pandas()
+
+
+def read_frame(cursor, schema=None, batch_size=INGEST_BATCH):
+    """
+    DataFrame of every document in cursor, read batch_size documents at a
+    time. Declared fields (schema) are stored as typed Arrow arrays while
+    reading, the rest as plain value lists. Columns come in first-seen order
+    and a field missing from every document is left out, as with
+    pd.DataFrame(list(cursor)).
+    """
+    if not HAS_ARROW:
+        return pd.DataFrame(list(cursor))
+
+    types = {field.name: field.type for field in schema} if schema is not None else {}
+    seen = {}     # field -> None, in first-seen order
+    arrow = {}    # field -> [pa.Array per batch]
+    objects = {}  # field -> [values]
+    rows = 0
+
+    cursor = iter(cursor)
+    while True:
+        docs = list(itertools.islice(cursor, batch_size))
+        if not docs:
+            break
+        for doc in docs:
+            seen.update(dict.fromkeys(doc))
+
+        for field in seen:
+            values = [doc.get(field) for doc in docs]
+            if field in types and field not in objects:
+                try:
+                    chunk = _typed_array(values, types[field])
+                except _CONVERT_ERRORS:
+                    # Does not fit the declared type: keep this field as Python values
+                    objects[field] = _python_values(arrow.pop(field, None), rows)
+                else:
+                    arrow.setdefault(field, [pa.nulls(rows, types[field])] if rows else []).append(chunk)
+                    continue
+            objects.setdefault(field, [None] * rows).extend(values)
+        rows += len(docs)
+        del docs
+
+    if not seen:
+        return pd.DataFrame()
+
+    columns = {}
+    for field in seen:
+        if field in arrow:
+            columns[field] = _to_series(arrow.pop(field), types[field])  # frees the Arrow buffers as it goes
+        else:
+            columns[field] = pd.Series(objects.pop(field))
+    return pd.DataFrame(columns)
+
+
+def find_frame(collection, filter=None, projection=None, schema=None, batch_size=INGEST_BATCH, **kwargs):
+    """read_frame over collection.find(filter, projection), typed by the collection's declared schema."""
+    if schema is None:
+        schema = schema_for(collection.name, projection)
+    cursor = collection.find(filter or {}, projection, **kwargs).batch_size(batch_size)
+    return read_frame(cursor, schema, batch_size)
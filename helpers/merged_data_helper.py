@@ -0,0 +1,177 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/merged_data_helper.py
+# Incremental loader for app.df_merged: grade documents joined with their
+# student and semester. The raw grade rows are kept on disk together with a
+# high-water mark on grades._id and the time of the last sync, so a reload
+# only fetches documents inserted (_id > watermark) or modified
+# (LastModified >= last sync) since then. load_compact applies the same
+# delta to the CompactGrades it built last, instead of encoding every row
+# again.
+
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from helpers.cache_helper import CACHE_DIR, DiskStore, get_versions, single_flight
+from helpers.compact_grades_helper import CompactGrades
+from helpers.dimension_helper import dimension
+from helpers.ingest_helper import find_frame
+
+SNAPSHOT_NAME = "merged_grades"
+SNAPSHOT_STORE = DiskStore(os.path.join(CACHE_DIR, "snapshots"))
+SYNC_OVERLAP = timedelta(minutes=5)  # re-read a little history to cover clock skew
+
+GRADE_FIELDS = ["_id", "StudentID", "SemesterID", "SubjectCodes", "Grades", "Teachers", "SchoolYear"]
+MERGED_COLUMNS = [
+    "StudentID", "SemesterID", "SubjectCodes", "Grades", "Teachers", "SchoolYear",
+    "SemesterSchoolYear", "Name", "Course", "YearLevel",
+]
+
+
+def _fetch(db, query):
+    projection = {field: 1 for field in GRADE_FIELDS}
+    df = find_frame(db.grades, query, projection)
+    for col in GRADE_FIELDS:
+        if col not in df.columns:
+            df[col] = None
+    return df[GRADE_FIELDS]
+
+
+def _patch(rows, changed):
+    """Replaces rows whose _id is in changed and appends the new ones."""
+    if changed.empty:
+        return rows
+    if rows.empty:
+        return changed.reset_index(drop=True)
+    kept = rows[~rows["_id"].isin(changed["_id"])]
+    return pd.concat([kept, changed], ignore_index=True)
+
+
+def _reconcile(db, rows):
+    """
+    Deletes leave no marker, and inserts whose _id sorts below the watermark
+    (e.g. an ObjectId after integer ids) are not picked up by $gt. Both show
+    up as a row count that differs from the collection's, and only then are
+    the snapshot's ids compared with the live ones (an _id-only read).
+    Returns (rows, whether anything was dropped or added).
+    """
+    if len(rows) == db.grades.estimated_document_count():
+        return rows, False
+    live = {doc["_id"] for doc in db.grades.find({}, {"_id": 1})}
+    stale = ~rows["_id"].isin(live) if not rows.empty else pd.Series(dtype=bool)
+    missing = live.difference(rows["_id"]) if not rows.empty else live
+    if not stale.any() and not missing:
+        return rows, False
+    rows = rows[~stale] if not rows.empty else rows
+    if missing:
+        rows = _patch(rows, _fetch(db, {"_id": {"$in": list(missing)}}))
+    return rows.reset_index(drop=True), True
+
+
+def sync_grade_delta(db, store=SNAPSHOT_STORE):
+    """
+    Brings the on-disk snapshot of raw grade rows up to date. Returns
+    (rows, synced_at, delta) where delta describes the change from the
+    previous snapshot: {"since": its synced_at, "keep": mask over its rows,
+    "added": the rows appended after the kept ones}. delta is None after a
+    full read (first call or missing snapshot).
+    """
+    with single_flight(SNAPSHOT_NAME):
+        hit, snapshot = store.get(SNAPSHOT_NAME)
+        started = datetime.now(timezone.utc)
+
+        if not hit:
+            print("Func: sync_grade_rows - full load")
+            rows, delta = _fetch(db, {}), None
+        else:
+            previous = snapshot["rows"]
+            query = {"LastModified": {"$gte": snapshot["synced_at"] - SYNC_OVERLAP}}
+            if snapshot["watermark"] is not None:
+                query = {"$or": [{"_id": {"$gt": snapshot["watermark"]}}, query]}
+            changed = _fetch(db, query)
+            print(f"Func: sync_grade_rows - {len(changed)} new/changed")
+            rows, reconciled = _reconcile(db, _patch(previous, changed))
+            if changed.empty and not reconciled:
+                # nothing to write; the next sync reads from the same synced_at
+                return rows, snapshot["synced_at"], {"since": snapshot["synced_at"], "keep": None, "added": rows.iloc[:0]}
+
+            # rows is previous minus changed / deleted ids, then changed, then missing inserts
+            keep = (~previous["_id"].isin(changed["_id"]) & previous["_id"].isin(rows["_id"])).to_numpy()
+            delta = {"since": snapshot["synced_at"], "keep": keep, "added": rows.iloc[int(keep.sum()):]}
+
+        try:
+            watermark = rows["_id"].max() if not rows.empty else None
+        except TypeError:
+            watermark = snapshot["watermark"] if hit else None  # mixed _id types, keep the old mark
+        store.set(SNAPSHOT_NAME, {"rows": rows, "watermark": watermark, "synced_at": started})
+        return rows, started, delta
+
+
+def sync_grade_rows(db, store=SNAPSHOT_STORE):
+    """Brings the on-disk snapshot of raw grade rows up to date and returns it."""
+    return sync_grade_delta(db, store)[0]
+
+
+def join_dimensions(rows, students, semesters):
+    """Adds the student / semester columns load_data used to get from $lookup (students, semesters: Dimension)."""
+    df = students.join(rows.drop(columns="_id"), on="StudentID", fields=["Name", "Course", "YearLevel"])
+    df = semesters.join(df, on="SemesterID", fields=["SchoolYear"], rename={"SchoolYear": "SemesterSchoolYear"})
+    df["SchoolYear"] = df["SchoolYear"].fillna(df["SemesterSchoolYear"])
+    return df[MERGED_COLUMNS]
+
+
+def _semesters_map(df):
+    return (
+        df[["SemesterID", "SemesterSchoolYear"]]
+        .dropna()
+        .drop_duplicates()
+        .set_index("SemesterID")["SemesterSchoolYear"]
+        .to_dict()
+    )
+
+
+def load_merged(db):
+    """Returns (df_merged, semesters_map) from the incrementally synced snapshot."""
+    rows = sync_grade_rows(db)
+    df = join_dimensions(rows, dimension(db, "students"), dimension(db, "semesters"))
+    return df, _semesters_map(df)
+
+
+_compact = {"synced_at": None, "dimensions": None, "grades": None, "semesters_map": None}
+
+
+def load_compact(db):
+    """
+    Like load_merged, but df_merged comes back as a CompactGrades. When the
+    CompactGrades built last matches the snapshot the sync started from (and
+    students / semesters did not change), only the delta rows are encoded and
+    concatenated onto it; otherwise it is built from every row.
+    """
+    rows, synced_at, delta = sync_grade_delta(db)
+    versions = get_versions()
+    dimensions = (versions.get("students", 0), versions.get("semesters", 0))
+    students, semesters = dimension(db, "students"), dimension(db, "semesters")
+
+    current = _compact
+    patchable = (
+        delta is not None
+        and current["grades"] is not None
+        and current["synced_at"] == delta["since"]
+        and current["dimensions"] == dimensions
+    )
+    if patchable and delta["keep"] is None:
+        grades, semesters_map = current["grades"], current["semesters_map"]
+    elif patchable:
+        added = join_dimensions(delta["added"], students, semesters)
+        grades = current["grades"].subset(delta["keep"]).concat(CompactGrades.from_frame(added))
+        semesters_map = {**current["semesters_map"], **_semesters_map(added)}
+    else:
+        df = join_dimensions(rows, students, semesters)
+        grades, semesters_map = CompactGrades.from_frame(df), _semesters_map(df)
+
+    grades.index  # build the subject / (semester, subject) index before the first render
+    grades.roster_index  # and the (teacher, subject, semester) roster for the faculty pages
+    _compact.update(synced_at=synced_at, dimensions=dimensions, grades=grades, semesters_map=semesters_map)
+    return grades, semesters_map
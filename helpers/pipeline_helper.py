@@ -0,0 +1,89 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/pipeline_helper.py
+# Aggregation stages for the parallel SubjectCodes / Grades / Teachers / Status
+# arrays of a grade document. Instead of unwinding each array with
+# includeArrayIndex and keeping the rows whose indexes agree (k² or k³
+# intermediate documents for k subjects), the arrays are read position by
+# position into one {Position, SubjectCode, Grade, Teacher, Status} object per
+# subject and unwound once (k documents).
+
+from helpers.dimension_helper import dimension
+
+# output name -> array in the grade document; the first one sets the length
+ALIGNED_FIELDS = {
+    "SubjectCode": "SubjectCodes",
+    "Grade": "Grades",
+    "Teacher": "Teachers",
+    "Status": "Status",
+}
+
+
+def aligned(name):
+    """Reference to a field of the current tuple, for the where= expressions."""
+    return f"$$item.{name}"
+
+
+def aligned_array(fields=ALIGNED_FIELDS, where=None):
+    """
+    Expression: [{Position, <name>: <array>[Position], ...}] with one entry per
+    position of the first array. Shorter arrays leave their field missing.
+    where is an optional expression over aligned(...) that tuples must satisfy.
+    """
+    length_source = next(iter(fields.values()))
+    tuples = {"$map": {
+        "input": {"$range": [0, {"$size": {"$ifNull": [f"${length_source}", []]}}]},
+        "as": "i",
+        "in": {
+            "Position": "$$i",
+            **{name: {"$arrayElemAt": [f"${source}", "$$i"]} for name, source in fields.items()},
+        },
+    }}
+    if where is None:
+        return tuples
+    return {"$filter": {"input": tuples, "as": "item", "cond": where}}
+
+
+def unwind_aligned(fields=ALIGNED_FIELDS, where=None, keep=("StudentID", "SemesterID")):
+    """
+    Stages turning each grade document into one document per subject with
+    _id, the keep fields, Position and the fields of ALIGNED_FIELDS.
+    """
+    names = ["Position", *fields]
+    return [
+        {"$project": {**{k: 1 for k in keep}, "_items": aligned_array(fields, where)}},
+        {"$unwind": "$_items"},
+        {"$project": {**{k: 1 for k in keep}, **{name: f"$_items.{name}" for name in names}}},
+    ]
+
+
+# ------------------------------
+# Dimension filters
+# ------------------------------
+
+def _same_year(value, school_year):
+    try:
+        return int(value) == int(school_year)
+    except (TypeError, ValueError):
+        return False
+
+
+def dimension_match(db, school_year=None, semester=None, course=None):
+    """
+    Resolves filters on semester / student attributes into ID sets and
+    returns a grades query on SemesterID / StudentID ({} when unfiltered).
+    Put it in a leading $match (or find) so only the selected term's or
+    course's grade documents are read and joined.
+    """
+    match = {}
+    if school_year or semester:
+        conditions = {}
+        if school_year:
+            conditions["SchoolYear"] = lambda value: _same_year(value, school_year)
+        if semester:
+            conditions["Semester"] = str(semester)
+        match["SemesterID"] = {"$in": dimension(db, "semesters").keys_where(**conditions)}
+    if course:
+        match["StudentID"] = {"$in": dimension(db, "students").keys_where(Course=course)}
+    return match
@@ -6,16 +6,20 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+import numpy as np
 import pandas as pd
 
-from pymongo import MongoClient
-from functools import wraps
-import hashlib
-import pickle
+from functools import partial
 import time
 # from config.settings import MONGODB_URI
-from helpers.cache_helper import cache_meta, load_checkpoint, save_checkpoint
+from helpers.cache_helper import cache_meta, run_batch_job
+from helpers.dimension_helper import dimension
+from helpers.ingest_helper import find_frame
+from helpers.pipeline_helper import ALIGNED_FIELDS
 
 CACHE_DIR = "./cache"
 
@@ -34,90 +38,40 @@ CACHE_DIR = "./cache"
 
 
 
-@cache_meta()
+@cache_meta(collections=("students",))
 def get_students_batch_checkpoint(db, batch_size=1000):
 
-    CACHE_DIR = "./cache"
-    CHECKPOINT_FILE = os.path.join(CACHE_DIR, "students_checkpoint.pkl")
-
-    # --- Load checkpoint ---
-    if os.path.exists(CHECKPOINT_FILE):
-        with open(CHECKPOINT_FILE, "rb") as f:
-            checkpoint = pickle.load(f)
-        start_index = checkpoint["last_index"]
-        results = checkpoint["results"]
-        print(f"Resuming from batch index {start_index}...")
-    else:
-        start_index, results = 0, []
-
     student_ids = db.students.distinct("_id")
 
-    # --- Process in batches ---
-    for i in range(start_index, len(student_ids), batch_size):
-        batch_ids = student_ids[i:i+batch_size]
-        print(f"Caching students collection: {i+1} - {min(i+batch_size, len(student_ids))}")
-
-        cursor = db.students.find(
+    def fetch(batch_ids):
+        return find_frame(
+            db.students,
             {"_id": {"$in": batch_ids}},
             {"_id": 1, "Name": 1, "Course": 1, "YearLevel": 1}
         )
 
-        batch_df = pd.DataFrame(list(cursor))
-        if not batch_df.empty:
-            results.append(batch_df)
-
-        # --- Save checkpoint ---
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        with open(CHECKPOINT_FILE, "wb") as f:
-            pickle.dump({"last_index": i + batch_size, "results": results}, f)
-
-    if not results:
-        return pd.DataFrame()
-
-    # --- Merge all batches ---
-    final_df = pd.concat(results, ignore_index=True)
-
-    # --- Delete checkpoint after success ---
-    if os.path.exists(CHECKPOINT_FILE):
-        os.remove(CHECKPOINT_FILE)
-
-    return final_df
+    # --- Batches are checkpointed and resumed by the job runner ---
+    return run_batch_job(
+        "students", student_ids, fetch,
+        batch_size=batch_size, collections=("students",)
+    )
 
 
 # ------------------------------
 # 1a. Dean's List
 # ------------------------------
 
-@cache_meta()
+@cache_meta(collections=("students", "grades"))
 def get_deans_list(db, batch_size=1000, top_n=10):
 
-
-    print("Da 1")
     students_df = get_students_batch_checkpoint(db)
     if students_df.empty:
         return pd.DataFrame()
     student_ids = students_df["_id"].tolist()
-    print("Da 2")
-
-    # 🔹 Load checkpoint
-    CHECKPOINT_FILE = os.path.join(CACHE_DIR, "deans_list_checkpoint.pkl")
-    checkpoint = load_checkpoint(CHECKPOINT_FILE=CHECKPOINT_FILE)
-    start_index = checkpoint.get("last_index", 0)
-    results = []
-
-    print(f"Resuming from batch index {start_index}...")
-
-    for i in range(start_index, len(student_ids), batch_size):
-        batch_ids = student_ids[i:i+batch_size]
-        print(f"Processing {i+1} - {min(i+batch_size, len(student_ids))}")
-
-        # --- Fetch students ---
-        students = list(db.students.find(
-            {"_id": {"$in": batch_ids}},
-            {"_id": 1, "Name": 1, "Course": 1, "YearLevel": 1}
-        ))
+    students_by_id = students_df.set_index("_id")
 
-        # --- Fetch grades separately ---
+    def process(batch_ids):
+        # --- Fetch grades for this batch ---
         grades = list(db.grades.find(
             {"StudentID": {"$in": batch_ids}},
             {"StudentID": 1, "Grades": 1}
@@ -130,13 +84,16 @@ def get_deans_list(db, batch_size=1000, top_n=10):
                 grade_map.setdefault(g["StudentID"], []).append(g["Grades"])
 
         # --- Flatten into rows ---
-        for stu in students:
-            student_grades = grade_map.get(stu["_id"], [])
-            for g in student_grades:
+        rows = []
+        for sid in batch_ids:
+            if sid not in grade_map:
+                continue
+            stu = students_by_id.loc[sid]
+            for g in grade_map[sid]:
                 if not g:
                     continue
-                results.append({
-                    "ID": stu["_id"],
+                rows.append({
+                    "ID": sid,
                     "Name": stu.get("Name"),
                     "Prog": stu.get("Course"),
                     "Yr": stu.get("YearLevel"),
@@ -145,31 +102,27 @@ def get_deans_list(db, batch_size=1000, top_n=10):
                     "Low": min(g),
                     "GPA": sum(g) / len(g)
                 })
+        return pd.DataFrame(rows)
 
-        # --- Save checkpoint after each batch ---
-        save_checkpoint(last_index=i + batch_size, results={"last_index": i + batch_size}, CHECKPOINT_FILE=CHECKPOINT_FILE)
-
-    if not results:
+    # 🔹 Checkpointed per batch, resumes after a crash
+    final_df = run_batch_job(
+        "deans_list", student_ids, process,
+        batch_size=batch_size, collections=("students", "grades")
+    )
+    if final_df.empty:
         return pd.DataFrame()
 
-    # Merge all results
-    final_df = pd.DataFrame(results)
-
     # --- Dean’s List filter ---
     final_df = final_df[(final_df["Low"] >= 85) & (final_df["GPA"] >= 90)]
 
     # Sort + Top N
-    final_df.sort_values(by="GPA", ascending=False, inplace=True)
+    final_df = final_df.sort_values(by="GPA", ascending=False)
     final_df = final_df.head(top_n)
 
     # Add rank column
     final_df.index = range(1, len(final_df)+1)
     final_df["#"] = final_df.index
 
-    # 🔹 Delete checkpoint after success
-    if os.path.exists(CHECKPOINT_FILE):
-        os.remove(CHECKPOINT_FILE)
-
     return final_df
 
 
@@ -177,10 +130,8 @@ def get_deans_list(db, batch_size=1000, top_n=10):
 # ------------------------------
 # 1b. Academic Probation
 # ------------------------------
-@cache_meta()
+@cache_meta(collections=("students", "grades"))
 def get_academic_probation_batch_checkpoint(db, batch_size=10000, top_n=10):
-    CHECKPOINT_FILE = os.path.join(CACHE_DIR, "get_academic_probation_batch_checkpoint.pkl")
-
 
     # 🔹 Load all students (cached)
     students_df = get_students_batch_checkpoint(db)
@@ -189,17 +140,7 @@ def get_academic_probation_batch_checkpoint(db, batch_size=10000, top_n=10):
 
     student_ids = students_df["_id"].tolist()
 
-    # 🔹 Load checkpoint if exists
-    checkpoint = load_checkpoint(CHECKPOINT_FILE=CHECKPOINT_FILE)
-    start_index = checkpoint["last_index"]
-    results = checkpoint["results"]
-
-    print(f"Resuming Academic Probation from batch index {start_index}...")
-
-    for i in range(start_index, len(student_ids), batch_size):
-        batch_ids = student_ids[i:i+batch_size]
-        print(f"Processing students {i+1} - {min(i+batch_size, len(student_ids))}")
-
+    def process(batch_ids):
         # 🔹 Fetch students in this batch
         batch_students = students_df[students_df["_id"].isin(batch_ids)]
 
@@ -215,14 +156,12 @@ def get_academic_probation_batch_checkpoint(db, batch_size=10000, top_n=10):
             grades_map.setdefault(g["StudentID"], []).extend(g.get("Grades", []))
 
         rows = []
-        for _, stu in batch_students.iterrows():
+        for stu in batch_students.to_dict("records"):
             sid = stu["_id"]
             grades = grades_map.get(sid, [])
             if not grades:
                 continue
 
-            print(f"   → Checking {stu.get('Name', 'Unknown')} ({sid})")
-
             units = len(grades)
             high = max(grades)
             low = min(grades)
@@ -244,20 +183,16 @@ def get_academic_probation_batch_checkpoint(db, batch_size=10000, top_n=10):
                     "GPA": round(gpa, 2),
                     "Fail%": round(fail_percent, 2)
                 })
+        return pd.DataFrame(rows)
 
-        if rows:
-            batch_df = pd.DataFrame(rows)
-            results.append(batch_df)
-
-        # 🔹 Save checkpoint after each batch
-        save_checkpoint(last_index=i + batch_size, results=results,CHECKPOINT_FILE=CHECKPOINT_FILE)
-
-    if not results:
+    # 🔹 Checkpointed per batch, resumes after a crash
+    final_df = run_batch_job(
+        "academic_probation", student_ids, process,
+        batch_size=batch_size, collections=("students", "grades")
+    )
+    if final_df.empty:
         return pd.DataFrame()
 
-    # Merge
-    final_df = pd.concat(results, ignore_index=True)
-
     # Sort by GPA ascending (worst first)
     final_df.sort_values(by="GPA", ascending=True, inplace=True)
 
@@ -268,53 +203,35 @@ def get_academic_probation_batch_checkpoint(db, batch_size=10000, top_n=10):
     final_df.index = range(1, len(final_df)+1)
     final_df['#'] = final_df.index
 
-    # Clean up checkpoint
-    if os.path.exists(CHECKPOINT_FILE):
-        os.remove(CHECKPOINT_FILE)
-
     return final_df
 
 
 # ------------------------------
 # 2. Subject Pass/Fail Distribution
 # ------------------------------
-@cache_meta()
+@cache_meta(collections=("grades", "subjects", "semesters"))
 def get_subject_pass_fail(db):
 
-
-    # 🔹 Load required collections
+    # 🔹 Load grades (subjects / semesters come from the shared dimensions)
     grades = list(db.grades.find({}, {"SubjectCodes": 1, "Grades": 1, "SemesterID": 1}))
-    subjects = pd.DataFrame(list(db.subjects.find({}, {"_id": 1, "Description": 1})))
-    semesters = pd.DataFrame(list(db.semesters.find({}, {"_id": 1, "Semester": 1})))
-
-    if not grades or subjects.empty or semesters.empty:
+    if not grades:
         return pd.DataFrame()
 
-    # 🔹 Flatten grades
-    rows = []
-    for g in grades:
-        subject_codes = g.get("SubjectCodes", [])
-        subject_grades = g.get("Grades", [])
-        semester_id = g.get("SemesterID")
+    # 🔹 Flatten grades in parallel chunks (see flatten_grades)
+    df = flatten_grades(grades, {"Subject Code": "SubjectCodes", "Grade": "Grades", "SemesterID": "SemesterID"})
 
-        for code, grade in zip(subject_codes, subject_grades):
-            rows.append({
-                "Subject Code": code,
-                "Grade": grade,
-                "SemesterID": semester_id
-            })
+    # 🔹 Join and count against the shared dimensions
+    return _pass_fail_summary(registrar_dimensions(db), df)
 
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return df
 
-    # 🔹 Merge subject descriptions
-    subjects.rename(columns={"_id": "Subject Code", "Description": "Subject Name"}, inplace=True)
-    df = df.merge(subjects, on="Subject Code", how="left")
+def _pass_fail_summary(dimensions, df):
+    subjects, semesters = dimensions["subjects"], dimensions["semesters"]
+    if df.empty or not len(subjects) or not len(semesters):
+        return pd.DataFrame()
 
-    # 🔹 Merge semester names
-    semesters.rename(columns={"_id": "SemesterID"}, inplace=True)
-    df = df.merge(semesters, on="SemesterID", how="left")
+    # 🔹 Subject descriptions and semester names
+    df = subjects.join(df, on="Subject Code", fields=["Description"], rename={"Description": "Subject Name"})
+    df = semesters.join(df, on="SemesterID", fields=["Semester"])
 
     # 🔹 Compute pass/fail counts per subject + semester
     summary = (
@@ -344,31 +261,24 @@ def get_subject_pass_fail(db):
 
 def get_enrollment_trend(db, batch_size=1000):
 
-    CACHE_DIR = "./cache"
-    CHECKPOINT_FILE = os.path.join(CACHE_DIR, "enrollment_trend_checkpoint.pkl")
-
-    # --- Load checkpoint ---
-    if os.path.exists(CHECKPOINT_FILE):
-        with open(CHECKPOINT_FILE, "rb") as f:
-            checkpoint = pickle.load(f)
-        start_index = checkpoint["last_index"]
-        results = checkpoint["results"]
-        print(f"Resuming enrollment trend from index {start_index}...")
-    else:
-        start_index, results = 0, []
-
     # Load all students (with batching)
     students_df = get_students_batch_checkpoint(db)
     if students_df.empty:
         return pd.DataFrame()
     student_ids = students_df["_id"].tolist()
 
-    # Load all grades
-    grades_cursor = db.grades.find(
-        {"StudentID": {"$in": student_ids}},
-        {"StudentID": 1, "SemesterID": 1}
+    def fetch(batch_ids):
+        return find_frame(
+            db.grades,
+            {"StudentID": {"$in": batch_ids}},
+            {"StudentID": 1, "SemesterID": 1}
+        )
+
+    # Load all grades, checkpointed per batch
+    grades_df = run_batch_job(
+        "enrollment_trend", student_ids, fetch,
+        batch_size=batch_size, collections=("students", "grades")
     )
-    grades_df = pd.DataFrame(list(grades_cursor))
     if grades_df.empty:
         return pd.DataFrame()
 
@@ -403,10 +313,6 @@ def get_enrollment_trend(db, batch_size=1000):
         })
         prev_students = sem_students
 
-    # --- Delete checkpoint ---
-    if os.path.exists(CHECKPOINT_FILE):
-        os.remove(CHECKPOINT_FILE)
-
     return pd.DataFrame(summary)
 
 
@@ -414,56 +320,35 @@ def get_enrollment_trend(db, batch_size=1000):
 # 4. Incomplete Grades Report
 # ------------------------------
 
-@cache_meta()
+@cache_meta(collections=("students", "grades", "subjects", "semesters"))
 def get_incomplete_grades(db):
 
-
-    # 🔹 Load collections
-    students = get_students_batch_checkpoint(db)
-    if students.empty:
-        return pd.DataFrame()
-
+    # 🔹 Load grades (students / subjects / semesters come from the shared dimensions)
     grades = list(db.grades.find({}, {"StudentID": 1, "SubjectCodes": 1, "Grades": 1, "SemesterID": 1, "Status": 1}))
-    subjects = pd.DataFrame(list(db.subjects.find({}, {"_id": 1, "Description": 1})))
-    semesters = pd.DataFrame(list(db.semesters.find({}, {"_id": 1, "Semester": 1})))
-
-    if not grades or students.empty or subjects.empty or semesters.empty:
+    if not grades:
         return pd.DataFrame()
 
-    # 🔹 Flatten grades (expand arrays)
-    rows = []
-    for g in grades:
-        student_id = g.get("StudentID")
-        semester_id = g.get("SemesterID")
-        subject_codes = g.get("SubjectCodes", [])
-        subject_grades = g.get("Grades", [])
-        subject_status = g.get("Status", [])
-
-        for code, grade, status in zip(subject_codes, subject_grades, subject_status):
-            if status in ["INC", "Dropped"]:
-                rows.append({
-                    "Student ID": student_id,
-                    "Course Code": code,
-                    "Grade": grade,
-                    "SemesterID": semester_id,
-                    "Status": status  # ✅ use the Status field
-                })
+    # 🔹 Flatten grades in parallel chunks, keeping INC / Dropped subjects only
+    df = flatten_grades(
+        grades,
+        {"Student ID": "StudentID", "Course Code": "SubjectCodes", "Grade": "Grades",
+         "SemesterID": "SemesterID", "Status": "Status"},
+        keep={"Status": ("INC", "Dropped")},
+    )
 
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return df
+    # 🔹 Join against the shared dimensions
+    return _incomplete_rows(registrar_dimensions(db), df)
 
-    # 🔹 Merge student info
-    students.rename(columns={"_id": "Student ID"}, inplace=True)
-    df = df.merge(students, on="Student ID", how="left")
 
-    # 🔹 Merge subject info
-    subjects.rename(columns={"_id": "Course Code", "Description": "Course Title"}, inplace=True)
-    df = df.merge(subjects, on="Course Code", how="left")
+def _incomplete_rows(dimensions, df):
+    students, subjects, semesters = dimensions["students"], dimensions["subjects"], dimensions["semesters"]
+    if df.empty or not len(students) or not len(subjects) or not len(semesters):
+        return pd.DataFrame()
 
-    # 🔹 Merge semester info
-    semesters.rename(columns={"_id": "SemesterID", "Semester": "Term"}, inplace=True)
-    df = df.merge(semesters, on="SemesterID", how="left")
+    # 🔹 Student, subject and semester info
+    df = students.join(df, on="Student ID", fields=["Name"])
+    df = subjects.join(df, on="Course Code", fields=["Description"], rename={"Description": "Course Title"})
+    df = semesters.join(df, on="SemesterID", fields=["Semester"], rename={"Semester": "Term"})
 
     # 🔹 Final cleanup
     df = df[["Student ID", "Name", "Course Code", "Course Title", "Term", "Grade", "Status"]]
@@ -476,64 +361,44 @@ def get_incomplete_grades(db):
 # 5. Retention and Dropout Rates (continued)
 # ------------------------------
 
-@cache_meta()
+@cache_meta(collections=("students", "grades", "semesters"))
 def get_retention_rates(db, batch_size=1000):
 
-
-
-    CHECKPOINT_FILE = os.path.join(CACHE_DIR, "retention_checkpoint.pkl")
-
-    # --- Load checkpoint ---
-    if os.path.exists(CHECKPOINT_FILE):
-        with open(CHECKPOINT_FILE, "rb") as f:
-            checkpoint = pickle.load(f)
-        start_index = checkpoint["last_index"]
-        results = checkpoint["results"]
-        print(f"Resuming retention from index {start_index}...")
-    else:
-        start_index, results = 0, []
-
     students_df = get_students_batch_checkpoint(db)
     if students_df.empty:
         return pd.DataFrame()
     student_ids = students_df["_id"].tolist()
 
-    # --- Process students in batches ---
-    for i in range(start_index, len(student_ids), batch_size):
-        batch_ids = student_ids[i:i+batch_size]
-        print(f"Processing retention for students {i+1}-{min(i+batch_size, len(student_ids))}")
+    # Map SemesterID → formatted string (semesters is tiny, load it once)
+    sem_map = {
+        s["_id"]: f"{s['Semester']} {s['SchoolYear']}"
+        for s in db.semesters.find({}, {"Semester": 1, "SchoolYear": 1})
+    }
 
-        grades_cursor = db.grades.find(
+    def process(batch_ids):
+        grades_df = find_frame(
+            db.grades,
             {"StudentID": {"$in": batch_ids}},
             {"StudentID": 1, "SemesterID": 1}
         )
-
-        grades_df = pd.DataFrame(list(grades_cursor))
         if grades_df.empty:
-            continue
-
-        # Map SemesterID → formatted string
-        sem_ids = grades_df["SemesterID"].unique().tolist()
-        sem_map = {
-            s["_id"]: f"{s['Semester']} {s['SchoolYear']}"
-            for s in db.semesters.find(
-                {"_id": {"$in": sem_ids}},
-                {"Semester": 1, "SchoolYear": 1}
-            )
-        }
-        grades_df["Semester"] = grades_df["SemesterID"].map(sem_map)
-        results.append(grades_df)
+            return grades_df
 
-        # --- Save checkpoint ---
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        with open(CHECKPOINT_FILE, "wb") as f:
-            pickle.dump({"last_index": i + batch_size, "results": results}, f)
+        grades_df["Semester"] = grades_df["SemesterID"].map(sem_map)
+        return grades_df
 
-    if not results:
+    # --- Process students in batches (checkpointed, resumable) ---
+    df = run_batch_job(
+        "retention", student_ids, process,
+        batch_size=batch_size, collections=("students", "grades", "semesters")
+    )
+    if df.empty:
         return pd.DataFrame()
 
-    df = pd.concat(results, ignore_index=True)
+    return _retention_summary(registrar_dimensions(db), df)
+
 
+def _retention_summary(dimensions, df):
     # --- Create dynamic semester ordering ---
     semester_types = {"FirstSem": 1, "SecondSem": 2, "Summer": 3}
 
@@ -564,30 +429,30 @@ def get_retention_rates(db, batch_size=1000):
     summary["Dropped Out"] = summary["Total"] - summary["Retained"]
     summary["Retention Rate (%)"] = (summary["Retained"] / summary["Total"] * 100).round(2)
 
-    # --- Delete checkpoint ---
-    if os.path.exists(CHECKPOINT_FILE):
-        os.remove(CHECKPOINT_FILE)
-
     return summary[["Semester", "Retained", "Dropped Out", "Retention Rate (%)"]]
 
 # ------------------------------
 # 6. Top Performers per Program
 # ------------------------------
 
-@cache_meta()
+@cache_meta(collections=("students", "grades", "semesters"))
 def get_top_performers(db):
 
-
-    # 1. Load students using batch checkpoint loader
-    students_df = get_students_batch_checkpoint(db)
-    if students_df.empty:
-        return pd.DataFrame()
-
-    # 2. Load grades (StudentID + Grades + SemesterID)
+    # 1. Load grades (StudentID + Grades + SemesterID)
     grades = list(db.grades.find({}, {"StudentID": 1, "Grades": 1, "SemesterID": 1}))
     if not grades:
         return pd.DataFrame()
 
+    # 2. GPA, join and ranking against the shared dimensions
+    return _top_performers_table(registrar_dimensions(db), grades)
+
+
+def _top_performers_table(dimensions, grades):
+    # Students from the shared dimension, in _id order like the batch loader
+    students_df = dimensions["students"].frame.sort_index().reset_index()
+    if students_df.empty:
+        return pd.DataFrame()
+
     grades_df = pd.DataFrame(grades)
 
     # 3. Compute GPA per student/semester
@@ -610,10 +475,9 @@ def get_top_performers(db):
     )
 
     # 5. Attach semester info (SchoolYear + Semester)
-    sem_ids = merged["SemesterID"].unique().tolist()
     sem_map = {
-        s["_id"]: f"{s.get('SchoolYear', '')} - {s['Semester']}"
-        for s in db.semesters.find({"_id": {"$in": sem_ids}}, {"SchoolYear": 1, "Semester": 1})
+        s.Index: f"{'' if s.SchoolYear is None else s.SchoolYear} - {s.Semester}"
+        for s in dimensions["semesters"].frame.itertuples()
     }
     merged["Semester"] = merged["SemesterID"].map(sem_map)
 
@@ -639,7 +503,7 @@ def get_top_performers(db):
 # 7. Curriculum Progress Viewer
 # ------------------------------
 
-@cache_meta()
+@cache_meta(collections=("curriculum",))
 def get_curriculum_progress(db, program=None):
     """
     Fetch curriculum subjects from the database.
@@ -688,16 +552,170 @@ def get_curriculum_progress(db, program=None):
 
 
 # ------------------------------
-# Test all functions in __main__
+# Chunked flattening of grade documents
+# ------------------------------
+# The parallel SubjectCodes / Grades / Status arrays are expanded in chunks of
+# FLATTEN_CHUNK documents on a process pool. Every chunk comes back as one
+# numpy array per column instead of a list of row dicts, and the chunks are
+# concatenated once per column into the final frame.
+
+FLATTEN_CHUNK = int(os.getenv("FLATTEN_CHUNK", 20000))  # grade documents per task
+FLATTEN_PROCESSES = int(os.getenv("FLATTEN_PROCESSES", os.cpu_count() or 1))
+
+ARRAY_FIELDS = set(ALIGNED_FIELDS.values())  # read position by position
+
+_flatten_executor = None
+_flatten_lock = threading.Lock()
+
+
+def _column(values):
+    """values as a numpy array; plain numbers keep a numeric dtype, anything else (incl. None) is object."""
+    array = np.asarray(values)
+    return array if array.dtype.kind in "biuf" else np.asarray(values, dtype=object)
+
+
+def _flatten_chunk(grades, columns, keep=None):
+    """
+    [array per column] for one chunk of grade documents: a row per position of
+    the zipped array fields, document fields repeated on each of its rows.
+    keep={field: values} drops rows whose array field holds anything else.
+    """
+    keep = keep or {}
+    fields = list(dict.fromkeys([f for f in columns.values() if f in ARRAY_FIELDS] + list(keep)))
+    checks = [(fields.index(f), set(values)) for f, values in keep.items()]
+    sources = [(fields.index(f), True) if f in ARRAY_FIELDS else (f, False) for f in columns.values()]
+
+    out = [[] for _ in columns]
+    for g in grades:
+        for item in zip(*(g.get(f, []) for f in fields)):
+            if any(item[i] not in values for i, values in checks):
+                continue
+            for values, (source, in_array) in zip(out, sources):
+                values.append(item[source] if in_array else g.get(source))
+    return [_column(values) for values in out]
+
+
+def _flatten_pool():
+    """The report pack's process pool, or this process's own one outside a pack."""
+    global _flatten_executor
+    pool = _process_pool.get()
+    if pool is not None:
+        return pool
+    with _flatten_lock:
+        if _flatten_executor is None:
+            _flatten_executor = ProcessPoolExecutor(
+                max_workers=max(1, FLATTEN_PROCESSES), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _flatten_executor
+
+
+def flatten_grades(grades, columns, keep=None, chunk_size=FLATTEN_CHUNK):
+    """
+    DataFrame with one row per subject taken. columns maps output names to
+    grade document fields (see _flatten_chunk); more than one chunk of
+    documents is split across the process pool (on a multi-core host).
+    """
+    chunks = [grades[i:i + chunk_size] for i in range(0, len(grades), chunk_size)]
+    task = partial(_flatten_chunk, columns=columns, keep=keep)
+    if len(chunks) > 1 and FLATTEN_PROCESSES > 1:
+        parts = list(_flatten_pool().map(task, chunks))
+    else:
+        parts = [task(c) for c in chunks]
+
+    names = list(columns)
+    parts = [part for part in parts if len(part[0])]  # an empty chunk's float64 [] would upcast ints
+    if not parts:
+        return pd.DataFrame(columns=names)
+    df = pd.DataFrame({name: np.concatenate([part[i] for part in parts]) for i, name in enumerate(names)})
+    # Object columns get the dtype pd.DataFrame(rows) would infer ([80, None] -> float64)
+    return df.infer_objects()
+
+
+# ------------------------------
+# Registrar report pack
+# ------------------------------
+# The reports are independent, so run_registrar_reports starts them together
+# and the pack takes about as long as its slowest report. Each report runs on
+# its own thread, where it waits on Mongo and joins against the students /
+# subjects / semesters dimensions, which every thread shares in-process
+# (nothing is pickled). Only the grade-document flattening, the CPU-bound
+# part, goes to the pack's process pool (see flatten_grades).
+
+REGISTRAR_REPORTS = {
+    "deans_list": get_deans_list,                                   # 1. Dean's List
+    "academic_probation": get_academic_probation_batch_checkpoint,  # 2. Academic Probation
+    "subject_pass_fail": get_subject_pass_fail,                     # 3. Subject Pass/Fail Distribution
+    "incomplete_grades": get_incomplete_grades,                     # 4. Incomplete Grades Report
+    "retention_rates": get_retention_rates,                         # 5. Retention and Dropout Rates
+    "top_performers": get_top_performers,                           # 6. Top Performers per Program
+    "curriculum_progress": get_curriculum_progress,                 # 7. Curriculum Progress Viewer
+}
+REPORT_TIMEOUT = int(os.getenv("REPORT_TIMEOUT", 600))  # seconds per report, from the start of the pack
+REPORT_PROCESSES = int(os.getenv("REPORT_PROCESSES", os.cpu_count() or 1))  # flattening workers
+
+_process_pool = contextvars.ContextVar("registrar_process_pool", default=None)
+
+
+def registrar_dimensions(db):
+    """The dimensions the reports join against (helpers/dimension_helper.py, cached per process)."""
+    return {name: dimension(db, name) for name in ("students", "subjects", "semesters")}
+
+
+def _close_when_done(futures, pool):
+    """Shuts pool down once the report threads that may still use it have finished."""
+    wait(futures)
+    pool.shutdown(wait=False)
+
+
+def run_registrar_reports(db, reports=None, timeouts=None, processes=REPORT_PROCESSES):
+    """
+    {name: DataFrame} for the registrar reports (every one in REGISTRAR_REPORTS
+    by default), computed concurrently. A report that fails or is still running
+    after its timeout (timeouts[name], else REPORT_TIMEOUT) is left out with a
+    warning; its query is ended by the client's timeoutMS, not interrupted here.
+    """
+    names = list(reports or REGISTRAR_REPORTS)
+    timeouts = timeouts or {}
+    registrar_dimensions(db)  # read once here instead of by every report thread at the same time
+
+    # spawn: workers never inherit the parent's MongoClient threads and locks
+    pool = ProcessPoolExecutor(max_workers=max(1, processes), mp_context=multiprocessing.get_context("spawn"))
+    threads = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="registrar")
+    started = time.monotonic()
+    results, futures = {}, {}
+    try:
+        for name in names:
+            context = contextvars.copy_context()
+            context.run(_process_pool.set, pool)
+            futures[name] = threads.submit(context.run, REGISTRAR_REPORTS[name], db)
+
+        for name, future in futures.items():
+            remaining = started + timeouts.get(name, REPORT_TIMEOUT) - time.monotonic()
+            try:
+                results[name] = future.result(max(0, remaining))
+            except FutureTimeout:
+                print(f"[WARN] Registrar report {name} timed out")
+            except Exception as e:
+                print(f"[ERROR] Registrar report {name} failed: {e}")
+    finally:
+        threads.shutdown(wait=False, cancel_futures=True)
+        # A timed-out report keeps running and may still flatten on the pool
+        running = [future for future in futures.values() if not future.done()]
+        if running:
+            threading.Thread(target=_close_when_done, args=(running, pool), daemon=True).start()
+        else:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    print(f"📦 {len(results)}/{len(names)} registrar reports in {time.monotonic() - started:.2f}s")
+    return results
+
+
+# ------------------------------
+# Run the registrar pack from __main__
 # ------------------------------
 if __name__ == "__main__":
-    
-    # deans_list = get_deans_list(batch_size=10000) # 1. Dean's List
-    # probation = get_academic_probation_batch_checkpoint(top_n=10) #2. Academic Probation
-    # pass_fail = get_subject_pass_fail() # 3. Subject Pass/Fail Distribution
-    # incomplete = get_incomplete_grades() #4. Incomplete Grades Report
-    # retention = get_retention_rates() #5. Retention and Dropout Rates
-    # top_performers = get_top_performers() #6. Top Performers per Program
-    # curriculum = get_curriculum_progress() #7. Curriculum Progress Viewer
-    # print(curriculum.iloc[0])
-    pass
+    from helpers.db_helper import get_db
+
+    reports = run_registrar_reports(get_db("batch"))
+    for name, df in reports.items():
+        print(f"  {name:<22} {len(df):>7} rows")
@@ -1,349 +1,132 @@
-import matplotlib.pyplot as plt
-from pymongo import MongoClient
-from collections import defaultdict
 import numpy as np
-import os
 import pandas as pd
-import hashlib
-import pickle
-import time
-from functools import wraps
-import statistics
 from helpers.cache_helper import cache_meta
+from helpers.dimension_helper import dimension
+from helpers.ingest_helper import find_frame, read_frame
+from helpers.grade_fact_helper import get_grade_facts, filter_facts, per_record, plain, select_facts
 
-@cache_meta()
-def get_top_performers(db, school_year=None, semester=None):
-    # --- Step 1: Fetch everything in bulk ---
-    grades = list(db.grades.find({}))
-    semesters = {s["_id"]: s for s in db.semesters.find({})}
-    students = {st["_id"]: st for st in db.students.find({})}
-
-    total = len(grades)
-    data = []
-
-    for idx, g in enumerate(grades, start=1):
-        if not g.get("Grades"):  # Skip empty grades
-            continue
-
-        # --- Step 2: Join with semester ---
-        sem = semesters.get(g.get("SemesterID"))
-        if not sem:
-            continue
-
-        # Apply filters
-        if school_year and int(sem.get("SchoolYear")) != int(school_year):
-            continue
-        if semester and sem.get("Semester") != semester:
-            continue
-
-        # --- Step 3: Join with student ---
-        student = students.get(g.get("StudentID"))
-        if not student:
-            continue
-
-        # --- Step 4: Compute average ---
-        avg_grade = sum(g["Grades"]) / len(g["Grades"])
-
-        data.append({
-            "Student": student.get("Name"),
-            "Course": student.get("Course"),
-            "YearLevel": student.get("YearLevel"),
-            "Semester": sem.get("Semester"),
-            "SchoolYear": sem.get("SchoolYear"),
-            "Average": avg_grade
-        })
-
-        # --- Step 5: Print progress ---
-        if idx % max(1, total // 5) == 0:  # every 20%
-            percent = (idx / total) * 100
-            print(f"Processing... ({percent:.0f}% done)")
-
-    # --- Step 6: Sort and limit ---
-    top10 = sorted(data, key=lambda x: x["Average"], reverse=True)[:10]
-
-    return pd.DataFrame(top10)
-
-@cache_meta()
-def get_failing_students(db, school_year=None, semester=None):
-    # Convert numpy types to plain Python types
-    if school_year is not None:
-        school_year = int(school_year)  # ensure BSON-safe
-    if semester is not None:
-        semester = str(semester)        # ensure BSON-safe
+FACT_COLLECTIONS = ("grades", "semesters", "students")
 
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "StudentID",
-                "foreignField": "_id",
-                "as": "student"
-            }
-        },
-        {"$unwind": "$student"},
-        {
-            "$match": {
-                **({"sem.SchoolYear": school_year} if school_year else {}),
-                **({"sem.Semester": semester} if semester else {}),
-                "Grades.0": {"$exists": True}
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "Student": "$student.Name",
-                "Course": "$student.Course",
-                "Semester": "$sem.Semester",
-                "SchoolYear": "$sem.SchoolYear",
-                "Subjects Taken": {"$size": "$Grades"},
-                "Failures": {
-                    "$size": {
-                        "$filter": {
-                            "input": "$Grades",
-                            "as": "g",
-                            "cond": {"$lt": ["$$g", 75]}
-                        }
-                    }
-                }
-            }
-        },
-        {
-            "$addFields": {
-                "FailureRate": {
-                    "$cond": [
-                        {"$gt": ["$Subjects Taken", 0]},
-                        {"$divide": ["$Failures", "$Subjects Taken"]},
-                        0
-                    ]
-                }
-            }
-        },
-        {"$match": {"FailureRate": {"$gt": 0.3}}},
-        {"$sort": {"Failures": -1}}
-    ]
 
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
+def _student_names(db, student_ids):
+    ids = list(student_ids)
+    return dict(zip(ids, dimension(db, "students").lookup(ids, "Name")))
 
-    if not df.empty:
-        df["Failure Rate"] = (df["FailureRate"] * 100).round(0).astype(int).astype(str) + "%"
-        df = df.drop(columns=["FailureRate"])
 
-    return df
+def _subject_descriptions(db, codes):
+    codes = list(codes)
+    return dict(zip(codes, dimension(db, "subjects").lookup(codes, "Description")))
 
 
-@cache_meta()
-def get_students_with_improvement(db, selected_semester="All", selected_sy="All"):
-    match_stage = {"Grades.0": {"$exists": True}}  # skip students with no grades
+def _graded(facts):
+    """Rows that carry a grade, with the Failed / High flags the reports count."""
+    graded = facts[facts["Grade"].notna()]
+    return graded.assign(Failed=graded["Grade"] < 75, High=graded["Grade"] >= 90)
 
-    if selected_sy != "All":
-        match_stage["sem.SchoolYear"] = int(selected_sy)  # ensure BSON-safe int
-    if selected_semester != "All":
-        match_stage["sem.Semester"] = str(selected_semester)
 
-    pipeline = [
-        # Join with semesters
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-        # Join with students
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "StudentID",
-                "foreignField": "_id",
-                "as": "student"
-            }
-        },
-        {"$unwind": "$student"},
-        # Apply filters
-        {"$match": match_stage},
-        # Compute average grade per (student, semester)
-        {
-            "$project": {
-                "_id": 0,
-                "StudentID": "$StudentID",
-                "Student": "$student.Name",
-                "SchoolYear": "$sem.SchoolYear",
-                "Semester": "$sem.Semester",
-                "AvgGrade": {"$avg": "$Grades"}
-            }
-        },
-        # Group all semesters for each student
-        {
-            "$group": {
-                "_id": "$StudentID",
-                "Student": {"$first": "$Student"},
-                "history": {
-                    "$push": {
-                        "SchoolYear": "$SchoolYear",
-                        "Semester": "$Semester",
-                        "AvgGrade": "$AvgGrade"
-                    }
-                }
-            }
-        }
-    ]
+@cache_meta(collections=FACT_COLLECTIONS)
+def get_top_performers(db, school_year=None, semester=None):
+    facts = select_facts(db, school_year, semester, joined=("semester", "student"))
+    records = per_record(facts)
+    if records.empty:
+        return pd.DataFrame()
 
-    results = list(db.grades.aggregate(pipeline))
-
-    # Now handle improvement logic in Python (small dataset)
-    improved = []
-    for r in results:
-        history = sorted(
-            r["history"],
-            key=lambda x: (x["SchoolYear"], x["Semester"])  # sort by SY + Semester
-        )
-        if len(history) > 1 and history[-1]["AvgGrade"] > history[0]["AvgGrade"]:
-            improved.append({
-                "Student": r["Student"],
-                "Initial Avg": history[0]["AvgGrade"],
-                "Latest Avg": history[-1]["AvgGrade"],
-                "Improvement": history[-1]["AvgGrade"] - history[0]["AvgGrade"],
-                "SchoolYear": history[-1]["SchoolYear"],
-                "Semester": history[-1]["Semester"],
-            })
-
-    return pd.DataFrame(improved).sort_values("Improvement", ascending=False)
-
-
-@cache_meta()
-def get_distribution_of_grades(db, selected_semester="All", selected_sy="All"):
-    match_stage = {}
-    if selected_sy != "All":
-        match_stage["sem.SchoolYear"] = int(selected_sy)  # ensure safe int
-    if selected_semester != "All":
-        match_stage["sem.Semester"] = str(selected_semester)
+    top10 = records.nlargest(10, "Average")
+    names = _student_names(db, top10["StudentID"])
+    top10 = top10.assign(Student=top10["StudentID"].map(names))
 
-    pipeline = [
-        # Expand grades array -> one row per grade
-        {"$unwind": "$Grades"},
-        # Join with semesters
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-        # Apply filters (if any)
-        {"$match": match_stage} if match_stage else {"$match": {}},
-        # Project only needed fields
-        {
-            "$project": {
-                "_id": 0,
-                "Grade": "$Grades",
-                "Semester": "$sem.Semester",
-                "SchoolYear": "$sem.SchoolYear"
-            }
-        }
-    ]
+    return plain(top10[["Student", "Course", "YearLevel", "Semester", "SchoolYear", "Average"]]).reset_index(drop=True)
 
-    result = list(db.grades.aggregate(pipeline))
-    return pd.DataFrame(result)
+@cache_meta(collections=FACT_COLLECTIONS)
+def get_failing_students(db, school_year=None, semester=None):
+    facts = select_facts(db, school_year, semester, joined=("semester", "student"))
+    records = per_record(facts)
+    records = records[records["Failures"] / records["Taken"] > 0.3]
+    if records.empty:
+        return pd.DataFrame()
 
+    records = records.sort_values("Failures", ascending=False, kind="stable")
+    names = _student_names(db, records["StudentID"])
+    df = pd.DataFrame({
+        "Student": records["StudentID"].map(names),
+        "Course": records["Course"],
+        "Semester": records["Semester"],
+        "SchoolYear": records["SchoolYear"],
+        "Subjects Taken": records["Taken"],
+        "Failures": records["Failures"],
+    })
+    df["Failure Rate"] = (df["Failures"] / df["Subjects Taken"] * 100).round(0).astype(int).astype(str) + "%"
 
-# B. Subject and Teacher Analytics
-@cache_meta()
-def get_hardest_subject(db, course=None, school_year=None):
-    match_stage = {}
-    if course:
-        match_stage["student.Course"] = course
-    if school_year:
-        match_stage["sem.SchoolYear"] = int(school_year)
+    return plain(df).reset_index(drop=True)
 
-    pipeline = [
-        # Join with semesters
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-        # Join with students
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "StudentID",
-                "foreignField": "_id",
-                "as": "student"
-            }
-        },
-        {"$unwind": "$student"},
-        # Apply filters only if present
-        *( [{"$match": match_stage}] if match_stage else [] ),
-        # Unwind grades + subjects
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx"}},
-        {"$unwind": {"path": "$SubjectCodes", "includeArrayIndex": "idx2"}},
-        {"$match": {"$expr": {"$eq": ["$idx", "$idx2"]}}},
-        # Count fails + totals per subject
-        {
-            "$group": {
-                "_id": "$SubjectCodes",
-                "Fails": {"$sum": {"$cond": [{"$lt": ["$Grades", 75]}, 1, 0]}},
-                "Total": {"$sum": 1}
-            }
-        },
-        # Join with subjects
-        {
-            "$lookup": {
-                "from": "subjects",
-                "localField": "_id",
-                "foreignField": "_id",
-                "as": "subj"
-            }
-        },
-        {"$unwind": {"path": "$subj", "preserveNullAndEmptyArrays": True}},
-        # Compute failure rate
-        {
-            "$project": {
-                "Subject": "$_id",
-                "Description": "$subj.Description",
-                "Fails": 1,
-                "Total": 1,
-                "Failure Rate": {
-                    "$cond": [
-                        {"$gt": ["$Total", 0]},
-                        {"$multiply": [{"$divide": ["$Fails", "$Total"]}, 100]},
-                        0
-                    ]
-                }
-            }
-        },
-        {"$sort": {"Failure Rate": -1}}
-    ]
 
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
+@cache_meta(collections=FACT_COLLECTIONS)
+def get_students_with_improvement(db, selected_semester="All", selected_sy="All"):
+    facts = select_facts(
+        db,
+        school_year=None if selected_sy == "All" else selected_sy,
+        semester=None if selected_semester == "All" else selected_semester,
+        joined=("semester", "student"),
+    )
+    records = per_record(facts).sort_values(["StudentID", "SchoolYear", "Semester"])  # sort by SY + Semester
+
+    history = records.groupby("StudentID", sort=False).agg(
+        Initial=("Average", "first"),
+        Latest=("Average", "last"),
+        Terms=("Average", "size"),
+        SchoolYear=("SchoolYear", "last"),
+        Semester=("Semester", "last"),
+    )
+    improved = history[(history["Terms"] > 1) & (history["Latest"] > history["Initial"])]
 
-    if df.empty:
+    names = _student_names(db, improved.index)
+    df = pd.DataFrame({
+        "Student": improved.index.map(names),
+        "Initial Avg": improved["Initial"].values,
+        "Latest Avg": improved["Latest"].values,
+        "Improvement": (improved["Latest"] - improved["Initial"]).values,
+        "SchoolYear": improved["SchoolYear"].values,
+        "Semester": improved["Semester"].values,
+    })
+    return plain(df).sort_values("Improvement", ascending=False)
+
+
+@cache_meta(collections=("grades", "semesters"))
+def get_distribution_of_grades(db, selected_semester="All", selected_sy="All"):
+    facts = select_facts(
+        db,
+        school_year=None if selected_sy == "All" else selected_sy,
+        semester=None if selected_semester == "All" else selected_semester,
+    )
+    facts = facts[facts["Grade"].notna()]
+    return plain(facts[["Grade", "Semester", "SchoolYear"]]).reset_index(drop=True)
+
+
+# B. Subject and Teacher Analytics
+@cache_meta(collections=FACT_COLLECTIONS + ("subjects",))
+def get_hardest_subject(db, course=None, school_year=None):
+    facts = _graded(select_facts(db, school_year, course=course, joined=("semester", "student")))
+    if facts.empty:
         return pd.DataFrame()
 
+    # Count fails + totals per subject
+    df = (
+        facts.groupby("SubjectCode", observed=True)
+        .agg(Fails=("Failed", "sum"), Total=("Grade", "size"))
+        .reset_index()
+        .rename(columns={"SubjectCode": "_id"})
+    )
+    df["_id"] = df["_id"].astype(object)
+    df["Subject"] = df["_id"]
+    df["Description"] = df["_id"].map(_subject_descriptions(db, df["_id"]))
+    df["Failure Rate"] = df["Fails"] / df["Total"] * 100
+    df = df.sort_values("Failure Rate", ascending=False, kind="stable")
+
     df["Failure Rate %"] = df["Failure Rate"].round(0).astype(int).astype(str) + "%"
     return df.reset_index(drop=True)
 
 
-@cache_meta()
+@cache_meta(collections=FACT_COLLECTIONS + ("subjects",))
 def get_easiest_subjects(db, course=None, school_year=None):
     """
     Returns DataFrame with:
@@ -354,416 +137,140 @@ def get_easiest_subjects(db, course=None, school_year=None):
       - Students (total)
     Filters: course, school_year
     """
-
-    # Only add filters if provided
-    match_stage = {}
-    if course:
-        match_stage["student.Course"] = course
-    if school_year:
-        match_stage["sem.SchoolYear"] = int(school_year)
-
-    pipeline = [
-        # Join semesters first
-        {"$lookup": {
-            "from": "semesters",
-            "localField": "SemesterID",
-            "foreignField": "_id",
-            "as": "sem"
-        }},
-        {"$unwind": "$sem"},
-
-        # Join students
-        {"$lookup": {
-            "from": "students",
-            "localField": "StudentID",
-            "foreignField": "_id",
-            "as": "student"
-        }},
-        {"$unwind": "$student"},
-
-        # Apply filters only if present
-        *( [{"$match": match_stage}] if match_stage else [] ),
-
-        # Unwind grades + subjects together
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx"}},
-        {"$unwind": {"path": "$SubjectCodes", "includeArrayIndex": "idx2"}},
-        {"$match": {"$expr": {"$eq": ["$idx", "$idx2"]}}},
-
-        # Group by subject
-        {
-            "$group": {
-                "_id": "$SubjectCodes",
-                "HighCount": {"$sum": {"$cond": [{"$gte": ["$Grades", 90]}, 1, 0]}},
-                "Total": {"$sum": 1}
-            }
-        },
-
-        # Lookup subject info
-        {"$lookup": {
-            "from": "subjects",
-            "localField": "_id",
-            "foreignField": "_id",
-            "as": "subj"
-        }},
-        {"$unwind": {"path": "$subj", "preserveNullAndEmptyArrays": True}},
-
-        # Compute high rate
-        {"$project": {
-            "Subject": "$_id",
-            "Description": "$subj.Description",
-            "High Performers": "$HighCount",
-            "Students": "$Total",
-            "High Rate": {
-                "$cond": [
-                    {"$gt": ["$Total", 0]},
-                    {"$multiply": [{"$divide": ["$HighCount", "$Total"]}, 100]},
-                    0
-                ]
-            }
-        }},
-
-        {"$sort": {"High Rate": -1}}
-    ]
-
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
-
-    if df.empty:
+    facts = _graded(select_facts(db, school_year, course=course, joined=("semester", "student")))
+    if facts.empty:
         return pd.DataFrame()
 
+    # Group by subject
+    df = (
+        facts.groupby("SubjectCode", observed=True)
+        .agg(**{"High Performers": ("High", "sum"), "Students": ("Grade", "size")})
+        .reset_index()
+        .rename(columns={"SubjectCode": "_id"})
+    )
+    df["_id"] = df["_id"].astype(object)
+    df.insert(1, "Subject", df["_id"])
+    df.insert(2, "Description", df["_id"].map(_subject_descriptions(db, df["_id"])))
+    df["High Rate"] = df["High Performers"] / df["Students"] * 100
+    df = df.sort_values("High Rate", ascending=False, kind="stable")
+
     df["High Grades"] = df["High Rate"].round(0).astype(int).astype(str) + "%"
     return df.reset_index(drop=True)
 
-@cache_meta()
+@cache_meta(collections=("grades", "semesters"))
 def get_avg_grades_per_teacher(db, school_year=None, semester=None):
-    match_stage = {}
-    if school_year:
-        match_stage["sem.SchoolYear"] = int(school_year)
-    if semester:
-        match_stage["sem.Semester"] = semester
-
-    pipeline = [
-        # Join semesters
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-
-        # Apply filters only if provided
-        *( [{"$match": match_stage}] if match_stage else [] ),
-
-        # Unwind teachers and grades
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx"}},
-        {"$unwind": {"path": "$Teachers", "includeArrayIndex": "idx2"}},
-
-        # Make sure teacher and grade indices align
-        {"$match": {"$expr": {"$eq": ["$idx", "$idx2"]}}},
-
-        # Group by teacher
-        {
-            "$group": {
-                "_id": "$Teachers",
-                "Average Grade": {"$avg": "$Grades"},
-                "Count": {"$sum": 1}
-            }
-        },
-        {"$sort": {"Average Grade": -1}}
-    ]
-
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
-
-    if df.empty:
+    facts = _graded(select_facts(db, school_year, semester))
+    facts = facts[facts["Teacher"].notna()]
+    if facts.empty:
         return pd.DataFrame()
 
-    df = df.rename(columns={"_id": "Teacher"})
+    # Group by teacher
+    df = (
+        facts.groupby("Teacher", observed=True)
+        .agg(**{"Average Grade": ("Grade", "mean"), "Count": ("Grade", "size")})
+        .reset_index()
+        .sort_values("Average Grade", ascending=False)
+    )
     df["Semester"] = semester if semester else "All"
     df["SchoolYear"] = school_year if school_year else "All"
 
-    return df.reset_index(drop=True)
+    return plain(df).reset_index(drop=True)
 
-@cache_meta()
+@cache_meta(collections=("grades", "semesters"))
 def get_teachers_with_high_failures(db, school_year=None, semester=None):
-    match_stage = {}
-    if school_year:
-        match_stage["sem.SchoolYear"] = int(school_year)
-    if semester:
-        match_stage["sem.Semester"] = semester
-
-    pipeline = [
-        # Join semesters
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-
-        # Apply filters (only if provided)
-        *( [{"$match": match_stage}] if match_stage else [] ),
-
-        # Unwind Grades and Teachers with indices
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx"}},
-        {"$unwind": {"path": "$Teachers", "includeArrayIndex": "idx2"}},
-
-        # Match teacher-grade pairs (same index)
-        {"$match": {"$expr": {"$eq": ["$idx", "$idx2"]}}},
-
-        # Group by teacher
-        {
-            "$group": {
-                "_id": "$Teachers",
-                "Total": {"$sum": 1},
-                "Failures": {"$sum": {"$cond": [{"$lt": ["$Grades", 75]}, 1, 0]}}
-            }
-        },
-
-        # Compute Failure Rate
-        {
-            "$project": {
-                "Teacher": "$_id",
-                "Total": 1,
-                "Failures": 1,
-                "Failure Rate": {
-                    "$cond": [
-                        {"$gt": ["$Total", 0]},
-                        {"$round": [{"$multiply": [{"$divide": ["$Failures", "$Total"]}, 100]}, 2]},
-                        0
-                    ]
-                }
-            }
-        },
-
-        {"$sort": {"Failure Rate": -1}}
-    ]
-
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
-
-    if df.empty:
+    facts = _graded(select_facts(db, school_year, semester))
+    facts = facts[facts["Teacher"].notna()]
+    if facts.empty:
         return pd.DataFrame()
 
+    # Group by teacher
+    df = (
+        facts.groupby("Teacher", observed=True)
+        .agg(Total=("Grade", "size"), Failures=("Failed", "sum"))
+        .reset_index()
+    )
+    df.insert(0, "_id", df["Teacher"].astype(object))
+    df["Failure Rate"] = (df["Failures"] / df["Total"] * 100).round(2)
+    df = df.sort_values("Failure Rate", ascending=False, kind="stable")
+
     df["Semester"] = semester if semester else "All"
     df["SchoolYear"] = school_year if school_year else "All"
 
-    return df.reset_index(drop=True)
+    return plain(df).reset_index(drop=True)
 
 # C. Course and Curriculum Insights
-@cache_meta()
+@cache_meta(collections=FACT_COLLECTIONS, soft_ttl=15, hard_ttl=1440)  # stale-while-revalidate
 def get_grade_trend_per_course(db):
-    pipeline = [
-        # Join with semesters
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-
-        # Join with students
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "StudentID",
-                "foreignField": "_id",
-                "as": "student"
-            }
-        },
-        {"$unwind": "$student"},
-
-        # Exclude records without grades
-        {"$match": {"Grades.0": {"$exists": True}}},
-
-        # Compute per-record average
-        {
-            "$project": {
-                "Course": "$student.Course",
-                "SchoolYear": "$sem.SchoolYear",
-                "Average": {"$avg": "$Grades"}
-            }
-        },
-
-        # Group by Course + SchoolYear
-        {
-            "$group": {
-                "_id": {"Course": "$Course", "SchoolYear": "$SchoolYear"},
-                "Average": {"$avg": "$Average"}
-            }
-        },
-
-        # Reshape
-        {
-            "$project": {
-                "Course": "$_id.Course",
-                "SchoolYear": "$_id.SchoolYear",
-                "Average": 1,
-                "_id": 0
-            }
-        },
-
-        # Sort for trends
-        {"$sort": {"Course": 1, "SchoolYear": 1}}
-    ]
+    records = per_record(filter_facts(get_grade_facts(db), joined=("semester", "student")))
+    if records.empty:
+        return pd.DataFrame()
 
-    result = list(db.grades.aggregate(pipeline))
-    return pd.DataFrame(result)
+    # Average the per-record averages by Course + SchoolYear
+    df = (
+        records.groupby(["Course", "SchoolYear"], observed=True)["Average"]
+        .mean()
+        .reset_index()
+        .sort_values(["Course", "SchoolYear"])
+    )
+    return plain(df[["Average", "Course", "SchoolYear"]]).reset_index(drop=True)
 
 
 # @cache_meta()
 def get_subject_load_intensity(db):
-    pipeline = [
-        # Join students
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "StudentID",
-                "foreignField": "_id",
-                "as": "student"
-            }
-        },
-        {"$unwind": "$student"},
-
-        # Project course + subject load (array length of SubjectCodes)
-        {
-            "$project": {
-                "Course": "$student.Course",
-                "Load": {"$size": {"$ifNull": ["$SubjectCodes", []]}}
-            }
-        },
-
-        # Group by course and compute average load
-        {
-            "$group": {
-                "_id": "$Course",
-                "Load": {"$avg": "$Load"}
-            }
-        },
-
-        # Reshape result
-        {
-            "$project": {
-                "Course": "$_id",
-                "Load": 1,
-                "_id": 0
-            }
-        },
-        {"$sort": {"Course": 1}}
-    ]
+    facts = filter_facts(get_grade_facts(db), joined=("student",))
+    if facts.empty:
+        return pd.DataFrame()
 
-    result = list(db.grades.aggregate(pipeline))
-    return pd.DataFrame(result)
+    # Subject load = number of SubjectCodes on each grade record
+    load = (
+        facts.groupby(["StudentID", "SemesterID"], observed=True, sort=False)
+        .agg(Course=("Course", "first"), Load=("SubjectCode", "size"))
+    )
+    df = (
+        load.groupby("Course", observed=True)["Load"]
+        .mean()
+        .reset_index()
+        .sort_values("Course")
+    )
+    return plain(df[["Load", "Course"]]).reset_index(drop=True)
 
 
-@cache_meta()
+@cache_meta(collections=("grades", "semesters"), soft_ttl=15, hard_ttl=1440)  # stale-while-revalidate
 def get_ge_vs_major(db, school_year=None):
-    pipeline = [
-        # Join semesters collection to get SchoolYear
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "semester"
-            }
-        },
-        {"$unwind": "$semester"},
-    ]
-
-    # Optional filter
-    if school_year:
-        pipeline.append({"$match": {"semester.SchoolYear": school_year}})
-
-    pipeline += [
-        {"$unwind": {"path": "$SubjectCodes", "includeArrayIndex": "idx1"}},
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx2"}},
-        {"$match": {"$expr": {"$eq": ["$idx1", "$idx2"]}}},
-        {
-            "$project": {
-                "SchoolYear": "$semester.SchoolYear",  # carry over
-                "Type": {
-                    "$cond": [
-                        {"$regexMatch": {"input": "$SubjectCodes", "regex": "^GE"}},
-                        "GE",
-                        "Major"
-                    ]
-                },
-                "Grade": {"$toDouble": "$Grades"}
-            }
-        },
-        {
-            "$group": {
-                "_id": {
-                    "SchoolYear": "$SchoolYear",
-                    "Type": "$Type"
-                },
-                "Average": {"$avg": "$Grade"},
-                "Count": {"$sum": 1}
-            }
-        },
-        {
-            "$project": {
-                "SchoolYear": "$_id.SchoolYear",
-                "Type": "$_id.Type",
-                "Average": 1,
-                "Count": 1,
-                "_id": 0
-            }
-        },
-        {"$sort": {"SchoolYear": 1, "Type": 1}}
-    ]
+    facts = select_facts(db, school_year)
+    facts = facts[facts["Grade"].notna()]
+    if facts.empty:
+        return pd.DataFrame()
 
-    result = list(db.grades.aggregate(pipeline))
-    return pd.DataFrame(result)
+    subject_type = np.where(facts["SubjectCode"].astype(str).str.startswith("GE"), "GE", "Major")
+    df = (
+        facts.assign(Type=subject_type)
+        .groupby(["SchoolYear", "Type"])
+        .agg(Average=("Grade", "mean"), Count=("Grade", "size"))
+        .reset_index()
+        .sort_values(["SchoolYear", "Type"])
+    )
+    return df[["Average", "Count", "SchoolYear", "Type"]].reset_index(drop=True)
 
 
 
 # D. Semester and Academic Year Analysis
 
-@cache_meta()
-def get_lowest_gpa_semester(db):
-    # Step 1: Pull raw grades with semester info
-    pipeline = [
-        {"$unwind": {"path": "$SubjectCodes", "includeArrayIndex": "idx1"}},
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx2"}},
-        {"$match": {"$expr": {"$eq": ["$idx1", "$idx2"]}}},
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-        {
-            "$project": {
-                "SemesterID": "$SemesterID",
-                "Semester": "$sem.Semester",
-                "SchoolYear": "$sem.SchoolYear",
-                "SubjectCode": "$SubjectCodes",
-                "Grade": "$Grades"
-            }
-        }
-    ]
+def _graded_by_semester(db):
+    """Flat (SemesterID, Semester, SchoolYear, SubjectCode, Grade) rows."""
+    facts = filter_facts(get_grade_facts(db))
+    facts = facts[facts["Grade"].notna()]
+    return plain(facts[["SemesterID", "Semester", "SchoolYear", "SubjectCode", "Grade"]])
 
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
+@cache_meta(collections=("grades", "semesters"))
+def get_lowest_gpa_semester(db):
+    # Step 1: Graded rows with semester info
+    df = _graded_by_semester(db)
 
     if df.empty:
         return pd.DataFrame(), pd.DataFrame()
 
-    # Step 2: Compute GPA per semester (Python side)
+    # Step 2: Compute GPA per semester
     sem_stats = (
         df.groupby(["SemesterID", "Semester", "SchoolYear"])["Grade"]
         .mean()
@@ -810,40 +317,15 @@ def get_lowest_gpa_semester(db):
 
 
 
-@cache_meta()
+@cache_meta(collections=("grades", "semesters"))
 def get_best_gpa_semester(db):
-    # Step 1: Pull raw grades with semester info
-    pipeline = [
-        {"$unwind": {"path": "$SubjectCodes", "includeArrayIndex": "idx1"}},
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx2"}},
-        {"$match": {"$expr": {"$eq": ["$idx1", "$idx2"]}}},
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-        {
-            "$project": {
-                "SemesterID": "$SemesterID",
-                "Semester": "$sem.Semester",
-                "SchoolYear": "$sem.SchoolYear",
-                "SubjectCode": "$SubjectCodes",
-                "Grade": "$Grades"
-            }
-        }
-    ]
-
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
+    # Step 1: Graded rows with semester info
+    df = _graded_by_semester(db)
 
     if df.empty:
         return pd.DataFrame(), pd.DataFrame()
 
-    # Step 2: Compute GPA per semester in Python
+    # Step 2: Compute GPA per semester
     sem_stats = (
         df.groupby(["SemesterID", "Semester", "SchoolYear"])["Grade"]
         .mean()
@@ -877,47 +359,19 @@ def get_best_gpa_semester(db):
     return header, subjects_df
 
 
-@cache_meta()
+@cache_meta(collections=("grades", "semesters"))
 def get_grade_deviation_across_semesters(db):
-    pipeline = [
-        # Unwind subjects + grades together
-        {"$unwind": {"path": "$SubjectCodes", "includeArrayIndex": "idx1"}},
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "idx2"}},
-        {"$match": {"$expr": {"$eq": ["$idx1", "$idx2"]}}},
-
-        # Attach semester info
-        {
-            "$lookup": {
-                "from": "semesters",
-                "localField": "SemesterID",
-                "foreignField": "_id",
-                "as": "sem"
-            }
-        },
-        {"$unwind": "$sem"},
-
-        # Project flat records (no $group)
-        {
-            "$project": {
-                "Subject": "$SubjectCodes",
-                "Semester": "$sem._id",
-                "Grade": "$Grades"
-            }
-        }
-    ]
-
-    # Get flat records
-    result = list(db.grades.aggregate(pipeline))
-    df = pd.DataFrame(result)
+    df = _graded_by_semester(db)
 
     if df.empty:
         return pd.DataFrame()
 
-    # Compute stats in Python
+    # Compute stats per subject
     stats = (
-        df.groupby("Subject")["Grade"]
+        df.groupby("SubjectCode")["Grade"]
         .agg(Mean="mean", StdDev="std", Count="count")
         .reset_index()
+        .rename(columns={"SubjectCode": "Subject"})
     )
 
     # Exclude subjects with mean < 50
@@ -931,11 +385,10 @@ def get_grade_deviation_across_semesters(db):
 
 
 # E. Student Demographics
-@cache_meta()
+@cache_meta(collections=("students",))
 def get_year_level_distribution(db):
     # Pull YearLevel only
-    cursor = db.students.find({}, {"YearLevel": 1, "_id": 0})
-    df = pd.DataFrame(list(cursor))
+    df = find_frame(db.students, {}, {"YearLevel": 1, "_id": 0})
 
     # If YearLevel is missing, replace with "Unknown"
     if "YearLevel" not in df.columns:
@@ -955,7 +408,7 @@ def get_year_level_distribution(db):
     return df
 
 
-@cache_meta()
+@cache_meta(collections=("students",))
 def get_student_count_per_course(db):
     pipeline = [
         {
@@ -976,56 +429,32 @@ def get_student_count_per_course(db):
         }
     ]
 
-    result = list(db.students.aggregate(pipeline))
-    df = pd.DataFrame(result)
-    return df
+    return read_frame(db.students.aggregate(pipeline))
 
-@cache_meta()
+@cache_meta(collections=("grades", "students"))
 def get_performance_by_year_level(db):
-    pipeline = [
-        # Join with students collection
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "StudentID",
-                "foreignField": "_id",
-                "as": "student"
-            }
-        },
-        {"$unwind": "$student"},
-
-        # Compute average grade per student
-        {
-            "$project": {
-                "YearLevel": "$student.YearLevel",
-                "Average": {"$avg": "$Grades"}
-            }
-        },
-
-        # Group by year level and average across students
-        {
-            "$group": {
-                "_id": "$YearLevel",
-                "Average": {"$avg": "$Average"}
-            }
-        },
-
-        # Sort nicely
-        {"$sort": {"_id": 1}}
-    ]
+    # Average grade per record, then averaged across records per year level
+    records = per_record(filter_facts(get_grade_facts(db), joined=("student",)))
+    if records.empty:
+        return pd.DataFrame()
 
-    result = list(db.grades.aggregate(pipeline))
-    return pd.DataFrame(result).rename(columns={"_id": "YearLevel"})
+    df = (
+        records.groupby("YearLevel")["Average"]
+        .mean()
+        .reset_index()
+        .sort_values("YearLevel")
+    )
+    return df.reset_index(drop=True)
 
-@cache_meta()
+@cache_meta(collections=("semesters",))
 def get_Schoolyear_options(db):
     return db.semesters.distinct("SchoolYear")
 
-@cache_meta()
+@cache_meta(collections=("students",))
 def get_course_options(db):
     return db.students.distinct("Course")
 
-@cache_meta()
+@cache_meta(collections=("semesters",))
 def get_semester_options(db):
     return db.semesters.distinct("Semester")
 
@@ -0,0 +1,255 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# helpers/stats_cube_helper.py
+# Pre-aggregated grade statistics keyed by SemesterID x SubjectCode x Teacher x Course.
+# Every cell holds additive measures (counts, sums, sum of squares, fixed-width
+# histogram bins), so any coarser level is a plain sum and header cards /
+# histograms become lookups instead of scans over raw grades.
+#
+# The Mongo copy is written by the maintenance job only (grade_facts_job runs
+# refresh_stats_cube after each refresh); pages just read it:
+#
+#    python helpers/stats_cube_helper.py          # rebuild grade_stats_cube now
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from helpers.cache_helper import cache_meta, get_versions, record
+from helpers.grade_fact_helper import JOB_STATE_COLLECTION, get_grade_facts, plain
+
+CUBE_DIMENSIONS = ["SemesterID", "SubjectCode", "Teacher", "Course"]
+CUBE_COLLECTION = "grade_stats_cube"
+CUBE_SOURCES = ("grades", "students", "semesters")  # collections the cube is built from
+
+PASSING_GRADE = 75
+HIGH_GRADE = 90
+BIN_WIDTH = 1  # fine enough for exact above/below-mean counts on whole-number grades
+BIN_LOWS = list(range(0, 101, BIN_WIDTH))
+BIN_COLUMNS = [f"bin_{low:03d}" for low in BIN_LOWS]
+MEASURES = ["Entries", "Count", "Sum", "SumSq", "Fails", "High"] + BIN_COLUMNS
+
+
+def build_cube(facts):
+    """
+    facts: one row per (grade document, subject) with CUBE_DIMENSIONS and Grade.
+    Returns one row per cube cell with MEASURES. Entries counts every
+    subject taken, Count only the graded ones.
+    """
+    df = plain(facts[CUBE_DIMENSIONS + ["Grade"]])
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + MEASURES)
+
+    grade = pd.to_numeric(df["Grade"], errors="coerce")
+    graded = grade.notna()
+    value = grade.fillna(0)
+    measures = pd.DataFrame({
+        "Entries": 1,
+        "Count": graded.astype(np.int64),
+        "Sum": value,
+        "SumSq": value ** 2,
+        "Fails": (graded & (grade < PASSING_GRADE)).astype(np.int64),
+        "High": (grade >= HIGH_GRADE).astype(np.int64),
+    })
+    keys = [df[dim] for dim in CUBE_DIMENSIONS]
+    cube = measures.groupby(keys, dropna=False).sum()
+
+    # Histogram: count graded rows per (cell, bin), then spread bins into columns
+    bins = (value.clip(0, 100) // BIN_WIDTH).astype(np.int64)[graded]
+    hist = (
+        pd.Series(1, index=bins.index)
+        .groupby([k[graded] for k in keys] + [bins], dropna=False)
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(columns=range(len(BIN_LOWS)), fill_value=0)
+    )
+    hist.columns = BIN_COLUMNS
+    hist = hist.reindex(cube.index, fill_value=0)  # cells with no graded entries
+    return pd.concat([cube, hist], axis=1).reset_index()
+
+
+# ------------------------------
+# Storage (local cache + Mongo)
+# ------------------------------
+
+def save_cube(db, cube):
+    """Replaces the Mongo copy: written to a scratch collection, then renamed over the old one."""
+    docs = []
+    for row in cube.to_dict("records"):
+        key = {dim: (None if pd.isna(row[dim]) else row[dim]) for dim in CUBE_DIMENSIONS}
+        docs.append({
+            "_id": key,
+            **{m: row[m] for m in MEASURES if m not in BIN_COLUMNS},
+            "Bins": [int(row[col]) for col in BIN_COLUMNS],
+        })
+    scratch = db[CUBE_COLLECTION + "_build"]
+    scratch.drop()
+    if docs:
+        scratch.insert_many(docs)
+    else:
+        db.create_collection(scratch.name)  # rename needs the collection to exist
+    scratch.rename(CUBE_COLLECTION, dropTarget=True)
+
+
+def load_cube(db):
+    """Reads the Mongo copy back into the build_cube layout."""
+    rows = []
+    for doc in db[CUBE_COLLECTION].find({}):
+        row = dict(doc["_id"])
+        row.update({m: doc.get(m, 0) for m in MEASURES if m not in BIN_COLUMNS})
+        row.update(zip(BIN_COLUMNS, doc.get("Bins", [0] * len(BIN_COLUMNS))))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=CUBE_DIMENSIONS + MEASURES)
+
+
+def cube_version():
+    """Versions of CUBE_SOURCES as a tuple; app.py keys the grades snapshot on the same value."""
+    versions = get_versions()
+    return tuple(versions.get(name, 0) for name in CUBE_SOURCES)
+
+
+def refresh_stats_cube(db):
+    """
+    Rebuilds the cube and replaces the Mongo copy, recording the data version
+    it was built for. Maintenance job only; pages never write the cube.
+    """
+    version = cube_version()  # snapshot before reading the facts
+    cube = build_cube(get_grade_facts(db))
+    save_cube(db, cube)
+    db[JOB_STATE_COLLECTION].replace_one(
+        {"_id": CUBE_COLLECTION},
+        {"_id": CUBE_COLLECTION, "version": list(version), "built_at": datetime.now(timezone.utc)},
+        upsert=True,
+    )
+    return cube
+
+
+def cube_up_to_date(db):
+    """True when the Mongo copy was built for the current data version."""
+    state = db[JOB_STATE_COLLECTION].find_one({"_id": CUBE_COLLECTION}, {"version": 1})
+    return state is not None and tuple(state.get("version", ())) == cube_version()
+
+
+@cache_meta(collections=CUBE_SOURCES)
+def get_stats_cube(db):
+    """
+    The cube for the current data version. Read from the Mongo copy when the
+    job built it for this version; otherwise (grades edited since the last
+    job run) built in memory only, so it never disagrees with the snapshot.
+    """
+    if cube_up_to_date(db):
+        return load_cube(db)
+    record("get_stats_cube", "fallbacks")  # behind the data until the next job run
+    return build_cube(get_grade_facts(db))
+
+
+# ------------------------------
+# Queries
+# ------------------------------
+
+class StatsCube:
+    """
+    Lookups over a build_cube frame. Rollups to coarser levels are summed once
+    and kept, so repeated lookups at the same level are index hits.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+        self._rollups = {}
+
+    def rollup(self, *dims):
+        """Measures summed over every dimension not in dims, indexed by dims."""
+        dims = tuple(dims)
+        if dims not in self._rollups:
+            if dims:
+                table = self.cells.groupby(list(dims), dropna=False)[MEASURES].sum().sort_index()
+            else:
+                table = self.cells[MEASURES].sum().to_frame().T
+            self._rollups[dims] = table
+        return self._rollups[dims]
+
+    def cell(self, **key):
+        """Summed measures for one cell at the level named by key's dimensions (zeros if empty)."""
+        dims = [dim for dim in CUBE_DIMENSIONS if dim in key]
+        table = self.rollup(*dims)
+        if not dims:
+            return table.iloc[0]
+        index = tuple(key[dim] for dim in dims) if len(dims) > 1 else key[dims[0]]
+        try:
+            return table.loc[index]
+        except KeyError:
+            return pd.Series(0, index=MEASURES)
+
+    def summary(self, **key):
+        """count / mean / std / fails / high / entries for a cell."""
+        c = self.cell(**key)
+        count = int(c["Count"])
+        mean = float(c["Sum"]) / count if count else None
+        variance = (c["SumSq"] - c["Sum"] ** 2 / count) / (count - 1) if count > 1 else None
+        return {
+            "entries": int(c["Entries"]),
+            "count": count,
+            "mean": mean,
+            "std": float(np.sqrt(max(variance, 0))) if variance is not None else None,
+            "fails": int(c["Fails"]),
+            "passes": count - int(c["Fails"]),
+            "high": int(c["High"]),
+        }
+
+    def count_above(self, value, **key):
+        """
+        Graded entries above value, counted from the histogram bins: exact for
+        whole-number grades (BIN_WIDTH 1), fractional grades count by their bin.
+        """
+        bins = self.cell(**key)[BIN_COLUMNS].to_numpy()
+        return int(bins[np.array(BIN_LOWS) > value].sum())
+
+    def count_below(self, value, **key):
+        """Graded entries below value; same whole-number caveat as count_above."""
+        bins = self.cell(**key)[BIN_COLUMNS].to_numpy()
+        return int(bins[np.array(BIN_LOWS) < value].sum())
+
+    def histogram(self, width=5, **key):
+        """DataFrame of Bin (lower edge) and Count, re-binned to width, trimmed to the non-empty range."""
+        counts = self.cell(**key)[BIN_COLUMNS].to_numpy().astype(np.int64)
+        lows = np.array(BIN_LOWS)
+        grouped = pd.Series(counts).groupby((lows // width) * width).sum()
+        nonzero = grouped[grouped > 0]
+        if nonzero.empty:
+            return pd.DataFrame(columns=["Bin", "Count"])
+        grouped = grouped.loc[nonzero.index.min():nonzero.index.max()]
+        return pd.DataFrame({"Bin": grouped.index, "Count": grouped.values})
+
+    def members(self, dim, **key):
+        """Values of dim that have entries within key (e.g. the teachers of a subject)."""
+        dims = [d for d in CUBE_DIMENSIONS if d in key]
+        table = self.rollup(*dims, dim).reset_index()
+        for d in dims:
+            table = table[table[d] == key[d]]
+        return sorted(v for v in table.loc[table["Entries"] > 0, dim] if pd.notna(v))
+
+
+_current = {"version": None, "cube": None}
+
+
+def load_stats_cube(db, version=None):
+    """
+    StatsCube for the data version (default: current), shared by every page
+    in the process. Pass the version the grades snapshot was loaded for so
+    both describe the same data.
+    """
+    version = version or cube_version()
+    if _current["cube"] is None or _current["version"] != version:
+        _current.update(version=version, cube=StatsCube(get_stats_cube(db)))
+    return _current["cube"]
+
+
+if __name__ == "__main__":
+    from helpers.db_helper import get_db
+
+    started = time.time()
+    cube = refresh_stats_cube(get_db("batch"))
+    print(f"✅ {CUBE_COLLECTION} rebuilt ({len(cube)} cells) in {time.time() - started:.1f}s")
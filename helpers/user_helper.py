@@ -1,5 +1,6 @@
 import bcrypt
-import pandas as pd
+
+from helpers.ingest_helper import find_frame
 
 
 
@@ -38,7 +39,7 @@ def get_all_users(db):
     """
     Fetches all users from the userAccounts collection.
     """
-    return pd.DataFrame(list(db.userAccounts.find({}, {"passwordHash": 0})))
+    return find_frame(db.userAccounts, {}, {"passwordHash": 0})
 
 
 def add_user(db,username, password, role, fullname):
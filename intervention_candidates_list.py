@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
-from pymongo import MongoClient
 from helpers.utils import generate_excel
+from helpers.pipeline_helper import aligned, unwind_aligned
+from helpers.dimension_helper import dimension, semester_labels
+from helpers.async_db_helper import aggregate
 
 def get_risk_flag(grade):
     """Determine the risk flag based on the grade."""
@@ -15,8 +17,16 @@ def get_risk_flag(grade):
         return "Invalid Grade Format"
     return None
 
-def intervention_candidates_list_panel(db, teacher_name=None, subject_code=None):
-    """Displays a list of students at academic risk."""
+def intervention_query(teacher_name, semester_id):
+    """The panel's grades query for one teacher and semester (see helpers/async_db_helper.py)."""
+    return aggregate("grades", [
+        {"$match": {"Teachers": teacher_name, "SemesterID": semester_id}},
+        *unwind_aligned(where={"$eq": [aligned("Teacher"), teacher_name]}, keep=("StudentID",)),
+        {"$project": {"_id": 0, "StudentID": 1, "Grade": 1, "SubjectCode": 1}}
+    ])
+
+def intervention_candidates_list_panel(db, teacher_name=None, subject_code=None, data=None):
+    """Displays a list of students at academic risk. data: intervention_query results, if prefetched."""
     st.info("This report lists students at academic risk based on low or missing grades for the selected semester.")
 
     if teacher_name is None:
@@ -25,10 +35,7 @@ def intervention_candidates_list_panel(db, teacher_name=None, subject_code=None)
 
     # Semester selector
     try:
-        semesters = list(db.semesters.find({}, {"_id": 1, "Semester": 1, "SchoolYear": 1}))
-        semester_order = {"First": 1, "Second": 2, "Summer": 3}
-        semesters.sort(key=lambda s: (s.get("SchoolYear", 0), semester_order.get(s.get("Semester"), -1)), reverse=True)
-        semester_options = {s["_id"]: f"{s['Semester']} - {s['SchoolYear']}" for s in semesters}
+        semester_options = semester_labels(db)
         selected_semester_id = st.selectbox(
             "Select Semester",
             options=[""] + list(semester_options.keys()),
@@ -44,23 +51,10 @@ def intervention_candidates_list_panel(db, teacher_name=None, subject_code=None)
         return
 
     # Fetch data for the selected teacher and semester
-    pipeline = [
-        {"$match": {"Teachers": teacher_name, "SemesterID": selected_semester_id}},
-        {"$unwind": {"path": "$Teachers", "includeArrayIndex": "teacher_idx"}},
-        {"$match": {"Teachers": teacher_name}},
-        {"$lookup": {"from": "students", "localField": "StudentID", "foreignField": "_id", "as": "student_info"}},
-        {"$unwind": "$student_info"},
-        {"$project": {
-            "StudentID": "$student_info._id",
-            "StudentName": "$student_info.Name",
-            "programCode": "$student_info.Course",
-            "Grade": {"$arrayElemAt": ["$Grades", "$teacher_idx"]},
-            "SubjectCode": {"$arrayElemAt": ["$SubjectCodes", "$teacher_idx"]}
-        }}
-    ]
+    query = intervention_query(teacher_name, selected_semester_id)
 
     try:
-        candidates_data = list(db.grades.aggregate(pipeline))
+        candidates_data = data if data is not None else list(db.grades.aggregate(*query.args))
     except Exception as e:
         st.error(f"Error fetching data: {e}")
         return
@@ -69,18 +63,21 @@ def intervention_candidates_list_panel(db, teacher_name=None, subject_code=None)
         st.warning("No students found for the selected criteria.")
         return
 
-    df_candidates = pd.DataFrame(candidates_data)
+    # Student name / program from the cached students dimension instead of a $lookup
+    df_candidates = dimension(db, "students").join(
+        pd.DataFrame(candidates_data), on="StudentID", fields=["Name", "Course"],
+        rename={"Name": "StudentName", "Course": "programCode"}, how="inner",
+    )
+    if df_candidates.empty:
+        st.warning("No students found for the selected criteria.")
+        return
 
     if subject_code:
         df_candidates = df_candidates[df_candidates['SubjectCode'] == subject_code]
 
     # Add programName from curriculum
-    program_codes = df_candidates['programCode'].unique().tolist()
-    curriculum_info = {
-        c['programCode']: c['programName']
-        for c in db.curriculum.find({"programCode": {"$in": program_codes}}, {"programCode": 1, "programName": 1})
-    }
-    df_candidates['programName'] = df_candidates['programCode'].map(curriculum_info).fillna("N/A")
+    df_candidates['programName'] = dimension(db, "curriculum").lookup(df_candidates['programCode'], "programName")
+    df_candidates['programName'] = df_candidates['programName'].fillna("N/A")
 
     # Determine risk flag
     df_candidates['Risk Flag'] = df_candidates['Grade'].apply(get_risk_flag)
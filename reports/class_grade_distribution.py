@@ -2,6 +2,9 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 from helpers.utils import generate_excel
+from helpers.pipeline_helper import aligned, unwind_aligned
+from helpers.dimension_helper import semester_labels
+from helpers.faculty_helper import grades_by_program
 
 def get_grade_distribution_data(db, teacher_name, semester_id):
     """Fetches grade distribution data for a given teacher and semester."""
@@ -9,38 +12,13 @@ def get_grade_distribution_data(db, teacher_name, semester_id):
         return pd.DataFrame()
 
     pipeline = [
-        {"$match": {"SemesterID": semester_id}},
-        {"$unwind": {"path": "$Teachers", "includeArrayIndex": "teacher_idx"}},
-        {"$unwind": {"path": "$Grades", "includeArrayIndex": "grade_idx"}},
-        {"$match": {"$expr": {"$and": [
-            {"$eq": ["$Teachers", teacher_name]},
-            {"$eq": ["$teacher_idx", "$grade_idx"]}
-        ]}}},
-        {"$lookup": {
-            "from": "students",
-            "localField": "StudentID",
-            "foreignField": "_id",
-            "as": "student_info"
-        }},
-        {"$unwind": "$student_info"},
-        {"$lookup": {
-            "from": "curriculum",
-            "localField": "student_info.Course",
-            "foreignField": "programCode",
-            "as": "curriculum_info"
-        }},
-        {"$unwind": {"path": "$curriculum_info", "preserveNullAndEmptyArrays": True}},
-        {"$group": {
-            "_id": {
-                "programCode": "$student_info.Course",
-                "programName": {"$ifNull": ["$curriculum_info.programName", "$student_info.Course"]}
-            },
-            "grades": {"$push": "$Grades"}
-        }}
+        {"$match": {"SemesterID": semester_id, "Teachers": teacher_name}},
+        *unwind_aligned(where={"$eq": [aligned("Teacher"), teacher_name]}, keep=("StudentID",)),
+        {"$project": {"_id": 0, "StudentID": 1, "Grade": 1}},
     ]
 
     try:
-        data = list(db.grades.aggregate(pipeline))
+        data = grades_by_program(db, list(db.grades.aggregate(pipeline)))
         return pd.DataFrame(data)
     except Exception as e:
         st.error(f"An error occurred during aggregation: {e}")
@@ -138,13 +116,7 @@ def class_grade_distribution_report(db, teacher_name):
     st.info("This report shows the grade distribution across different programs for the selected semester.")
 
     try:
-        semesters = list(db.semesters.find({}, {"_id": 1, "Semester": 1, "SchoolYear": 1}))
-        semester_order = {"First": 1, "Second": 2, "Summer": 3}
-        semesters.sort(
-            key=lambda s: (s.get("SchoolYear", 0), semester_order.get(s.get("Semester"), -1)),
-            reverse=True
-        )
-        semester_options = {s["_id"]: f"{s['Semester']} - {s['SchoolYear']}" for s in semesters}
+        semester_options = semester_labels(db)
         semester_ids = [""] + list(semester_options.keys())
     except Exception as e:
         st.error(f"Error fetching semesters: {e}")
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from helpers.utils import generate_excel
+from helpers.compact_grades_helper import CompactGrades
+from helpers.dimension_helper import dimension
 
 def get_trend(grades):
     """Calculates the trend based on a list of grades."""
@@ -27,48 +29,26 @@ def get_trend(grades):
 
     return "Stable"
 
-def get_grade_for_subject(row, subject_code):
-    """Extracts the grade for a specific subject from a row."""
-    try:
-        idx = row['SubjectCodes'].index(subject_code)
-        return row['Grades'][idx]
-    except (ValueError, IndexError, TypeError, AttributeError):
-        return None
-
 def student_progress_tracker_panel(db, subject_code, df_full, teacher_name=None, course=None, year_level=None):
     st.header("Student Progress Tracker")
 
-    df = df_full.copy()
-
-    # Filter by teacher if provided
-    if teacher_name:
-        teacher_name_clean = str(teacher_name).strip().lower()
-        df = df[df['Teachers'].apply(
-            lambda lst: teacher_name_clean in [t.strip().lower() for t in lst] if isinstance(lst, list) else False
-        )]
+    # Accept a plain df_merged DataFrame too
+    if isinstance(df_full, pd.DataFrame):
+        df_full = CompactGrades.from_frame(df_full)
 
-    # Filter by course/year level if provided
-    if course:
-        df = df[df['Course'] == course]
-    if year_level:
-        df = df[df['YearLevel'] == year_level]
-
-    # Filter for the selected subject
-    df_subject = df[df['SubjectCodes'].apply(lambda x: subject_code in x if isinstance(x, list) else False)].copy()
+    # Filter by teacher / course / year level if provided, then extract the
+    # grade for the selected subject
+    mask = df_full.row_mask(subject_code=subject_code, teacher=teacher_name, course=course, year_level=year_level)
+    df_subject = df_full.subject_grades(subject_code, mask)
     if df_subject.empty:
         st.warning("No students found for the selected subject and teacher.")
         return
 
-    # Extract grades for the selected subject
-    df_subject['Grade'] = df_subject.apply(lambda row: get_grade_for_subject(row, subject_code), axis=1)
-
     # Convert grades to numeric safely
     df_subject['Grade'] = pd.to_numeric(df_subject['Grade'], errors='coerce')
 
     # Merge semester info
-    semesters_df = pd.DataFrame(list(db.semesters.find({}, {"_id": 1, "Semester": 1})))
-    semesters_df.rename(columns={'_id': 'SemesterID'}, inplace=True)
-    df_subject = pd.merge(df_subject, semesters_df, on='SemesterID', how='left')
+    df_subject = dimension(db, "semesters").join(df_subject, on='SemesterID', fields=['Semester'])
 
     if 'Semester' not in df_subject.columns:
         st.error("Semester information is missing.")
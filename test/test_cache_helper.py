@@ -0,0 +1,43 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from helpers.cache_helper import DiskStore
+
+
+def _round_trip(tmp_path, df):
+    store = DiskStore(str(tmp_path), compact_interval=0)
+    store.set("report", df)
+    hit, value = store.get("report")
+    assert hit
+    return value
+
+
+def test_disk_hit_keeps_dtypes_of_typed_frame(tmp_path):
+    df = pd.DataFrame({
+        "Count": [1, 2, 3],
+        "Average": [88.5, np.nan, 75.0],
+        "YearLevel": pd.array([1, None, 3], dtype="Int64"),
+        "Course": pd.Categorical(["BSIT", "BSBA", None]),
+        "Name": pd.Series(["Ann", None, "Cy"], dtype="str"),
+        "Failed": [True, False, True],
+    })
+    pd.testing.assert_frame_equal(_round_trip(tmp_path, df), df)
+    assert [f for f in os.listdir(tmp_path) if f.startswith("report")] == ["report.parquet"]
+
+
+def test_disk_hit_keeps_object_string_columns(tmp_path):
+    df = pd.DataFrame({
+        "StudentID": [1, 2, 3],
+        "Name": pd.Series(["Ann", None, "Cy"], dtype=object),
+    })
+    value = _round_trip(tmp_path, df)
+    pd.testing.assert_frame_equal(value, df)
+    assert value["Name"].tolist() == ["Ann", None, "Cy"]
+
+
+def test_disk_hit_keeps_list_columns(tmp_path):
+    df = pd.DataFrame({"StudentID": [1, 2], "SubjectCodes": [["IT101"], ["IT102", None]]})
+    pd.testing.assert_frame_equal(_round_trip(tmp_path, df), df)
@@ -0,0 +1,81 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pandas as pd
+
+from helpers.compact_grades_helper import CompactGrades
+
+
+def _merged():
+    return pd.DataFrame({
+        "StudentID": [1, None, 2],
+        "SemesterID": [10, 10, 11],
+        "SubjectCodes": [["IT101", None], ["IT102"], ["IT101"]],
+        "Grades": [[90, 80], [70], [None]],
+        "Teachers": [["Prof. A", None], ["Prof. B"], [None]],
+        "SchoolYear": [2024, 2024, 2025],
+        "Name": ["Ann", None, "Ben"],
+        "Course": ["BSIT", None, "BSBA"],
+        "YearLevel": [1, None, 2],
+    })
+
+
+def test_round_trip_keeps_missing_values_missing():
+    df = CompactGrades.from_frame(_merged()).to_frame()
+
+    assert df["SubjectCodes"].tolist() == [["IT101", None], ["IT102"], ["IT101"]]
+    assert df["Teachers"].tolist() == [["Prof. A", None], ["Prof. B"], [None]]
+    assert df["Grades"].tolist() == [[90, 80], [70], [None]]
+    for column, expected in [("StudentID", [1, 2]), ("Name", ["Ann", "Ben"]),
+                             ("Course", ["BSIT", "BSBA"]), ("YearLevel", [1, 2])]:
+        values = df[column].tolist()
+        assert pd.isna(values[1]), column  # not the last dictionary entry
+        assert [values[0], values[2]] == expected, column
+
+
+def test_subject_grades_row_without_student():
+    rows = CompactGrades.from_frame(_merged()).subject_grades("IT102")
+
+    assert len(rows) == 1
+    assert pd.isna(rows["StudentID"].iloc[0])
+    assert pd.isna(rows["Name"].iloc[0])
+    assert pd.isna(rows["Course"].iloc[0])
+    assert rows["Grade"].iloc[0] == 70
+
+
+def test_row_mask_matches_pandas_filters():
+    merged = _merged()
+    compact = CompactGrades.from_frame(merged)
+
+    for kwargs, expected in [
+        ({"semester_id": 10}, merged["SemesterID"] == 10),
+        ({"semester_id": 99}, merged["SemesterID"] == 99),
+        ({"course": "BSBA"}, merged["Course"] == "BSBA"),
+        ({"course": "BSCS"}, merged["Course"] == "BSCS"),
+        ({"year_level": 1}, merged["YearLevel"] == 1),
+        ({"subject_code": "IT101"}, merged["SubjectCodes"].apply(lambda codes: "IT101" in codes)),
+        ({"teacher": " prof. b "}, merged["Teachers"].apply(lambda names: "Prof. B" in names)),
+        ({"semester_id": 10, "course": "BSIT"}, (merged["SemesterID"] == 10) & (merged["Course"] == "BSIT")),
+    ]:
+        assert compact.row_mask(**kwargs).tolist() == expected.tolist(), kwargs
+
+
+def test_concat_matches_one_build():
+    merged = _merged()
+    extra = pd.DataFrame({
+        "StudentID": [2, 3],
+        "SemesterID": [12, 10],
+        "SubjectCodes": [["IT103", "IT101"], ["IT102"]],
+        "Grades": [[85, None], [60]],
+        "Teachers": [["Prof. C", "Prof. A"], ["Prof. B"]],
+        "SchoolYear": [2025, 2024],
+        "Name": ["Ben", "Cy"],
+        "Course": ["BSBA", "BSCS"],
+        "YearLevel": [2, 3],
+    })
+    joined = CompactGrades.from_frame(merged).subset([0, 2]).concat(CompactGrades.from_frame(extra))
+    expected = CompactGrades.from_frame(pd.concat([merged.iloc[[0, 2]], extra], ignore_index=True))
+
+    pd.testing.assert_frame_equal(joined.to_frame(), expected.to_frame())
+    pd.testing.assert_frame_equal(joined.subject_grades("IT101"), expected.subject_grades("IT101"))
+    assert joined.row_mask(course="BSCS").tolist() == expected.row_mask(course="BSCS").tolist()
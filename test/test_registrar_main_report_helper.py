@@ -0,0 +1,35 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pandas as pd
+import pandas.testing as pdt
+
+from helpers import registrar_main_report_helper as registrar
+
+GRADES = [
+    {"StudentID": 1, "SemesterID": 1, "SubjectCodes": ["IT101", "IT102"], "Grades": [80, None], "Status": ["", "INC"]},
+    {"StudentID": 2, "SemesterID": 2, "SubjectCodes": ["IT101"], "Grades": [91.5], "Status": ["Dropped"]},
+    {"StudentID": 3, "SemesterID": None, "SubjectCodes": ["IT103", "IT104"], "Grades": [75, 60], "Status": ["", ""]},
+    {"StudentID": 4, "SemesterID": 1, "SubjectCodes": ["IT105"], "Grades": [None], "Status": ["INC"]},
+]
+COLUMNS = {"Student ID": "StudentID", "Course Code": "SubjectCodes", "Grade": "Grades",
+           "SemesterID": "SemesterID", "Status": "Status"}
+
+
+def _old_rows(grades, statuses=None):
+    """The list-of-dicts flattening the reports used before flatten_grades."""
+    rows = []
+    for g in grades:
+        for code, grade, status in zip(g.get("SubjectCodes", []), g.get("Grades", []), g.get("Status", [])):
+            if statuses is None or status in statuses:
+                rows.append({"Student ID": g.get("StudentID"), "Course Code": code, "Grade": grade,
+                             "SemesterID": g.get("SemesterID"), "Status": status})
+    return pd.DataFrame(rows)
+
+
+def test_flatten_grades_matches_old_dtypes(monkeypatch):
+    monkeypatch.setattr(registrar, "FLATTEN_PROCESSES", 1)  # inline, chunk by chunk
+    for chunk_size in (1, 2, 100):
+        for keep, statuses in ((None, None), ({"Status": ("INC", "Dropped")}, ("INC", "Dropped"))):
+            new = registrar.flatten_grades(GRADES, COLUMNS, keep=keep, chunk_size=chunk_size)
+            pdt.assert_frame_equal(new, _old_rows(GRADES, statuses))